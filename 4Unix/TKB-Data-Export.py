@@ -10,11 +10,16 @@ Aufruf:
   python3 Goldjunge-Data-Export.py --config TKB-config.json --dest .
 """
 import argparse
+import io
+import json
 import os
+import re
+import shutil
 import sys
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 import csv
-from typing import List, Tuple, Dict, Optional
+import heapq
+from typing import Iterable, Iterator, List, Tuple, Dict, Optional
 import time
 
 try:
@@ -22,6 +27,11 @@ try:
 except Exception:
     requests = None
 
+try:
+    import numpy as np  # spaltenweiser Zeitstempel-Codec; ohne numpy reiner Python-Pfad
+except Exception:
+    np = None
+
 
 class Logger:
     """Minimal logger redirecting output into TKB.log while mirroring to stdout."""
@@ -63,11 +73,264 @@ def detect_encoding(path: str) -> str:
     except Exception:
         return 'utf-8'
 
+# ===== Zeitstempel-Codec =====
+# Zeitstempel werden als Epoch-Minuten (int) geführt und erst beim Schreiben wieder
+# zu 'YYYY-MM-DD HH:MM'. Akzeptiert werden 'YYYY.MM.DD HH:MM' (MT5) und 'YYYY-MM-DD HH:MM'.
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+TIME_TEXT_LEN = 16
+_DIGIT_COLUMNS = (0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15)
+
+
+def parse_time_minutes(value: str) -> int:
+    """Ein Zeitstempel → Epoch-Minuten; ValueError bei unbekanntem Format."""
+    v = value.strip()
+    if len(v) == TIME_TEXT_LEN and v[4] == v[7] and v[4] in '-.' and v[10] == ' ' and v[13] == ':':
+        hour, minute = int(v[11:13]), int(v[14:16])
+        if hour > 23 or minute > 59:
+            raise ValueError(f"invalid time: {value!r}")
+        day = date(int(v[0:4]), int(v[5:7]), int(v[8:10])).toordinal() - EPOCH_ORDINAL
+        return day * 1440 + hour * 60 + minute
+    # selten: nicht zweistellig aufgefüllte Felder o.ä. → strptime wie bisher
+    if not v:
+        raise ValueError("empty timestamp")
+    dt = datetime.strptime(v, '%Y.%m.%d %H:%M' if '.' in v else '%Y-%m-%d %H:%M')
+    return datetime_to_minutes(dt)
+
+
+def datetime_to_minutes(dt: datetime) -> int:
+    return (dt.toordinal() - EPOCH_ORDINAL) * 1440 + dt.hour * 60 + dt.minute
+
+
+def minutes_to_datetime(minutes: int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(minutes=minutes)
+
+
+def _parse_time_column_np(values: List[str]) -> Optional[Tuple[List[int], List[bool]]]:
+    n = len(values)
+    try:
+        buf = ('\n'.join(values) + '\n').encode('ascii')
+    except UnicodeEncodeError:
+        return None
+    if len(buf) != n * (TIME_TEXT_LEN + 1):
+        return None
+    raw = np.frombuffer(buf, dtype=np.uint8).reshape(n, TIME_TEXT_LEN + 1)
+    # Nur die Gesamtlänge zu prüfen reicht nicht: ein zu langer und ein zu kurzer Eintrag
+    # verschieben die Zeilen dazwischen. Trenner in Spalte 16 bei genau n Zeilenumbrüchen
+    # heißt, jeder Eintrag ist 16 Zeichen lang – sonst zeilenweise wie parse_time_minutes.
+    if buf.count(b'\n') != n or not (raw[:, TIME_TEXT_LEN] == ord('\n')).all():
+        return None
+    digits = raw[:, _DIGIT_COLUMNS].astype(np.int64) - 48
+    ok = ((digits >= 0) & (digits <= 9)).all(axis=1)
+    ok &= (raw[:, 4] == raw[:, 7]) & ((raw[:, 4] == ord('-')) | (raw[:, 4] == ord('.')))
+    ok &= (raw[:, 10] == ord(' ')) & (raw[:, 13] == ord(':'))
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    hour = digits[:, 8] * 10 + digits[:, 9]
+    minute = digits[:, 10] * 10 + digits[:, 11]
+    ok &= (month >= 1) & (month <= 12) & (day >= 1) & (hour <= 23) & (minute <= 59)
+    month_start = ((year - 1970) * 12 + np.clip(month, 1, 12) - 1).astype('datetime64[M]')
+    days = month_start.astype('datetime64[D]') + (np.maximum(day, 1) - 1).astype('timedelta64[D]')
+    ok &= days.astype('datetime64[M]') == month_start  # 30.02. etc. wie strptime ablehnen
+    minutes = days.astype(np.int64) * 1440 + hour * 60 + minute
+    return minutes.tolist(), ok.tolist()
+
+
+def parse_time_column(values: List[str]) -> List[Optional[int]]:
+    """Ganze Zeitspalte → Epoch-Minuten, None für nicht lesbare Einträge."""
+    if not values:
+        return []
+    parsed = _parse_time_column_np(values) if np is not None else None
+    if parsed is None:
+        out: List[Optional[int]] = []
+        for v in values:
+            try:
+                out.append(parse_time_minutes(v))
+            except ValueError:
+                out.append(None)
+        return out
+    minutes, ok = parsed
+    for i, good in enumerate(ok):
+        if not good:
+            try:
+                minutes[i] = parse_time_minutes(values[i])
+            except ValueError:
+                minutes[i] = None
+    return minutes
+
+
+def format_time_column(minutes: List[int]) -> List[str]:
+    """Epoch-Minuten → 'YYYY-MM-DD HH:MM' (nur beim Schreiben)."""
+    if not minutes:
+        return []
+    if np is None:
+        out = []
+        for m in minutes:
+            dt = minutes_to_datetime(m)
+            out.append(f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}")
+        return out
+    mins = np.asarray(minutes, dtype=np.int64)
+    days = mins // 1440
+    rest = mins - days * 1440
+    day64 = days.astype('datetime64[D]')
+    month64 = day64.astype('datetime64[M]')
+    year = day64.astype('datetime64[Y]').astype(np.int64) + 1970
+    month = month64.astype(np.int64) % 12 + 1
+    day = (day64 - month64.astype('datetime64[D]')).astype(np.int64) + 1
+    hour, minute = rest // 60, rest % 60
+    text = np.empty((len(mins), TIME_TEXT_LEN), dtype=np.uint8)
+    for col, value, div in (
+        (0, year, 1000), (1, year, 100), (2, year, 10), (3, year, 1),
+        (5, month, 10), (6, month, 1), (8, day, 10), (9, day, 1),
+        (11, hour, 10), (12, hour, 1), (14, minute, 10), (15, minute, 1),
+    ):
+        text[:, col] = (value // div) % 10 + 48
+    text[:, 4] = text[:, 7] = ord('-')
+    text[:, 10] = ord(' ')
+    text[:, 13] = ord(':')
+    joined = text.tobytes().decode('ascii')
+    return [joined[i:i + TIME_TEXT_LEN] for i in range(0, len(joined), TIME_TEXT_LEN)]
+
+
+def benchmark_timestamp_codec(rows: int) -> None:
+    """Spalten-Codec gegen den bisherigen strptime/strftime-Pfad je Zeile messen."""
+    start = datetime(2022, 1, 3)
+    values = [(start + timedelta(minutes=i)).strftime('%Y.%m.%d %H:%M') for i in range(rows)]
+    t0 = time.perf_counter()
+    reference = [datetime.strptime(v, '%Y.%m.%d %H:%M').strftime('%Y-%m-%d %H:%M') for v in values]
+    t_rows = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    minutes = parse_time_column(values)
+    t_parse = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    formatted = format_time_column(minutes)
+    t_format = time.perf_counter() - t0
+    if formatted != reference:
+        LOG.warn("Timestamp-Codec: Ergebnis weicht vom strptime-Pfad ab")
+    codec = 'numpy' if np is not None else 'python'
+    LOG.info(f"Timestamp-Benchmark {rows} Zeilen: strptime/strftime {t_rows:.3f}s ({rows / max(t_rows, 1e-9):,.0f}/s)")
+    LOG.info(
+        f"Timestamp-Benchmark {rows} Zeilen: Codec[{codec}] {t_parse + t_format:.3f}s "
+        f"(parse {t_parse:.3f}s, format {t_format:.3f}s) → x{t_rows / max(t_parse + t_format, 1e-9):.1f}"
+    )
+
+
+STANDARD_HEADER = ('Time', 'Open', 'High', 'Low', 'Close', 'Volume')
+STANDARD_TIME_RE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}$')
+TAIL_BLOCK = 64 * 1024
+
+
+def _text_layout(path: str) -> Tuple[str, bytes, int, int]:
+    """(Codec, Zeilenumbruch als Bytes, Bytes je Code-Unit, BOM-Länge) einer CSV-Datei."""
+    with open(path, 'rb') as fb:
+        sig = fb.read(3)
+    if sig.startswith(b'\xff\xfe'):
+        return 'utf-16-le', b'\n\x00', 2, 2
+    if sig.startswith(b'\xfe\xff'):
+        return 'utf-16-be', b'\x00\n', 2, 2
+    if sig.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8', b'\n', 1, 3
+    return 'utf-8', b'\n', 1, 0
+
+
+def iter_lines_reversed(path: str) -> Iterator[str]:
+    """Zeilen ohne Header vom Dateiende rückwärts, blockweise per seek gelesen.
+
+    Es werden nur so viele TAIL_BLOCK-Blöcke gelesen, wie für die angefragten
+    Zeilen nötig sind – unabhängig von der Dateigröße.
+    """
+    codec, newline, unit, start = _text_layout(path)
+    with open(path, 'rb') as fb:
+        pos = fb.seek(0, os.SEEK_END)
+        pos -= (pos - start) % unit  # angebrochene Code-Unit am Ende ignorieren
+        pending = b''
+        while pos > start:
+            step = min(TAIL_BLOCK, pos - start)
+            pos -= step
+            fb.seek(pos)
+            pending = fb.read(step) + pending
+            cut = pending.find(newline)
+            while cut >= 0 and cut % unit:
+                cut = pending.find(newline, cut + 1)
+            if cut < 0:
+                continue
+            # alles hinter dem ersten Umbruch sind vollständige Zeilen; davor evtl. angeschnitten
+            body = pending[cut + len(newline):].decode(codec, errors='replace')
+            pending = pending[:cut]
+            for line in reversed(body.split('\n')):
+                line = line.rstrip('\r')
+                if line.strip():
+                    yield line
+        # pending ist jetzt die erste Zeile der Datei (Header) und wird übersprungen
+
+
+def _is_standard_row(line: str) -> bool:
+    parts = line.rstrip('\r\n').split(';')
+    return len(parts) == len(STANDARD_HEADER) and bool(STANDARD_TIME_RE.match(parts[0]))
+
+
+def is_standard_csv(path: str) -> bool:
+    """Header, erste und letzte Datenzeile bereits im Train-Format (UTF-8 ohne BOM)?"""
+    if detect_encoding(path) != 'utf-8':
+        return False
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            header = f.readline().rstrip('\r\n')
+            first = f.readline()
+        if header != ';'.join(STANDARD_HEADER) or not _is_standard_row(first):
+            return False
+        return _is_standard_row(next(iter_lines_reversed(path), ''))
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+NORMALIZE_CHUNK_ROWS = 50_000
+
+
+def _standardize_chunk(rows: List[List[str]], indices: Tuple[int, ...]) -> List[Tuple[str, ...]]:
+    texts = [r[indices[0]].strip() for r in rows]
+    minutes = parse_time_column(texts)
+    formatted = iter(format_time_column([m for m in minutes if m is not None]))
+    # nicht lesbare Zeitstempel bleiben wie bisher unverändert stehen
+    return [
+        (next(formatted) if m is not None else t,) + tuple(r[i] for i in indices[1:])
+        for r, t, m in zip(rows, texts, minutes)
+    ]
+
+
+def _iter_standard_rows(reader, indices: Tuple[int, ...]):
+    """Zeilen eines MT5/Extend-CSV als (Time, Open, High, Low, Close, Volume) streamen.
+
+    Zeitstempel werden blockweise über den Spalten-Codec umgesetzt; Speicher bleibt
+    auf NORMALIZE_CHUNK_ROWS Zeilen begrenzt.
+    """
+    width = max(indices)
+    chunk: List[List[str]] = []
+    for r in reader:
+        if not r or len(r) <= width:
+            continue
+        chunk.append(r)
+        if len(chunk) >= NORMALIZE_CHUNK_ROWS:
+            yield from _standardize_chunk(chunk, indices)
+            chunk = []
+    if chunk:
+        yield from _standardize_chunk(chunk, indices)
+
+
+def _replace_with_copy(src_path: str, dst_path: str) -> None:
+    tmp_path = dst_path + '.tmp'
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+
+
 def normalize_to_standard(dest: str) -> Tuple[int, List[str]]:
     """
     Convert *_extend.csv (and plain *_M*.csv) to standard training CSVs:
     Output header: Time;Open;High;Low;Close;Volume (UTF-8)
     Time format: YYYY-MM-DD HH:MM
+
+    Bereits standardisierte Dateien (Header + erste/letzte Zeile) bleiben unangetastet;
+    alle anderen werden zeilenweise in eine .tmp-Datei geschrieben und atomar ersetzt.
     """
     produced = 0
     outputs: List[str] = []
@@ -81,57 +344,58 @@ def normalize_to_standard(dest: str) -> Tuple[int, List[str]]:
         base_path = os.path.join(dest, base_name)
         # Standardize file in place; bootstrap base once if only _extend exists
         should_bootstrap_base = name.endswith('_extend.csv') and base_name != name and not os.path.isfile(base_path)
+        tmp_path = src_path + '.tmp'
         try:
+            if is_standard_csv(src_path):
+                if should_bootstrap_base:
+                    _replace_with_copy(src_path, base_path)
+                    outputs.append(base_path)
+                continue
             enc = detect_encoding(src_path)
             with open(src_path, 'r', encoding=enc, newline='') as f:
                 reader = csv.reader(f, delimiter=';')
-                rows = list(reader)
-            if not rows:
-                continue
-            # header map
-            header = [h.strip().lower() for h in rows[0]]
-            # find indices
-            def idx(colnames):
-                for c in colnames:
-                    if c in header:
-                        return header.index(c)
-                return -1
-            i_time = idx(['time','datetime','date'])
-            i_open = idx(['open'])
-            i_high = idx(['high'])
-            i_low  = idx(['low'])
-            i_close= idx(['close'])
-            i_vol  = idx(['volume','tick_volume','vol'])
-            if min(i_time,i_open,i_high,i_low,i_close,i_vol) < 0:
-                # skip if cannot map
-                continue
-            out_rows = [('Time','Open','High','Low','Close','Volume')]
-            for r in rows[1:]:
-                if not r or len(r) <= max(i_time,i_open,i_high,i_low,i_close,i_vol):
+                first = next(reader, None)
+                if not first:
                     continue
-                t = r[i_time].strip()
-                # Accept formats like 2024.07.01 12:34 or 2024-07-01 12:34
-                tfmt = '%Y.%m.%d %H:%M' if '.' in t else '%Y-%m-%d %H:%M'
-                try:
-                    dt = datetime.strptime(t, tfmt)
-                    tstd = dt.strftime('%Y-%m-%d %H:%M')
-                except Exception:
-                    tstd = t
-                out_rows.append((tstd, r[i_open], r[i_high], r[i_low], r[i_close], r[i_vol]))
-            if len(out_rows) <= 1:
+                # header map
+                header = [h.strip().lower() for h in first]
+                # find indices
+                def idx(colnames):
+                    for c in colnames:
+                        if c in header:
+                            return header.index(c)
+                    return -1
+                indices = (
+                    idx(['time','datetime','date']),
+                    idx(['open']),
+                    idx(['high']),
+                    idx(['low']),
+                    idx(['close']),
+                    idx(['volume','tick_volume','vol']),
+                )
+                if min(indices) < 0:
+                    # skip if cannot map
+                    continue
+                written = 0
+                with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+                    w = csv.writer(out, delimiter=';')
+                    w.writerow(STANDARD_HEADER)
+                    for row in _iter_standard_rows(reader, indices):
+                        w.writerow(row)
+                        written += 1
+            if not written:
+                os.remove(tmp_path)
                 continue
-            with open(src_path, 'w', encoding='utf-8', newline='') as f:
-                w = csv.writer(f, delimiter=';')
-                w.writerows(out_rows)
+            os.replace(tmp_path, src_path)
             produced += 1
             outputs.append(src_path)
             if should_bootstrap_base:
-                with open(base_path, 'w', encoding='utf-8', newline='') as f:
-                    w = csv.writer(f, delimiter=';')
-                    w.writerows(out_rows)
+                _replace_with_copy(src_path, base_path)
                 outputs.append(base_path)
         except Exception as e:
             LOG.warn(f"normalize failed für {os.path.basename(src_path)}: {e}")
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
             continue
     return produced, outputs
 
@@ -139,13 +403,18 @@ def main():
     ap = argparse.ArgumentParser()
     ap.add_argument('--config', required=False, default='TKB-config.json')
     ap.add_argument('--dest', required=False, default='.')
+    ap.add_argument('--bench-timestamps', type=int, default=0, metavar='ROWS',
+                    help='Zeitstempel-Codec gegen strptime messen und beenden')
     args = ap.parse_args()
 
+    if args.bench_timestamps > 0:
+        benchmark_timestamp_codec(args.bench_timestamps)
+        return 0
+
     # Load config (optional)
     cfg = {}
     if args.config and os.path.isfile(args.config):
         try:
-            import json
             with open(args.config, 'r', encoding='utf-8') as f:
                 cfg = json.load(f)
         except Exception:
@@ -237,12 +506,7 @@ def polygon_ticker(symbol: str) -> str:
 
 def parse_timestamp(value: str) -> datetime:
     """Parse MT5 (YYYY.MM.DD HH:MM) or standard (YYYY-MM-DD HH:MM) timestamps."""
-    value = value.strip()
-    if not value:
-        raise ValueError("empty timestamp")
-    if '.' in value:
-        return datetime.strptime(value, '%Y.%m.%d %H:%M')
-    return datetime.strptime(value, '%Y-%m-%d %H:%M')
+    return minutes_to_datetime(parse_time_minutes(value))
 
 
 def read_first_time_csv(path: str) -> str:
@@ -262,21 +526,21 @@ def read_first_time_csv(path: str) -> str:
 
 def read_last_time_csv(path: str) -> str:
     try:
-        enc = detect_encoding(path)
-        with open(path, 'r', encoding=enc, newline='') as f:
-            r = csv.reader(f, delimiter=';')
-            last = ''
-            for i,row in enumerate(r):
-                if i == 0:
-                    continue
-                if row and row[0]:
-                    last = row[0]
-            return last
+        for line in iter_lines_reversed(path):
+            row = next(csv.reader([line], delimiter=';'), None)
+            if row and row[0]:
+                return row[0]
     except Exception:
         return ''
     return ''
 
 def merge_polygon_with_extend(dest_dir: str, symbol: str, tf: str, lookback_years: int, cutoff_days: int, api_key: str, rate_limit: int=5) -> Tuple[bool, bool]:
+    """Standard-CSV aus Bestand, Extend und Polygon auf das Fenster lookback_years bis jetzt bringen.
+
+    Der Vollaufbau schneidet exakt auf das Fenster. Der Append-Pfad lässt bis zu
+    APPEND_TRIM_SLACK_DAYS Tage älterer Historie am Dateianfang stehen (weiches Fenster);
+    erst danach wird neu aufgebaut. Rückgabe: (neue Zeilen?, Polygon genutzt?).
+    """
     std_path = os.path.join(dest_dir, f"{symbol}_{tf}.csv")
     ext_path = os.path.join(dest_dir, f"{symbol}_{tf}_extend.csv")
 
@@ -287,12 +551,9 @@ def merge_polygon_with_extend(dest_dir: str, symbol: str, tf: str, lookback_year
     delta = timeframe_delta(tf)
 
     extend_rows = load_csv_with_dt(ext_path)
-    extend_first = extend_rows[0][0] if extend_rows else None
+    extend_first = minutes_to_datetime(extend_rows[0][0]) if extend_rows else None
 
-    existing_rows = load_csv_with_dt(std_path)
-    existing_first = existing_rows[0][0] if existing_rows else None
-    existing_last = existing_rows[-1][0] if existing_rows else None
-    existing_dates = {dt for dt, _ in existing_rows}
+    existing_first, existing_last, existing_clean = csv_time_bounds(std_path)
 
     polygon_ranges: List[Tuple[datetime, datetime]] = []
 
@@ -350,53 +611,240 @@ def merge_polygon_with_extend(dest_dir: str, symbol: str, tf: str, lookback_year
     elif polygon_ranges:
         LOG.info(f"{symbol}_{tf}: Polygon skip – API nicht verfügbar")
 
-    combined: Dict[datetime, List[str]] = {}
+    start_min = datetime_to_minutes(required_start)
+    end_min = datetime_to_minutes(required_end)
+    cutoff_min = datetime_to_minutes(polygon_cutoff)
+    polygon_minutes = parse_time_column([row[0] for row in polygon_rows])
 
-    if polygon_rows:
-        for row in polygon_rows:
-            try:
-                dt = parse_timestamp(row[0])
-            except Exception:
-                continue
-            if dt < required_start or dt > required_end:
-                continue
-            combined[dt] = [dt.strftime('%Y-%m-%d %H:%M')] + list(row[1:6])
+    # Fast path: saubere Datei und alles Neue liegt hinter existing_last → nur anhängen
+    if existing_clean:
+        first_min = datetime_to_minutes(existing_first)
+        last_min = datetime_to_minutes(existing_last)
+        in_window = [m for m in polygon_minutes if m is not None and start_min <= m <= end_min]
+        head_ok = first_min >= start_min - APPEND_TRIM_SLACK_DAYS * 1440
+        if head_ok and all(m > last_min for m in in_window):
+            fresh: Dict[int, str] = {}
+            for minute, row in zip(polygon_minutes, polygon_rows):
+                if minute is not None and start_min <= minute <= end_min:
+                    fresh[minute] = row_payload(row[1:6])
+            overlap: List[Tuple[int, str]] = []
+            for minute, row in extend_rows:
+                if minute < cutoff_min or minute < start_min or minute > end_min:
+                    continue
+                if minute > last_min:
+                    fresh[minute] = row
+                else:
+                    overlap.append((minute, row))
+            appended = append_rows_if_unchanged(std_path, overlap, [(m, fresh[m]) for m in sorted(fresh)])
+            if appended is not None:
+                overhang = ''
+                if first_min < start_min:
+                    overhang = f", Fenster weich: ab {existing_first:%Y-%m-%d} statt {required_start:%Y-%m-%d}"
+                LOG.info(
+                    f"{symbol}_{tf}: Append gespeichert (+{appended} neu{overhang}, polygon={'yes' if polygon_used else 'no'})"
+                )
+                return appended > 0, polygon_used
+            LOG.info(f"{symbol}_{tf}: Append nicht möglich (Überlappung geändert) → Vollaufbau")
 
-    for dt, row in existing_rows:
-        if dt < required_start or dt > required_end:
-            continue
-        combined[dt] = row
+    # Vollaufbau: k-Wege-Merge der zeitlich sortierten Quellen direkt in die Zieldatei
+    polygon_sorted = sorted(
+        ((minute, row_payload(row[1:6])) for minute, row in zip(polygon_minutes, polygon_rows) if minute is not None),
+        key=lambda item: item[0],
+    )
 
-    for dt, row in extend_rows:
-        if dt < polygon_cutoff:
-            continue
-        if dt < required_start or dt > required_end:
-            continue
-        combined[dt] = row
+    def sources(existing_rows) -> List[Iterator[Tuple[int, int, str]]]:
+        return [
+            _ordered_unique([extend_rows], SOURCE_EXTEND, max(start_min, cutoff_min), end_min),
+            _ordered_unique(existing_rows, SOURCE_EXISTING, start_min, end_min),
+            _ordered_unique([polygon_sorted], SOURCE_POLYGON, start_min, end_min),
+        ]
+
+    has_existing = os.path.isfile(std_path)
+    try:
+        written, new_count = write_merged_sources(std_path, sources(iter_csv_chunks(std_path) if has_existing else []))
+    except UnsortedSourceError:
+        LOG.info(f"{symbol}_{tf}: Bestandsdatei nicht sortiert → sortiert eingelesen")
+        written, new_count = write_merged_sources(std_path, sources([load_csv_with_dt(std_path)]))
 
-    if not combined:
+    if not written:
         LOG.warn(f"{symbol}_{tf}: keine Daten verfügbar (Polygon + MT5 leer)")
         if os.path.isfile(std_path):
             os.remove(std_path)
+        remove_verified_marker(std_path)
         return False, polygon_used
 
-    sorted_dt = sorted(combined.keys())
-    with open(std_path, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.writer(f, delimiter=';')
-        writer.writerow(['Time','Open','High','Low','Close','Volume'])
-        for dt in sorted_dt:
-            writer.writerow(combined[dt])
-
-    new_dates = [dt for dt in sorted_dt if dt not in existing_dates]
-    action = 'Bootstrap' if not existing_rows else 'Update'
+    action = 'Bootstrap' if existing_last is None else 'Update'
     LOG.info(
-        f"{symbol}_{tf}: {action} gespeichert ({len(sorted_dt)} Zeilen, +{len(new_dates)} neu, polygon={'yes' if polygon_used else 'no'})"
+        f"{symbol}_{tf}: {action} gespeichert ({written} Zeilen, +{new_count} neu, polygon={'yes' if polygon_used else 'no'})"
     )
 
-    success = bool(new_dates)
+    success = bool(new_count)
     return success, polygon_used
 
-from datetime import timedelta
+# Append-Pfad: bis zu so viele Tage Historie vor required_start bleiben bewusst stehen.
+# Das Fenster ist damit weich – ein Vollaufbau schneidet exakt ab, das Append erst, wenn
+# der Überhang die Schwelle überschreitet (sonst würde jeder Tageslauf neu aufbauen).
+APPEND_TRIM_SLACK_DAYS = 30
+SCAN_BLOCK = 1 << 20
+VERIFIED_SUFFIX = '.verified'
+# Eine Datenzeile genau so, wie der Vollaufbau sie schreibt: Standard-Zeitstempel + 5 ungequotete Felder
+_ROW_HEAD = b'0000-00-00 00:00;'
+_DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+_NON_SKELETON = bytes(c for c in range(256) if c not in b';"\r\n')
+
+
+def csv_time_bounds(path: str) -> Tuple[Optional[datetime], Optional[datetime], bool]:
+    """Erster/letzter Zeitstempel und ob die Datei sauber ist (Standardformat, streng aufsteigend).
+
+    Saubere Dateien brauchen nur Kopf- und Tail-Read. Ob eine Datei sauber ist, sagt der
+    Verified-Marker (Größe, mtime_ns, letzter Zeitstempel); nur ohne passenden Marker wird
+    sie einmal komplett gescannt. Alle anderen werden komplett eingelesen, damit Min/Max
+    wie beim Vollaufbau stimmen.
+    """
+    if not os.path.isfile(path):
+        return None, None, False
+    if is_standard_csv(path):
+        first, last = read_first_time_csv(path), read_last_time_csv(path)
+        trusted = verified_marker_matches(path, last)
+        if trusted or standard_rows_increasing(path):
+            try:
+                bounds = parse_timestamp(first), parse_timestamp(last)
+            except ValueError:
+                bounds = None
+            if bounds is not None:
+                if not trusted:
+                    write_verified_marker(path, last)
+                return bounds[0], bounds[1], True
+    rows = load_csv_with_dt(path)
+    if not rows:
+        return None, None, False
+    return minutes_to_datetime(rows[0][0]), minutes_to_datetime(rows[-1][0]), False
+
+
+def standard_rows_increasing(path: str) -> bool:
+    """Alle Datenzeilen im Standardformat und Zeitstempel streng aufsteigend (keine Duplikate)?
+
+    Nur dann entspricht die Datei bereits dem Ergebnis eines Vollaufbaus und darf
+    verlängert werden. Standard-Zeitstempel sind lexikographisch geordnet, geprüft
+    wird daher blockweise per Byte-Vergleich, ohne Zeitstempel zu parsen.
+    """
+    previous = b''
+    with open(path, 'rb') as fb:
+        fb.readline()  # header
+        rest = b''
+        while True:
+            block = fb.read(SCAN_BLOCK)
+            data = rest + block
+            if block:
+                cut = data.rfind(b'\n') + 1
+                data, rest = data[:cut], data[cut:]
+            if data:
+                lines = data.split(b'\n')
+                if not lines[-1]:
+                    lines.pop()
+                # Gerüst aus Trennzeichen: genau fünf ';' je Zeile, keine Quotes, einheitliches Zeilenende
+                skeleton = (b';;;;;\r\n' if lines[0].endswith(b'\r') else b';;;;;\n') * len(lines)
+                if not data.endswith(b'\n'):
+                    skeleton = skeleton[:-1]
+                if data.translate(None, _NON_SKELETON) != skeleton:
+                    return False
+                heads = [line[:17] for line in lines]
+                if b''.join(heads).translate(_DIGITS_TO_ZERO) != _ROW_HEAD * len(heads):
+                    return False
+                if heads[0] <= previous or not all(map(bytes.__lt__, heads, heads[1:])):
+                    return False
+                previous = heads[-1]
+            if not block:
+                return True
+
+
+def write_verified_marker(path: str, last: str) -> None:
+    """Datei als sauber markieren: Stand (Größe, mtime_ns) und letzter Zeitstempel als Text."""
+    marker_path = path + VERIFIED_SUFFIX
+    try:
+        st = os.stat(path)
+        with open(marker_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'last': last}, f)
+        os.replace(marker_path + '.tmp', marker_path)
+    except OSError as exc:
+        # ohne Marker wird beim nächsten Lauf nur wieder gescannt
+        LOG.warn(f"Verified-Marker für {os.path.basename(path)} nicht geschrieben: {exc}")
+
+
+def verified_marker_matches(path: str, last: str) -> bool:
+    """Marker vorhanden und Datei seitdem unverändert (Größe, mtime_ns, letzter Zeitstempel)?"""
+    try:
+        with open(path + VERIFIED_SUFFIX, 'r', encoding='utf-8') as f:
+            marker = json.load(f)
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return False
+    return (
+        isinstance(marker, dict)
+        and marker.get('size') == st.st_size
+        and marker.get('mtime_ns') == st.st_mtime_ns
+        and marker.get('last') == last
+    )
+
+
+def remove_verified_marker(path: str) -> None:
+    try:
+        os.remove(path + VERIFIED_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def _line_terminator(path: str) -> str:
+    """Zeilenende der letzten vollständigen Zeile (CRLF oder LF), ohne Zeilenumbruch CRLF."""
+    with open(path, 'rb') as fb:
+        size = fb.seek(0, os.SEEK_END)
+        fb.seek(max(0, size - TAIL_BLOCK))
+        tail = fb.read()
+    cut = tail.rfind(b'\n')
+    if cut < 0:
+        return '\r\n'
+    return '\r\n' if tail[cut - 1:cut] == b'\r' else '\n'
+
+
+def append_rows_if_unchanged(
+    path: str,
+    overlap: List[Tuple[int, str]],
+    rows: List[Tuple[int, str]],
+) -> Optional[int]:
+    """Zeilen hinter dem Dateiende anhängen, wenn sich der überlappende Bereich nicht ändert.
+
+    Nur für saubere Dateien (csv_time_bounds). overlap sind Extend-Zeilen bis existing_last:
+    sie müssen mit dem Dateiende identisch sein, sonst None → Vollaufbau. Neue Zeilen
+    übernehmen das Zeilenende der Datei; danach wird der Verified-Marker fortgeschrieben.
+    """
+    if overlap:
+        expected = dict(overlap)
+        oldest = min(expected)
+        for line in iter_lines_reversed(path):
+            stamp, _, payload = line.partition(';')
+            try:
+                minute = parse_time_minutes(stamp)
+            except ValueError:
+                return None
+            if minute < oldest:
+                break
+            if minute in expected and payload != expected.pop(minute):
+                return None
+        if expected:
+            return None
+    if not rows:
+        return 0
+    with open(path, 'rb') as fb:
+        fb.seek(-1, os.SEEK_END)
+        needs_newline = fb.read(1) != b'\n'
+    eol = _line_terminator(path)
+    lines = [eol] if needs_newline else []
+    texts = format_time_column([m for m, _ in rows])
+    lines.extend(f"{text};{payload}{eol}" for text, (_, payload) in zip(texts, rows))
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(''.join(lines))
+    write_verified_marker(path, texts[-1])
+    return len(rows)
 
 
 def timeframe_delta(tf: str) -> timedelta:
@@ -416,29 +864,159 @@ def timeframe_delta(tf: str) -> timedelta:
     return timedelta(minutes=1)
 
 
-def load_csv_with_dt(path: str) -> List[Tuple[datetime, List[str]]]:
+_CSV_SPECIAL = re.compile(r'[;"\r\n]')
+
+
+def row_payload(fields) -> str:
+    """Open..Volume als 'O;H;L;C;V' – so, wie csv.writer die Felder schreiben würde."""
+    if not any(_CSV_SPECIAL.search(field) for field in fields):
+        return ';'.join(fields)
+    buf = io.StringIO()
+    csv.writer(buf, delimiter=';', lineterminator='').writerow(fields)
+    return buf.getvalue()
+
+
+def _split_line(line: str) -> Optional[Tuple[str, str]]:
+    """(Zeitstempel, Payload) einer CSV-Zeile; None für Zeilen, die csv.reader verworfen hätte."""
+    line = line.rstrip('\r\n')
+    if line.count(';') == 5 and '"' not in line:
+        stamp, _, payload = line.partition(';')
+    else:
+        raw = next(csv.reader([line], delimiter=';'), None)
+        if not raw or len(raw) < 6:
+            return None
+        stamp, payload = raw[0], row_payload(raw[1:6])
+    if not stamp.strip():
+        return None
+    return stamp, payload
+
+
+def _parsed_rows(parts: List[Tuple[str, str]]) -> List[Tuple[int, str]]:
+    minutes = parse_time_column([stamp for stamp, _ in parts])
+    return [(minute, payload) for minute, (_, payload) in zip(minutes, parts) if minute is not None]
+
+
+def iter_csv_chunks(path: str) -> Iterator[List[Tuple[int, str]]]:
+    """(Epoch-Minute, 'Open;High;Low;Close;Volume') in Dateireihenfolge, je Block eine Liste.
+
+    Zeilen werden als ein String pro Bar geführt statt als Feldliste – weniger Objekte,
+    deutlich weniger GC-Last bei Millionen M1-Zeilen.
+    """
+    enc = detect_encoding(path)
+    with open(path, 'r', encoding=enc, newline='') as f:
+        next(f, None)  # header skip
+        chunk: List[Tuple[str, str]] = []
+        for line in f:
+            parts = _split_line(line)
+            if parts is None:
+                continue
+            chunk.append(parts)
+            if len(chunk) >= NORMALIZE_CHUNK_ROWS:
+                yield _parsed_rows(chunk)
+                chunk = []
+        if chunk:
+            yield _parsed_rows(chunk)
+
+
+def load_csv_with_dt(path: str) -> List[Tuple[int, str]]:
+    """(Epoch-Minute, 'Open;High;Low;Close;Volume') je Zeile, nach Zeit sortiert."""
     if not os.path.isfile(path):
         return []
-    rows: List[Tuple[datetime, List[str]]] = []
     try:
-        enc = detect_encoding(path)
-        with open(path, 'r', encoding=enc, newline='') as f:
-            reader = csv.reader(f, delimiter=';')
-            next(reader, None)  # header skip
-            for raw in reader:
-                if not raw or len(raw) < 6 or not raw[0].strip():
-                    continue
-                try:
-                    dt = parse_timestamp(raw[0])
-                except Exception:
-                    continue
-                rows.append((dt, [dt.strftime('%Y-%m-%d %H:%M')] + raw[1:6]))
+        rows = [row for chunk in iter_csv_chunks(path) for row in chunk]
     except Exception:
         return []
     rows.sort(key=lambda x: x[0])
     return rows
 
 
+# Merge-Priorität bei gleichem Zeitstempel: kleinere Zahl gewinnt (wie bisher extend > existing > Polygon)
+SOURCE_EXTEND = 0
+SOURCE_EXISTING = 1
+SOURCE_POLYGON = 2
+
+
+class UnsortedSourceError(ValueError):
+    """Eine Merge-Quelle ist nicht aufsteigend nach Zeit sortiert."""
+
+
+def _ordered_unique(
+    chunks: Iterable[List[Tuple[int, str]]], source: int, lo: int, hi: int
+) -> Iterator[Tuple[int, int, str]]:
+    """Zeilen im Fenster [lo, hi] als (Minute, Quelle, Payload); doppelte Zeitstempel → letzter Eintrag."""
+    pending: Optional[Tuple[int, int, str]] = None
+    for chunk in chunks:
+        out = []
+        for minute, payload in chunk:
+            if minute < lo or minute > hi:
+                continue
+            if pending is not None:
+                if minute < pending[0]:
+                    raise UnsortedSourceError(f"Zeitstempel nicht aufsteigend ({minutes_to_datetime(minute):%Y-%m-%d %H:%M})")
+                if minute > pending[0]:
+                    out.append(pending)
+            pending = (minute, source, payload)
+        yield from out
+    if pending is not None:
+        yield pending
+
+
+def write_merged_sources(path: str, sources: List[Iterator[Tuple[int, int, str]]]) -> Tuple[int, int]:
+    """Sortierte Quellen per heapq.merge zusammenführen und nach path streamen (tmp + os.replace).
+
+    Pro Zeitstempel gewinnt die Quelle mit der kleinsten Priorität. Rückgabe: (Zeilen gesamt,
+    davon Zeitstempel ohne Eintrag in SOURCE_EXISTING). Bei 0 Zeilen bleibt path unverändert.
+    """
+    tmp_path = path + '.tmp'
+    written = new_count = 0
+    last_text = ''
+    batch: List[Tuple[int, str]] = []
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(';'.join(STANDARD_HEADER) + '\r\n')
+
+            def flush() -> None:
+                nonlocal last_text
+                if not batch:
+                    return
+                texts = format_time_column([minute for minute, _ in batch])
+                last_text = texts[-1]
+                f.write(''.join(f"{text};{payload}\r\n" for text, (_, payload) in zip(texts, batch)))
+                batch.clear()
+
+            current: Optional[Tuple[int, str]] = None
+            in_existing = False
+            # (Minute, Quelle) ist je Quelle eindeutig → Tupelvergleich erreicht die Payload nie
+            for minute, source, payload in heapq.merge(*sources):
+                if current is not None and minute == current[0]:
+                    in_existing = in_existing or source == SOURCE_EXISTING
+                    continue
+                if current is not None:
+                    batch.append(current)
+                    written += 1
+                    new_count += not in_existing
+                    if len(batch) >= NORMALIZE_CHUNK_ROWS:
+                        flush()
+                current = (minute, payload)
+                in_existing = source == SOURCE_EXISTING
+            if current is not None:
+                batch.append(current)
+                written += 1
+                new_count += not in_existing
+            flush()
+        if written:
+            os.replace(tmp_path, path)
+            # Ergebnis ist sortiert und eindeutig → nächster Lauf darf ohne Vollscan anhängen
+            write_verified_marker(path, last_text)
+        else:
+            os.remove(tmp_path)
+    except BaseException:
+        if os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written, new_count
+
+
 def verify_min_coverage(dest_dir: str, symbols: List[str], timeframes: List[str], lookback_years: int) -> None:
     """Check that each symbol/timeframe covers at least the configured lookback."""
     if not symbols or not timeframes or lookback_years <= 0:
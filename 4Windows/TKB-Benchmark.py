@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+"""
+TKB-Benchmark.py
+
+Offline-Benchmark der Train-KI-Bot Pipeline auf synthetischen OHLCV-Daten.
+
+Funktionen:
+  - erzeugt reproduzierbare H1/M15/M1-Serien im MT5-Exportformat
+    (FX-Wochenplan, Session-Profil, Vola-Cluster, Fat Tails, Gaps, Tick-Volumen)
+  - misst je Symbol CSV-Parsing, Sidecar, Features, Targets, Feature-Split, Fit, Walk-Forward,
+    Evaluate, Signale, simulate_trades, SL-Suche und Kalibrierung
+    (Wandzeit, CPU-Zeit, Peak-RSS; bestes Ergebnis aus --repeat Läufen)
+  - speichert jedes Ergebnis unter benchmark/results/, auf Wunsch als Baseline
+  - --compare meldet Stufen, die langsamer als Baseline + Toleranz sind (Exit-Code 1)
+  - --parity vergleicht simulate_trades mit der ursprünglichen iterrows-Schleife
+    (Trades, Wins, Profit, Trade-Tabelle je SL-Variante) und misst beide Laufzeiten
+  - --check-merge prüft den k-Wege-Merge von TKB-Data-Export mit Zufallsquellen
+    gegen den früheren Dict-Aufbau
+
+Kein Netzwerk, keine Telegram-/MT5-Zugriffe; Daten und Reports liegen nur unter benchmark/.
+
+Beispiel:
+  python3 TKB-Benchmark.py --months 12 --symbols 3 --save-baseline
+  python3 TKB-Benchmark.py --months 12 --symbols 3 --compare
+  python3 TKB-Benchmark.py --months 120 --symbols 26 --timeframes H1,M15,M1 --repeat 1
+  python3 TKB-Benchmark.py --parity --months 12
+  python3 TKB-Benchmark.py --check-merge 500
+  python3 TKB-Benchmark.py --compare benchmark/results/12m_3s_H1_seed7_20250101-120000.json
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+ROOT = Path(__file__).resolve().parent
+TRAIN_SCRIPT = ROOT / "Train-KI-Bot.py"
+EXPORT_SCRIPT = ROOT / "TKB-Data-Export.py"
+CONFIG_DEFAULT = ROOT / "TKB-config.json"
+BENCH_DEFAULT = ROOT / "benchmark"
+
+# Version erhöhen, wenn sich der Generator ändert – alte Datensätze werden dann nicht wiederverwendet
+GENERATOR_VERSION = 1
+TIMEFRAME_MINUTES = {"M1": 1, "M15": 15, "H1": 60}
+TRADING_MINUTES_PER_YEAR = 52 * 120 * 60
+
+# Relative Volatilität/Volumen je UTC-Stunde: ruhiges Asien, London ab 07, Overlap 12-16, NY bis 21
+SESSION_PROFILE = np.array([
+    0.55, 0.5, 0.5, 0.5, 0.55, 0.6, 0.75, 1.1, 1.35, 1.3, 1.2, 1.15,
+    1.35, 1.55, 1.6, 1.5, 1.3, 1.05, 0.9, 0.8, 0.7, 0.6, 0.55, 0.55,
+])
+
+SYNTHETIC_SYMBOL = {
+    "pip_size": 0.0001,
+    "min_lot": 0.01,
+    "max_lot": 50.0,
+    "volume_step": 0.01,
+    "quote_currency": "USD",
+    "base_currency": "EUR",
+    "margin_currency": "EUR",
+    "contract_size": 100000.0,
+    "asset_type": "FOREX",
+    "tp_settings": {"atr_multiplier": 1.0, "swing": False},
+}
+
+
+def load_pipeline():
+    """Train-KI-Bot.py als Modul laden (Dateiname mit Bindestrich, daher über importlib)."""
+    spec = importlib.util.spec_from_file_location("train_ki_bot", TRAIN_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module  # pickle/joblib finden Klassen nur über sys.modules
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_export():
+    """TKB-Data-Export.py als Modul laden (für --check-merge)."""
+    spec = importlib.util.spec_from_file_location("tkb_data_export", EXPORT_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ===== Synthetische Daten =====
+def trading_index(start: pd.Timestamp, months: int, minutes: int) -> pd.DatetimeIndex:
+    """Bars einer FX-Woche: Sonntag 22:00 bis Freitag 22:00 UTC."""
+    end = start + pd.DateOffset(months=months)
+    index = pd.date_range(start, end, freq=f"{minutes}min", inclusive="left")
+    weekday = index.dayofweek
+    hour = index.hour
+    closed = (weekday == 5) | ((weekday == 6) & (hour < 22)) | ((weekday == 4) & (hour >= 22))
+    return index[~closed]
+
+
+def _ar1(rng: np.random.Generator, n: int, half_life: float, stationary_sd: float) -> np.ndarray:
+    phi = 0.5 ** (1.0 / max(half_life, 1.0))
+    noise = rng.normal(0.0, stationary_sd * np.sqrt(1.0 - phi * phi), n)
+    return lfilter([1.0], [1.0, -phi], noise)
+
+
+def generate_ohlcv(
+    index: pd.DatetimeIndex,
+    minutes: int,
+    seed: int,
+    start_price: float = 1.1,
+    annual_vol: float = 0.08,
+) -> pd.DataFrame:
+    """Log-Preis mit stochastischer Vola (AR(1) auf log sigma), Trendphasen, t(5)-Schocks und Sprüngen."""
+    rng = np.random.default_rng(seed)
+    n = len(index)
+    bars_per_day = 24 * 60 / minutes
+    base_sigma = annual_vol / np.sqrt(TRADING_MINUTES_PER_YEAR / minutes)
+
+    session = SESSION_PROFILE[index.hour]
+    log_vol = _ar1(rng, n, half_life=3 * bars_per_day, stationary_sd=0.6)
+    sigma = base_sigma * session * np.exp(log_vol - 0.18)
+    # Trendphasen: über eine Halbwertszeit etwa halb so groß wie der Random-Walk-Anteil, unabhängig vom Timeframe
+    trend_bars = 15 * bars_per_day
+    drift = _ar1(rng, n, half_life=trend_bars, stationary_sd=0.5 / np.sqrt(trend_bars)) * base_sigma
+
+    shocks = rng.standard_t(5, n) / np.sqrt(5.0 / 3.0)
+    jumps = np.where(rng.random(n) < 1.0 / (20 * bars_per_day), rng.normal(0.0, 4.0, n), 0.0)
+    returns = drift + sigma * (shocks + jumps)
+
+    # Gaps nur an Handelspausen (Wochenöffnung)
+    gap_mask = np.r_[False, np.diff(index.asi8) > minutes * 60 * 10**9]
+    gaps = np.where(gap_mask, rng.normal(0.0, 0.3, n) * base_sigma * np.sqrt(bars_per_day), 0.0)
+
+    log_close = np.log(start_price) + np.cumsum(gaps + returns)
+    log_open = log_close - returns
+    wick = np.abs(rng.normal(0.0, 0.6, (2, n))) * sigma
+    open_ = np.exp(log_open)
+    close = np.exp(log_close)
+    high = np.maximum(open_, close) * np.exp(wick[0])
+    low = np.minimum(open_, close) * np.exp(-wick[1])
+    ticks = 40.0 * minutes * session * np.exp(0.5 * np.abs(shocks) + rng.normal(0.0, 0.3, n))
+    return pd.DataFrame(
+        {
+            "Open": open_.round(5),
+            "High": high.round(5),
+            "Low": low.round(5),
+            "Close": close.round(5),
+            "Volume": np.maximum(ticks.round(), 1).astype(np.int64),
+        },
+        index=pd.DatetimeIndex(index, name="Time"),
+    )
+
+
+def aggregate_ohlcv(frame: pd.DataFrame, minutes: int) -> pd.DataFrame:
+    grouped = frame.groupby(frame.index.floor(f"{minutes}min"))
+    out = pd.DataFrame({
+        "Open": grouped["Open"].first(),
+        "High": grouped["High"].max(),
+        "Low": grouped["Low"].min(),
+        "Close": grouped["Close"].last(),
+        "Volume": grouped["Volume"].sum(),
+    })
+    out.index.name = "Time"
+    return out
+
+
+def ensure_dataset(
+    data_dir: Path,
+    symbols: List[str],
+    timeframes: List[str],
+    months: int,
+    seed: int,
+) -> None:
+    """Fehlende CSVs erzeugen; alle Timeframes eines Symbols werden aus dem feinsten aggregiert."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    start = pd.Timestamp("2015-01-04 22:00")
+    finest = min(TIMEFRAME_MINUTES[tf] for tf in timeframes)
+    for number, symbol in enumerate(symbols):
+        missing = [tf for tf in timeframes if not (data_dir / f"{symbol}_{tf}.csv").exists()]
+        if not missing:
+            continue
+        started = time.perf_counter()
+        rng = np.random.default_rng(seed * 1000 + number)
+        base = generate_ohlcv(
+            trading_index(start, months, finest),
+            finest,
+            seed * 1000 + number,
+            start_price=float(rng.uniform(0.6, 1.8)),
+            annual_vol=float(rng.uniform(0.05, 0.14)),
+        )
+        for tf in missing:
+            minutes = TIMEFRAME_MINUTES[tf]
+            frame = base if minutes == finest else aggregate_ohlcv(base, minutes)
+            # Zeitstempel vorab formatieren: to_csv(date_format=...) ist bei Millionen M1-Zeilen der Flaschenhals
+            stamps = np.char.replace(np.datetime_as_string(frame.index.to_numpy(), unit="m"), "T", " ")
+            frame = frame.set_axis(pd.Index(stamps, name="Time"))
+            tmp_path = data_dir / f"{symbol}_{tf}.csv.tmp"
+            frame.to_csv(tmp_path, sep=";", float_format="%.5f")
+            os.replace(tmp_path, data_dir / f"{symbol}_{tf}.csv")
+        logging.info(
+            "%s: %s erzeugt (%d %s-Bars, %.1fs)",
+            symbol, "/".join(missing), len(base), f"M{finest}" if finest < 60 else "H1", time.perf_counter() - started,
+        )
+
+
+def build_config(base_config: Dict, symbols: List[str]) -> Dict:
+    config = json.loads(json.dumps(base_config))
+    config["symbols"] = {symbol: json.loads(json.dumps(SYNTHETIC_SYMBOL)) for symbol in symbols}
+    config.setdefault("exchange_rates", {}).setdefault("EUR/USD", 1.1)
+    config["telegram"] = {"enabled": False}
+    return config
+
+
+# ===== Messung =====
+def benchmark_symbol(tkb, symbol: str, data_dir: Path, work_dir: Path, config: Dict, settings, timeframes: List[str]):
+    """Eine Messrunde für ein Symbol; liefert StageTimer.stages oder None, wenn zu wenig Daten."""
+    timer = tkb.StageTimer()
+    for tf in timeframes:
+        shutil.rmtree(data_dir / tkb.CSV_SIDECAR_SUBDIR / f"{symbol}_{tf}", ignore_errors=True)
+        with timer.stage(f"csv_parse_{tf}"):
+            tkb.load_symbol_csv(symbol, tf, data_dir)
+        with timer.stage(f"csv_sidecar_{tf}"):
+            tkb.load_symbol_csv(symbol, tf, data_dir)
+
+    df = tkb.prepare_dataset(symbol, data_dir, settings, config, None, timer)
+    if df.empty or int((df["target"] != 0).sum()) < settings.min_positive:
+        logging.warning("%s: zu wenig Daten für die Pipeline, Symbol übersprungen", symbol)
+        return None
+    lot_size = tkb.calculate_lot_size(symbol, config)
+    sl_variants = tkb.get_sl_variants(config)
+    tp_value = tkb.get_symbol_tp_multiplier(config, symbol)
+    rules_cfg = config.get("rules", {})
+    min_trades = int(rules_cfg.get("min_trades", 50))
+    min_winrate = float(rules_cfg.get("min_winrate", 0.6))
+    _, period_days = tkb.get_reporting_period(config)
+
+    with timer.stage("split_features"):
+        X, y = tkb.split_features_target(df, symbol, config)
+    with timer.stage("fit"):
+        X_train, X_test, y_train, y_test = tkb.train_test_split(
+            X, y,
+            test_size=settings.test_size,
+            random_state=settings.random_state,
+            stratify=y if y.nunique() > 1 else None,
+        )
+        model, scaler = tkb.train_model(X_train, y_train)
+    with timer.stage("evaluate"):
+        tkb.evaluate_model(model, scaler, X_test, y_test, symbol, work_dir)
+    if tkb.get_walk_forward_settings(config)[0] > 0:
+        with timer.stage("walk_forward"):
+            tkb.run_walk_forward(df, X, y, settings, symbol, config, work_dir, lot_size, tp_value, sl_variants)
+    with timer.stage("signals"):
+        price_index = tkb.PriceRangeIndex.from_frame(df)
+        prob_buy, prob_sell = tkb.model_probabilities(model, scaler, X)
+        df_signals = tkb.apply_model_signals(df, prob_buy, prob_sell, settings.rule_threshold)
+    with timer.stage("simulate_trades"):
+        tkb.simulate_trades(
+            df_signals, symbol, config, lot_size, tp_value, sl_variants[0] if sl_variants else "atr2.0", price_index,
+        )
+    with timer.stage("sl_search"):
+        tkb.find_best_rule_parameters(
+            df_signals, symbol, config, lot_size, min_trades, min_winrate, period_days, tp_value, sl_variants,
+            tp_grid=tkb.get_tp_grid(config), reports_dir=work_dir, price_index=price_index,
+        )
+    with timer.stage("calibration"):
+        tkb.compute_intelligent_parameters(df_signals, config, symbol, price_index)
+    return timer.stages
+
+
+def summarize_runs(runs: List[Dict[str, Dict[str, Optional[float]]]]) -> Dict[str, Dict[str, Optional[float]]]:
+    """Bestes (kleinstes) Wall-Ergebnis je Stufe über alle Wiederholungen, dazu Median und Peak."""
+    stages: Dict[str, Dict[str, Optional[float]]] = {}
+    for name in runs[0]:
+        entries = [run[name] for run in runs if name in run]
+        best = min(entries, key=lambda entry: entry["wall_s"])
+        peaks = [entry["peak_rss_mb"] for entry in entries if entry["peak_rss_mb"] is not None]
+        stages[name] = {
+            "wall_s": best["wall_s"],
+            "wall_median_s": statistics.median(entry["wall_s"] for entry in entries),
+            "cpu_s": best["cpu_s"],
+            "peak_rss_mb": max(peaks) if peaks else None,
+        }
+    return stages
+
+
+def total_stages(per_symbol: Dict[str, Dict[str, Dict[str, Optional[float]]]]) -> Dict[str, Dict[str, Optional[float]]]:
+    totals: Dict[str, Dict[str, Optional[float]]] = {}
+    for stages in per_symbol.values():
+        for name, entry in stages.items():
+            row = totals.setdefault(name, {"wall_s": 0.0, "wall_median_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None})
+            for key in ("wall_s", "wall_median_s", "cpu_s"):
+                row[key] += entry[key]
+            if entry["peak_rss_mb"] is not None:
+                row["peak_rss_mb"] = max(row["peak_rss_mb"] or 0.0, entry["peak_rss_mb"])
+    return totals
+
+
+def environment_info() -> Dict[str, object]:
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmark(args, tkb, spec: Dict[str, object], spec_key: str, bench_dir: Path) -> Dict[str, object]:
+    base_config = json.loads(args.config.read_text(encoding="utf-8")) if args.config.exists() else {}
+    if not base_config:
+        logging.warning("%s nicht gefunden, benutze Pipeline-Defaults", args.config)
+    symbols = [f"SYN{number:03d}" for number in range(1, args.symbols + 1)]
+    config = build_config(base_config, symbols)
+    settings = tkb.extract_training_settings(config)
+    settings.feature_cache = False
+
+    data_dir = bench_dir / "data" / f"v{GENERATOR_VERSION}_{args.months}m_seed{args.seed}"
+    work_dir = bench_dir / "work"
+    ensure_dataset(data_dir, symbols, spec["timeframes"], args.months, args.seed)
+
+    per_symbol: Dict[str, Dict[str, Dict[str, Optional[float]]]] = {}
+    for symbol in symbols:
+        runs = []
+        for _ in range(args.repeat):
+            stages = benchmark_symbol(tkb, symbol, data_dir, work_dir, config, settings, spec["timeframes"])
+            if stages is None:
+                break
+            runs.append(stages)
+        if runs:
+            per_symbol[symbol] = summarize_runs(runs)
+            logging.info("%s gemessen (%d Läufe)", symbol, len(runs))
+
+    sections = {key: config.get(key) for key in tkb.TRAINING_CONFIG_SECTIONS}
+    return {
+        "created": pd.Timestamp.now().isoformat(),
+        "spec": spec,
+        "spec_key": spec_key,
+        "environment": environment_info(),
+        "code_sha1": tkb._file_digest(TRAIN_SCRIPT),
+        "config_sha1": hashlib.sha1(json.dumps(sections, sort_keys=True, default=str).encode("utf-8")).hexdigest(),
+        "stages": total_stages(per_symbol),
+        "symbols": per_symbol,
+    }
+
+
+# ===== Parität simulate_trades =====
+def _reference_tp_sl_prices(row, direction: int, tp_multiplier: float, sl_variant: str, resolve) -> Tuple[float, float]:
+    atr_value = max(row["atr"], 1e-6)
+    entry_price = row["Close"]
+    tp_price = entry_price + direction * tp_multiplier * atr_value
+
+    variant, value = resolve(sl_variant)
+    if variant.startswith("extrem"):
+        period = int(variant.replace("extrem", ""))
+        lowest_low = row.get(f"lowest_low_{period}")
+        highest_high = row.get(f"highest_high_{period}")
+        if lowest_low is None or highest_high is None:
+            return tp_price, entry_price - direction * value * atr_value
+        if direction > 0:
+            sl_price = lowest_low - value * atr_value
+        else:
+            sl_price = highest_high + value * atr_value
+        return tp_price, sl_price
+    sl_distance = value * atr_value
+    sl_price = entry_price - direction * sl_distance
+    return tp_price, sl_price
+
+
+def reference_simulate_trades(
+    tkb,
+    df: pd.DataFrame,
+    symbol: str,
+    config: Dict,
+    lot_size: float,
+    tp_multiplier: float,
+    sl_variant: str,
+) -> Tuple[int, int, float, pd.DataFrame]:
+    """Ursprüngliche iterrows-Schleife von simulate_trades, unverändert als Referenz für --parity."""
+    symbol_cfg = (config.get("symbols") or {}).get(symbol, {})
+    contract_size = float(symbol_cfg.get("contract_size", 100000.0))
+    quote_currency = symbol_cfg.get("quote_currency", config.get("account", {}).get("currency", "EUR"))
+    account_currency = config.get("account", {}).get("currency", "EUR")
+    exchange_rates = config.get("exchange_rates", {})
+
+    df = df.copy()
+    for period in (14,):
+        df[f"lowest_low_{period}"] = df["Low"].rolling(window=period, min_periods=1).min()
+        df[f"highest_high_{period}"] = df["High"].rolling(window=period, min_periods=1).max()
+
+    trades = []
+    signals_idx = df.index[df["signal"] != 0]
+    if len(signals_idx) == 0:
+        return 0, 0, 0.0, pd.DataFrame()
+
+    for idx in signals_idx:
+        entry_row = df.loc[idx]
+        entry_price = entry_row["Close"]
+        direction = int(np.sign(entry_row["signal"])) or 0
+        if direction == 0:
+            continue
+        tp_price, sl_price = _reference_tp_sl_prices(
+            entry_row, direction, tp_multiplier, sl_variant, tkb._resolve_sl_variant,
+        )
+
+        subsequent = df.loc[idx:]
+        exit_price = entry_price
+        result = 0
+        for _, row in subsequent.iterrows():
+            high = row["High"]
+            low = row["Low"]
+            if direction > 0:
+                if high >= tp_price:
+                    exit_price = tp_price
+                    result = 1
+                    break
+                if low <= sl_price:
+                    exit_price = sl_price
+                    result = -1
+                    break
+            else:
+                if low <= tp_price:
+                    exit_price = tp_price
+                    result = 1
+                    break
+                if high >= sl_price:
+                    exit_price = sl_price
+                    result = -1
+                    break
+        if result == 0:
+            exit_price = subsequent.iloc[-1]["Close"]
+
+        profit_quote = (exit_price - entry_price) * contract_size * lot_size * direction
+        profit_account = tkb.convert_currency(profit_quote, quote_currency, account_currency, exchange_rates)
+        trades.append({
+            "entry_time": idx,
+            "entry_price": entry_price,
+            "exit_price": exit_price,
+            "direction": direction,
+            "result": result,
+            "profit": profit_account,
+        })
+
+    trades_df = pd.DataFrame(trades)
+    if trades_df.empty:
+        return 0, 0, 0.0, trades_df
+
+    wins = int((trades_df["result"] == 1).sum())
+    total = len(trades_df)
+    total_profit = float(trades_df["profit"].sum())
+    return total, wins, total_profit, trades_df
+
+
+def _parity_mismatch(expected, actual) -> Optional[str]:
+    """Vergleicht (total, wins, profit, trades_df); liefert eine Beschreibung der ersten Abweichung."""
+    total, wins, profit, trades = expected
+    total_new, wins_new, profit_new, trades_new = actual
+    if (total, wins) != (total_new, wins_new):
+        return f"Trades/Wins {total}/{wins} vs. {total_new}/{wins_new}"
+    if not np.isclose(profit, profit_new, rtol=1e-9, atol=1e-6):
+        return f"Profit {profit:.6f} vs. {profit_new:.6f}"
+    if trades.empty and trades_new.empty:
+        return None
+    columns = list(trades.columns)
+    try:
+        pd.testing.assert_frame_equal(
+            trades.reset_index(drop=True),
+            trades_new[columns].reset_index(drop=True),
+            check_dtype=False,
+            check_index_type=False,
+            rtol=1e-9,
+            atol=1e-6,
+        )
+    except AssertionError as exc:
+        return f"trades_df: {str(exc).splitlines()[0]}"
+    return None
+
+
+def run_parity(args, tkb, bench_dir: Path) -> int:
+    """Alte und neue Trade-Simulation auf synthetischen H1-Daten vergleichen und beide Laufzeiten messen."""
+    base_config = json.loads(args.config.read_text(encoding="utf-8")) if args.config.exists() else {}
+    symbol = "SYN001"
+    config = build_config(base_config, [symbol])
+    settings = tkb.extract_training_settings(config)
+    settings.feature_cache = False
+    data_dir = bench_dir / "data" / f"v{GENERATOR_VERSION}_{args.months}m_seed{args.seed}"
+    ensure_dataset(data_dir, [symbol], ["H1"], args.months, args.seed)
+
+    df = tkb.prepare_dataset(symbol, data_dir, settings, config)
+    if df.empty or int((df["target"] != 0).sum()) < settings.min_positive:
+        print("Zu wenig Daten für den Paritätstest (--months erhöhen)")
+        return 2
+    X, y = tkb.split_features_target(df, symbol, config)
+    model, scaler = tkb.train_model(X, y)
+    prob_buy, prob_sell = tkb.model_probabilities(model, scaler, X)
+    df_signals = tkb.apply_model_signals(df, prob_buy, prob_sell, settings.rule_threshold)
+    # Die Referenzschleife ist O(Signale x Restbars) – auf die letzten Bars begrenzen
+    df_signals = df_signals.iloc[-args.parity_bars:] if args.parity_bars > 0 else df_signals
+    lot_size = tkb.calculate_lot_size(symbol, config)
+    tp_value = tkb.get_symbol_tp_multiplier(config, symbol)
+    signals = int((df_signals["signal"] != 0).sum())
+    print(f"Parität simulate_trades: {len(df_signals)} Bars, {signals} Signale, TP {tp_value}")
+
+    failures = 0
+    print(f"{'SL-Variante':<18} {'Trades':>7} {'Schleife s':>11} {'Vektor s':>9} {'Faktor':>8}  Status")
+    for sl_variant in tkb.get_sl_variants(config):
+        started = time.perf_counter()
+        expected = reference_simulate_trades(tkb, df_signals, symbol, config, lot_size, tp_value, sl_variant)
+        loop_s = time.perf_counter() - started
+        started = time.perf_counter()
+        actual = tkb.simulate_trades(df_signals, symbol, config, lot_size, tp_value, sl_variant)
+        vector_s = time.perf_counter() - started
+        mismatch = _parity_mismatch(expected, actual)
+        failures += mismatch is not None
+        print(
+            f"{sl_variant:<18} {expected[0]:>7} {loop_s:>11.3f} {vector_s:>9.4f} "
+            f"{loop_s / max(vector_s, 1e-9):>7.0f}x  {mismatch or 'ok'}"
+        )
+    if failures:
+        print(f"{failures} SL-Variante(n) weichen von der Referenz ab.")
+        return 1
+    print("Parität ok.")
+    return 0
+
+
+# ===== Merge-Check TKB-Data-Export =====
+def check_merge_sources(export, trials: int, seed: int, bench_dir: Path) -> int:
+    """k-Wege-Merge des Vollaufbaus gegen den früheren Dict-Aufbau prüfen.
+
+    Je Lauf zufällige, sortierte Polygon-/Bestand-/Extend-Quellen mit doppelten
+    Zeitstempeln und zufälligen Blockgrenzen; verglichen werden die geschriebene
+    Datei und (Zeilen, neue Zeilen). Exit-Code 1 bei Abweichung.
+    """
+    rng = np.random.default_rng(seed)
+    base = export.datetime_to_minutes(pd.Timestamp("2024-01-01").to_pydatetime())
+    work_dir = bench_dir / "merge_check"
+    work_dir.mkdir(parents=True, exist_ok=True)
+    path = str(work_dir / "merge.csv")
+    header = ";".join(export.STANDARD_HEADER) + "\r\n"
+
+    def chunked(items: List[Tuple[int, str]]):
+        pos = 0
+        while pos < len(items):
+            step = int(rng.integers(1, 9))
+            yield items[pos:pos + step]
+            pos += step
+
+    failures = 0
+    for trial in range(trials):
+        span = int(rng.choice([20, 500, 5000]))
+        start_min = base + int(rng.integers(0, span // 4 + 1))
+        end_min = base + span - int(rng.integers(0, span // 4 + 1))
+        extend_min = max(start_min, base + int(rng.integers(0, span + 1)))
+        rows = {}
+        for source in (export.SOURCE_POLYGON, export.SOURCE_EXISTING, export.SOURCE_EXTEND):
+            minutes = np.sort(base + rng.integers(0, span, int(rng.integers(0, 61)))).tolist()
+            rows[source] = [(m, f"{source};{m};{i};1;{int(rng.integers(0, 10))}") for i, m in enumerate(minutes)]
+
+        # Referenz: Dict-Aufbau wie vor dem k-Wege-Merge (Polygon → Bestand → Extend überschreiben)
+        combined: Dict[int, str] = {}
+        for minute, payload in rows[export.SOURCE_POLYGON] + rows[export.SOURCE_EXISTING]:
+            if start_min <= minute <= end_min:
+                combined[minute] = payload
+        for minute, payload in rows[export.SOURCE_EXTEND]:
+            if extend_min <= minute <= end_min:
+                combined[minute] = payload
+        existing = {m for m, _ in rows[export.SOURCE_EXISTING] if start_min <= m <= end_min}
+        keys = sorted(combined)
+        expected = header + "".join(
+            f"{text};{combined[m]}\r\n" for text, m in zip(export.format_time_column(keys), keys)
+        )
+
+        if os.path.isfile(path):
+            os.remove(path)
+        counts = export.write_merged_sources(path, [
+            export._ordered_unique(chunked(rows[export.SOURCE_EXTEND]), export.SOURCE_EXTEND, extend_min, end_min),
+            export._ordered_unique(chunked(rows[export.SOURCE_EXISTING]), export.SOURCE_EXISTING, start_min, end_min),
+            export._ordered_unique(chunked(rows[export.SOURCE_POLYGON]), export.SOURCE_POLYGON, start_min, end_min),
+        ])
+        actual = Path(path).read_bytes().decode("utf-8") if os.path.isfile(path) else None
+        expected_counts = (len(keys), len(set(keys) - existing))
+        if counts != expected_counts or actual != (expected if keys else None):
+            failures += 1
+            if counts != expected_counts:
+                print(f"Lauf {trial}: (Zeilen, neu) {counts} statt {expected_counts}")
+            else:
+                print(f"Lauf {trial}: Dateiinhalt weicht von der Referenz ab")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"Merge-Check: {trials} Läufe, {failures} Abweichungen")
+    return 1 if failures else 0
+
+
+# ===== Ausgabe & Vergleich =====
+def print_result(result: Dict[str, object]) -> None:
+    stages = result["stages"]
+    print(f"Benchmark {result['spec_key']} ({len(result['symbols'])} Symbole, {result['created']})")
+    if not stages:
+        print("Keine Stufen gemessen.")
+        return
+    total = sum(entry["wall_s"] for entry in stages.values()) or 1.0
+    print(f"{'Stufe':<18} {'Wall s':>9} {'Median s':>9} {'CPU s':>9} {'Anteil':>7} {'Peak MB':>8}")
+    for name, entry in sorted(stages.items(), key=lambda item: item[1]["wall_s"], reverse=True):
+        peak = f"{entry['peak_rss_mb']:.0f}" if entry["peak_rss_mb"] is not None else "-"
+        print(
+            f"{name:<18} {entry['wall_s']:>9.3f} {entry['wall_median_s']:>9.3f} {entry['cpu_s']:>9.3f} "
+            f"{entry['wall_s'] / total * 100:>6.1f}% {peak:>8}"
+        )
+
+
+def compare_results(
+    current: Dict[str, object],
+    baseline: Dict[str, object],
+    tolerance: float,
+    min_delta: float,
+) -> List[Tuple[str, str]]:
+    """Vergleicht die besten Wall-Zeiten je Stufe; liefert (Stufe, Meldung) für jede Regression."""
+    if current.get("spec") != baseline.get("spec"):
+        raise ValueError(f"Spezifikation weicht ab: {current.get('spec_key')} vs. Baseline {baseline.get('spec_key')}")
+    for key, label in (("environment", "Umgebung"), ("config_sha1", "Config"), ("code_sha1", "Train-KI-Bot.py")):
+        if current.get(key) != baseline.get(key):
+            print(f"Hinweis: {label} unterscheidet sich von der Baseline ({baseline.get('created')})")
+
+    regressions: List[Tuple[str, str]] = []
+    stages_now = current["stages"]
+    stages_base = baseline["stages"]
+    print(f"{'Stufe':<18} {'Baseline s':>10} {'Aktuell s':>10} {'Faktor':>7}  Status")
+    for name in list(stages_base) + [name for name in stages_now if name not in stages_base]:
+        base = stages_base.get(name)
+        now = stages_now.get(name)
+        if base is None or now is None:
+            base_text = "-" if base is None else f"{base['wall_s']:.3f}"
+            now_text = "-" if now is None else f"{now['wall_s']:.3f}"
+            print(f"{name:<18} {base_text:>10} {now_text:>10} {'-':>7}  {'neu' if base is None else 'fehlt'}")
+            continue
+        ratio = now["wall_s"] / base["wall_s"] if base["wall_s"] > 0 else float("inf")
+        slower = now["wall_s"] > base["wall_s"] * (1.0 + tolerance) and now["wall_s"] - base["wall_s"] > min_delta
+        faster = now["wall_s"] < base["wall_s"] / (1.0 + tolerance) and base["wall_s"] - now["wall_s"] > min_delta
+        status = "REGRESSION" if slower else ("schneller" if faster else "ok")
+        print(f"{name:<18} {base['wall_s']:>10.3f} {now['wall_s']:>10.3f} {ratio:>6.2f}x  {status}")
+        if slower:
+            regressions.append((name, f"{base['wall_s']:.3f}s → {now['wall_s']:.3f}s ({ratio:.2f}x)"))
+    return regressions
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Offline-Benchmark der Train-KI-Bot Pipeline")
+    ap.add_argument("--months", type=int, default=12, help="Historie je Symbol in Monaten (1-120)")
+    ap.add_argument("--symbols", type=int, default=3, help="Anzahl synthetischer Symbole (1-100)")
+    ap.add_argument("--timeframes", default="H1", help="Kommagetrennt aus H1,M15,M1 (H1 ist immer dabei)")
+    ap.add_argument("--repeat", type=int, default=3, help="Messläufe je Symbol, gewertet wird der schnellste")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--config", type=Path, default=CONFIG_DEFAULT, help="Basis-Config (Symbole werden ersetzt)")
+    ap.add_argument("--out-dir", type=Path, default=BENCH_DEFAULT)
+    ap.add_argument("--save-baseline", action="store_true", help="Ergebnis als Baseline für diese Spezifikation sichern")
+    ap.add_argument("--compare", nargs="?", const="", default=None, metavar="RESULT_JSON",
+                    help="Gegen die Baseline vergleichen (ohne Datei: vorher neu messen)")
+    ap.add_argument("--baseline", type=Path, default=None, help="Baseline-Datei (Default: benchmark/baseline_<spec>.json)")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="Erlaubte relative Verlangsamung je Stufe")
+    ap.add_argument("--min-delta", type=float, default=0.02, help="Absolute Mindestdifferenz in Sekunden")
+    ap.add_argument("--parity", action="store_true",
+                    help="simulate_trades gegen die alte iterrows-Schleife prüfen (Exit-Code 1 bei Abweichung)")
+    ap.add_argument("--parity-bars", type=int, default=3000, help="Letzte N Bars für --parity (0 = alle)")
+    ap.add_argument("--check-merge", type=int, default=0, metavar="TRIALS",
+                    help="k-Wege-Merge von TKB-Data-Export gegen den Dict-Aufbau prüfen (Exit-Code 1 bei Abweichung)")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    requested = args.timeframes.upper().split(",")
+    timeframes = [tf for tf in ("H1", "M15", "M1") if tf == "H1" or tf in requested]
+    if not 1 <= args.months <= 120:
+        ap.error("--months muss zwischen 1 und 120 liegen")
+    if not 1 <= args.symbols <= 100:
+        ap.error("--symbols muss zwischen 1 und 100 liegen")
+    spec = {
+        "months": args.months,
+        "symbols": args.symbols,
+        "timeframes": timeframes,
+        "seed": args.seed,
+        "repeat": max(1, args.repeat),
+        "generator": GENERATOR_VERSION,
+    }
+    args.repeat = spec["repeat"]
+    spec_key = f"{args.months}m_{args.symbols}s_{'-'.join(timeframes)}_seed{args.seed}"
+
+    if args.parity:
+        return run_parity(args, load_pipeline(), args.out_dir)
+    if args.check_merge > 0:
+        return check_merge_sources(load_export(), args.check_merge, args.seed, args.out_dir)
+    if args.compare:
+        result = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+    else:
+        tkb = load_pipeline()
+        result = run_benchmark(args, tkb, spec, spec_key, args.out_dir)
+        results_dir = args.out_dir / "results"
+        results_dir.mkdir(parents=True, exist_ok=True)
+        result_path = results_dir / f"{spec_key}_{pd.Timestamp.now():%Y%m%d-%H%M%S}.json"
+        result_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print_result(result)
+        print(f"Ergebnis gespeichert: {result_path}")
+    baseline_path = args.baseline or args.out_dir / f"baseline_{result['spec_key']}.json"
+    if args.save_baseline and not args.compare:
+        shutil.copyfile(result_path, baseline_path)
+        print(f"Baseline gespeichert: {baseline_path}")
+
+    if args.compare is None:
+        return 0
+    if not baseline_path.exists():
+        print(f"Keine Baseline gefunden: {baseline_path} (erst mit --save-baseline anlegen)")
+        return 2
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    try:
+        regressions = compare_results(result, baseline, args.tolerance, args.min_delta)
+    except ValueError as exc:
+        print(f"Vergleich nicht möglich: {exc}")
+        return 2
+    if regressions:
+        print(f"{len(regressions)} Regression(en) über {args.tolerance * 100:.0f}% Toleranz:")
+        for name, message in regressions:
+            print(f"  {name}: {message}")
+        return 1
+    print("Keine Regressionen.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,18 +4,38 @@ Sharrow ML-Pipeline (Refactor 2025-09)
 """
 
 import argparse
+import hashlib
+import heapq
+import io
 import json
 import logging
+import multiprocessing
+import os
+import sys
 import time
-from dataclasses import dataclass
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, fields
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 try:
     import requests  # Telegram Versand
 except Exception:  # pragma: no cover
     requests = None
 
+try:
+    import resource  # Peak-RSS (nur Unix)
+except Exception:  # pragma: no cover
+    resource = None
+
+try:
+    import pyarrow  # optionaler schneller CSV-Parser
+except Exception:  # pragma: no cover
+    pyarrow = None
+
 import numpy as np
 import pandas as pd
 from sklearn.metrics import classification_report
@@ -43,10 +63,38 @@ CONFIG_DEFAULT = ROOT / "TKB-config.json"
 DATA_DEFAULT = ROOT
 RULES_DEFAULT = ROOT
 MODELS_DEFAULT = ROOT / "models"
+FEATURE_CACHE_SUBDIR = "feature_cache"
+CSV_SIDECAR_SUBDIR = "csv_sidecar"
 REPORTS_DEFAULT = ROOT / "reports"
+RUN_MANIFEST_NAME = "run_manifest.json"
+RUN_PROGRESS_NAME = "train_progress.json"
 LOG_PATH = ROOT / "TKB.log"
 WELLDONE_PATH = ROOT / "welldone.txt"
 
+CSV_COLUMNS = ["Time", "Open", "High", "Low", "Close", "Volume"]
+CSV_DTYPES = {
+    "Time": str,
+    "Open": np.float64,
+    "High": np.float64,
+    "Low": np.float64,
+    "Close": np.float64,
+    "Volume": np.float64,
+}
+CSV_TIME_FORMAT = "%Y-%m-%d %H:%M"
+CSV_SIDECAR_VERSION = 1
+
+# Cache-Format-Version; erhöhen, wenn sich die Feature-Berechnung ändert
+FEATURE_CACHE_VERSION = 2
+# Vorlauf-Bars zum Aufbau des Indikator-Zustands (EWM-Restfehler nach 512 Bars < 1e-16)
+FEATURE_WARMUP_BARS = 512
+COMPACT_INT_COLUMNS = ("target", "signal", "volume_spike")
+# Config-Blöcke, die das Trainingsergebnis eines Symbols beeinflussen (Run-Manifest)
+TRAINING_CONFIG_SECTIONS = (
+    "trade_active", "training", "train", "volume", "features", "quality", "quality_defaults",
+    "trend_strong", "breakrevert", "rules", "account", "exchange_rates", "reporting",
+)
+DEFAULT_TREE_PARAMS = {"max_depth": 6, "min_samples_leaf": 50, "class_weight": "balanced"}
+
 FEATURE_COLUMNS = [
     "stochastic",
     "adx",
@@ -84,6 +132,19 @@ def get_sl_variants(config: Dict) -> List[str]:
     return _ensure_str_list(rules_cfg.get("sl_variants"), ["atr1.5", "atr2.0", "extrem14+0.5atr", "extrem14+1.0atr"])
 
 
+def get_tp_grid(config: Dict) -> List[float]:
+    rules_cfg = config.get("rules", {})
+    grid: List[float] = []
+    for item in _ensure_str_list(rules_cfg.get("tp_grid"), ["0.5", "1.0", "1.5", "2.0", "2.5", "3.0"]):
+        try:
+            value = float(item)
+        except ValueError:
+            continue
+        if value > 0:
+            grid.append(value)
+    return sorted(set(grid))
+
+
 def build_basic_rule_info(
     lot_size: float,
     sl_variants: List[str],
@@ -183,6 +244,31 @@ def setup_logging() -> None:
     )
 
 
+def init_worker_logging(log_queue) -> None:
+    """Worker-Prozesse reichen ihre Log-Records an den Hauptprozess (TKB.log) weiter."""
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+
+
+# Anzahl paralleler Symbol-Prozesse, im Pool-Worker per init_symbol_worker gesetzt
+POOL_WORKERS = 1
+
+
+def init_symbol_worker(log_queue, pool_workers: int) -> None:
+    """Initializer der Symbol-Prozesse: Logging weiterreichen, Pool-Größe für Thread-Defaults merken."""
+    global POOL_WORKERS
+    init_worker_logging(log_queue)
+    POOL_WORKERS = max(1, pool_workers)
+
+
+def fit_thread_count(configured: int) -> int:
+    """Threads für parallele Baum-Fits: Config-Wert, sonst die Kerne geteilt durch die Symbol-Prozesse."""
+    if configured > 0:
+        return configured
+    return max(1, (os.cpu_count() or 1) // POOL_WORKERS)
+
+
 # ===== Konfigurationsobjekte =====
 @dataclass
 class TrainingSettings:
@@ -194,6 +280,8 @@ class TrainingSettings:
     volume_window: int = 20
     volume_spike: float = 1.8
     rule_threshold: float = 0.55
+    feature_cache: bool = True
+    compact_memory: bool = False
 
 
 def load_config(path: Path) -> Dict:
@@ -221,47 +309,247 @@ def extract_training_settings(config: Dict) -> TrainingSettings:
         volume_window=int(volume_cfg.get("window", 20)),
         volume_spike=float(volume_cfg.get("spike_threshold", 1.8)),
         rule_threshold=float(training_cfg.get("rule_threshold", 0.55)),
+        feature_cache=bool(training_cfg.get("feature_cache", True)),
+        compact_memory=bool(training_cfg.get("compact_memory", False)),
     )
 
 
+def reset_peak_rss() -> None:
+    """Setzt den Peak-RSS-Zähler des Prozesses zurück (Linux), damit er pro Symbol gilt."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak-RSS des Prozesses in MB (VmHWM bzw. ru_maxrss), None wenn nicht ermittelbar."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+    return None
+
+
+class StageTimer:
+    """Wandzeit, CPU-Zeit und Peak-RSS je Trainingsstufe; mehrfach betretene Stufen werden aufsummiert."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Optional[float]]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        reset_peak_rss()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None})
+            entry["wall_s"] += time.perf_counter() - wall_start
+            entry["cpu_s"] += time.process_time() - cpu_start
+            peak = peak_rss_mb()
+            if peak is not None:
+                entry["peak_rss_mb"] = max(entry["peak_rss_mb"] or 0.0, peak)
+
+    def peak_mb(self) -> Optional[float]:
+        peaks = [entry["peak_rss_mb"] for entry in self.stages.values() if entry["peak_rss_mb"] is not None]
+        return max(peaks) if peaks else None
+
+
 # ===== Daten laden =====
+def _read_price_csv(source, **options) -> pd.DataFrame:
+    options = dict({"sep": ";", "usecols": CSV_COLUMNS, "dtype": CSV_DTYPES}, **options)
+    if pyarrow is not None:
+        # Arrow erkennt den Zeitstempel selbst – schneller als String + to_datetime
+        arrow_dtypes = {col: dtype for col, dtype in options["dtype"].items() if col != "Time"}
+        try:
+            return pd.read_csv(source, engine="pyarrow", **dict(options, dtype=arrow_dtypes))
+        except Exception:
+            if hasattr(source, "seek"):
+                source.seek(0)
+    return pd.read_csv(source, encoding="utf-8", encoding_errors="replace", **options)
+
+
+def _load_csv_sidecar(sidecar_dir: Path, csv_stat: os.stat_result) -> Optional[pd.DataFrame]:
+    manifest_path = sidecar_dir / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if (
+            manifest.get("version") != CSV_SIDECAR_VERSION
+            or manifest.get("csv_size") != csv_stat.st_size
+            or manifest.get("csv_mtime_ns") != csv_stat.st_mtime_ns
+        ):
+            return None
+        index = np.load(sidecar_dir / "Time.npy", mmap_mode="r")
+        columns = {col: np.load(sidecar_dir / f"{col}.npy", mmap_mode="r") for col in manifest["columns"]}
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(index, name="Time"))
+    except Exception as exc:
+        logging.warning("CSV-Sidecar %s unlesbar (%s), lese CSV", sidecar_dir.name, exc)
+        return None
+
+
+def _write_csv_sidecar(sidecar_dir: Path, df: pd.DataFrame, csv_stat: os.stat_result) -> None:
+    try:
+        sidecar_dir.mkdir(parents=True, exist_ok=True)
+        np.save(sidecar_dir / "Time.npy", df.index.to_numpy())
+        for col in df.columns:
+            np.save(sidecar_dir / f"{col}.npy", df[col].to_numpy())
+        manifest = {
+            "version": CSV_SIDECAR_VERSION,
+            "csv_size": csv_stat.st_size,
+            "csv_mtime_ns": csv_stat.st_mtime_ns,
+            "rows": int(len(df)),
+            "columns": [str(col) for col in df.columns],
+        }
+        tmp_path = sidecar_dir / "manifest.json.tmp"
+        tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp_path, sidecar_dir / "manifest.json")
+    except Exception as exc:
+        logging.warning("CSV-Sidecar %s nicht geschrieben (%s)", sidecar_dir.name, exc)
+
+
 def load_symbol_csv(symbol: str, timeframe: str, root: Path) -> pd.DataFrame:
     file_path = root / f"{symbol}_{timeframe}.csv"
     if not file_path.exists():
         logging.warning("%s fehlt, überspringe", file_path.name)
         return pd.DataFrame()
+    csv_stat = file_path.stat()
+    sidecar_dir = root / CSV_SIDECAR_SUBDIR / f"{symbol}_{timeframe}"
+    df = _load_csv_sidecar(sidecar_dir, csv_stat)
+    if df is not None:
+        return df
     try:
-        df = pd.read_csv(file_path, sep=';', encoding='utf-8')
-    except UnicodeDecodeError:
-        df = pd.read_csv(file_path, sep=';', encoding='latin1')
+        df = _read_price_csv(file_path)
+    except ValueError as exc:
+        logging.error("%s hat ungültige Spalten (%s)", file_path.name, exc)
+        return pd.DataFrame()
+    df = _index_symbol_frame(df, file_path.name)
+    if not df.empty:
+        _write_csv_sidecar(sidecar_dir, df, csv_stat)
+    return df
+
+
+def _index_symbol_frame(df: pd.DataFrame, name: str) -> pd.DataFrame:
     required_cols = {"Time", "Open", "High", "Low", "Close", "Volume"}
     if not required_cols.issubset(df.columns):
-        logging.error("%s hat ungültige Spalten", file_path.name)
+        logging.error("%s hat ungültige Spalten", name)
         return pd.DataFrame()
-    df["Time"] = pd.to_datetime(df["Time"], errors='coerce')
+    if pd.api.types.is_datetime64_any_dtype(df["Time"]):
+        times = df["Time"].astype("datetime64[us]")
+    else:
+        times = pd.to_datetime(df["Time"], format=CSV_TIME_FORMAT, errors='coerce')
+        unparsed = times.isna() & df["Time"].notna()
+        if unparsed.any():
+            times[unparsed] = pd.to_datetime(df.loc[unparsed, "Time"], errors='coerce')
+    df["Time"] = times
     df.dropna(subset=["Time"], inplace=True)
     df.sort_values("Time", inplace=True)
     df.set_index("Time", inplace=True)
     return df
 
 
-def add_volume_features(df: pd.DataFrame, settings: TrainingSettings) -> pd.DataFrame:
-    if df.empty:
-        return df
-    window = settings.volume_window
-    ratio_threshold = settings.volume_spike
-    volume = df["Volume"].astype(float)
-    sma = volume.rolling(window=window, min_periods=1).mean()
-    df["volume_ratio"] = (volume / sma.replace(0, np.nan)).fillna(1.0)
-    df["volume_spike"] = (df["volume_ratio"] >= ratio_threshold).astype(int)
-    df["volume_delta"] = volume.diff().fillna(0)
-    return df
+# ===== Feature-Graph =====
+FEATURE_PERIOD_DEFAULTS = {"stoch_k": 14, "stoch_d": 3, "stoch_slow": 3, "adx": 14, "atr": 14}
+BREAKREVERT_LOOKBACK = 24
+
+FEATURE_NODES: Dict[str, Tuple[Tuple[str, ...], Callable]] = {}
+
+
+def get_feature_periods(config: Optional[Dict]) -> Dict[str, int]:
+    """Indikator-Perioden aus dem features-Block der Config (fehlende/ungültige → Default)."""
+    features_cfg = (config or {}).get("features") or {}
+    periods = dict(FEATURE_PERIOD_DEFAULTS)
+    for key, default in FEATURE_PERIOD_DEFAULTS.items():
+        try:
+            value = int(features_cfg.get(key, default))
+        except (TypeError, ValueError):
+            logging.warning("features.%s ungültig, verwende %d", key, default)
+            continue
+        periods[key] = value if value >= 1 else default
+    return periods
 
 
-def _true_range(df: pd.DataFrame) -> pd.Series:
-    high = df["High"]
-    low = df["Low"]
-    close = df["Close"]
+def feature_params(settings: Optional[TrainingSettings] = None, config: Optional[Dict] = None) -> Dict[str, float]:
+    settings = settings or TrainingSettings()
+    return dict(
+        get_feature_periods(config),
+        volume_window=settings.volume_window,
+        volume_spike=settings.volume_spike,
+        lookback=BREAKREVERT_LOOKBACK,
+    )
+
+
+def feature_node(name: str, *inputs: str):
+    """Registriert einen Graph-Knoten: name = func(params, *inputs)."""
+    def register(func: Callable) -> Callable:
+        FEATURE_NODES[name] = (inputs, func)
+        return func
+    return register
+
+
+class FeatureGraph:
+    """Memoisierte Feature-Knoten auf einem DataFrame: jeder Zwischenwert wird höchstens einmal berechnet.
+
+    Namen ohne registrierten Knoten werden als Rohspalte aus dem DataFrame gelesen.
+    """
+
+    def __init__(self, df: pd.DataFrame, params: Dict[str, float]) -> None:
+        self.df = df
+        self.params = params
+        self._values: Dict[str, object] = {}
+
+    def __getitem__(self, name: str):
+        if name in self._values:
+            return self._values[name]
+        if name not in FEATURE_NODES:
+            return self.df[name]
+        inputs, func = FEATURE_NODES[name]
+        value = func(self.params, *(self[dep] for dep in inputs))
+        self._values[name] = value
+        return value
+
+
+@feature_node("volume", "Volume")
+def _node_volume(params, volume):
+    return volume.astype(float)
+
+
+@feature_node("volume_ratio", "volume")
+def _node_volume_ratio(params, volume):
+    sma = volume.rolling(window=params["volume_window"], min_periods=1).mean()
+    return (volume / sma.replace(0, np.nan)).fillna(1.0)
+
+
+@feature_node("volume_spike", "volume_ratio")
+def _node_volume_spike(params, volume_ratio):
+    return (volume_ratio >= params["volume_spike"]).astype(int)
+
+
+@feature_node("volume_delta", "volume")
+def _node_volume_delta(params, volume):
+    return volume.diff().fillna(0)
+
+
+@feature_node("return_1", "Close")
+def _node_return_1(params, close):
+    return close.pct_change().fillna(0)
+
+
+@feature_node("return_5", "Close")
+def _node_return_5(params, close):
+    return close.pct_change(5).fillna(0)
+
+
+@feature_node("true_range", "High", "Low", "Close")
+def _node_true_range(params, high, low, close):
     prev_close = close.shift(1)
     tr_components = pd.concat([
         high - low,
@@ -271,54 +559,142 @@ def _true_range(df: pd.DataFrame) -> pd.Series:
     return tr_components.max(axis=1)
 
 
-def _compute_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
-    tr = _true_range(df)
-    return tr.ewm(alpha=1 / period, adjust=False).mean()
+@feature_node("atr", "true_range")
+def _node_atr(params, true_range):
+    return true_range.ewm(alpha=1 / params["atr"], adjust=False).mean().fillna(0)
+
+
+@feature_node("lowest_low", "Low")
+def _node_lowest_low(params, low):
+    return low.rolling(window=params["stoch_k"], min_periods=1).min()
+
+
+@feature_node("highest_high", "High")
+def _node_highest_high(params, high):
+    return high.rolling(window=params["stoch_k"], min_periods=1).max()
+
+
+@feature_node("stochastic_k", "Close", "lowest_low", "highest_high")
+def _node_stochastic_k(params, close, lowest_low, highest_high):
+    denominator = (highest_high - lowest_low).replace(0, np.nan)
+    stoch_k = ((close - lowest_low) / denominator) * 100.0
+    return stoch_k.clip(lower=0, upper=100).bfill().fillna(50.0)
+
+
+@feature_node("stochastic_d", "stochastic_k")
+def _node_stochastic_d(params, stoch_k):
+    return stoch_k.rolling(window=params["stoch_d"], min_periods=1).mean()
 
 
-def add_price_features(df: pd.DataFrame) -> pd.DataFrame:
+@feature_node("stochastic", "stochastic_d")
+def _node_stochastic(params, stoch_d):
+    return stoch_d.rolling(window=params["stoch_slow"], min_periods=1).mean()
+
+
+@feature_node("raw_up_move", "High")
+def _node_raw_up_move(params, high):
+    return high.diff().clip(lower=0)
+
+
+@feature_node("raw_down_move", "Low")
+def _node_raw_down_move(params, low):
+    return (-low.diff()).clip(lower=0)
+
+
+@feature_node("up_move", "raw_up_move", "raw_down_move")
+def _node_up_move(params, up_move, down_move):
+    return up_move.where(up_move > down_move, 0.0)
+
+
+@feature_node("down_move", "raw_down_move", "up_move")
+def _node_down_move(params, down_move, up_move):
+    return down_move.where(down_move >= up_move, 0.0)
+
+
+@feature_node("atr_nonzero", "atr")
+def _node_atr_nonzero(params, atr):
+    return atr.replace(0, np.nan)
+
+
+@feature_node("plus_di", "up_move", "atr_nonzero")
+def _node_plus_di(params, up_move, atr):
+    return 100 * (up_move.ewm(alpha=1 / params["adx"], adjust=False).mean() / atr)
+
+
+@feature_node("minus_di", "down_move", "atr_nonzero")
+def _node_minus_di(params, down_move, atr):
+    return 100 * (down_move.ewm(alpha=1 / params["adx"], adjust=False).mean() / atr)
+
+
+@feature_node("adx", "plus_di", "minus_di")
+def _node_adx(params, plus_di, minus_di):
+    dx = (plus_di - minus_di).abs() / (plus_di + minus_di).replace(0, np.nan) * 100
+    return dx.ewm(alpha=1 / params["adx"], adjust=False).mean()
+
+
+@feature_node("weibull_prob", "Close")
+def _node_weibull_prob(params, close):
+    close = close.astype(float)
+    mean_price = close.rolling(window=params["lookback"], min_periods=1).mean().replace(0, np.nan)
+    normalized_price = (close / mean_price).clip(lower=0.01)
+    return weibull_min.cdf(normalized_price.fillna(1.0), 1.5, scale=1.0)
+
+
+@feature_node("significant_moves", "return_1")
+def _node_significant_moves(params, returns):
+    lookback = params["lookback"]
+    volatility = returns.rolling(window=lookback, min_periods=1).std().replace(0, np.nan).bfill().fillna(0.0001)
+    return (returns.abs() / volatility).clip(lower=0)
+
+
+@feature_node("poisson_prob", "significant_moves")
+def _node_poisson_prob(params, significant_moves):
+    lambda_param = significant_moves.rolling(window=params["lookback"], min_periods=1).mean().clip(lower=0.1)
+    return poisson.cdf(significant_moves, lambda_param)
+
+
+def add_volume_features(df: pd.DataFrame, settings: TrainingSettings, graph: Optional[FeatureGraph] = None) -> pd.DataFrame:
     if df.empty:
         return df
-    df["return_1"] = df["Close"].pct_change().fillna(0)
-    df["return_5"] = df["Close"].pct_change(5).fillna(0)
-    df["atr"] = _compute_atr(df).fillna(0)
+    graph = graph or FeatureGraph(df, feature_params(settings))
+    df["volume_ratio"] = graph["volume_ratio"]
+    df["volume_spike"] = graph["volume_spike"]
+    df["volume_delta"] = graph["volume_delta"]
     return df
 
 
-def add_indicator_features(df: pd.DataFrame, k_period: int = 14, d_period: int = 3, slowing: int = 3, adx_period: int = 14) -> pd.DataFrame:
+def add_price_features(df: pd.DataFrame, graph: Optional[FeatureGraph] = None) -> pd.DataFrame:
     if df.empty:
         return df
+    graph = graph or FeatureGraph(df, feature_params())
+    df["return_1"] = graph["return_1"]
+    df["return_5"] = graph["return_5"]
+    df["atr"] = graph["atr"]
+    return df
 
-    lowest_low = df["Low"].rolling(window=k_period, min_periods=1).min()
-    highest_high = df["High"].rolling(window=k_period, min_periods=1).max()
-    denominator = (highest_high - lowest_low).replace(0, np.nan)
-    stoch_k = ((df["Close"] - lowest_low) / denominator) * 100.0
-    stoch_k = stoch_k.clip(lower=0, upper=100).bfill().fillna(50.0)
-    stoch_d = stoch_k.rolling(window=d_period, min_periods=1).mean()
-    stoch_slow = stoch_d.rolling(window=slowing, min_periods=1).mean()
-
-    df["stochastic_k"] = stoch_k
-    df["stochastic_d"] = stoch_d
-    df["stochastic"] = stoch_slow
-
-    # ADX calculation
-    up_move = df["High"].diff().clip(lower=0)
-    down_move = (-df["Low"].diff()).clip(lower=0)
-    up_move = up_move.where(up_move > down_move, 0.0)
-    down_move = down_move.where(down_move >= up_move, 0.0)
-
-    tr = _true_range(df)
-    atr = df["atr"]
-    atr.replace(0, np.nan, inplace=True)
-
-    plus_di = 100 * (up_move.ewm(alpha=1 / adx_period, adjust=False).mean() / atr)
-    minus_di = 100 * (down_move.ewm(alpha=1 / adx_period, adjust=False).mean() / atr)
-    dx = (plus_di - minus_di).abs() / (plus_di + minus_di).replace(0, np.nan) * 100
-    adx = dx.ewm(alpha=1 / adx_period, adjust=False).mean()
 
-    df["plus_di"] = plus_di.fillna(0)
-    df["minus_di"] = minus_di.fillna(0)
-    df["adx"] = adx.fillna(0)
+def add_indicator_features(
+    df: pd.DataFrame,
+    k_period: int = 14,
+    d_period: int = 3,
+    slowing: int = 3,
+    adx_period: int = 14,
+    graph: Optional[FeatureGraph] = None,
+) -> pd.DataFrame:
+    if df.empty:
+        return df
+    if graph is None:
+        params = dict(feature_params(), stoch_k=k_period, stoch_d=d_period, stoch_slow=slowing, adx=adx_period)
+        graph = FeatureGraph(df, params)
+    if "atr" not in df.columns:
+        df["atr"] = graph["atr"]
+
+    df["stochastic_k"] = graph["stochastic_k"]
+    df["stochastic_d"] = graph["stochastic_d"]
+    df["stochastic"] = graph["stochastic"]
+    df["plus_di"] = graph["plus_di"].fillna(0)
+    df["minus_di"] = graph["minus_di"].fillna(0)
+    df["adx"] = graph["adx"].fillna(0)
 
     df.fillna(0, inplace=True)
     return df
@@ -337,6 +713,7 @@ def _calibrate_thresholds(
     defaults: Dict[str, float],
     config: Dict,
     symbol: str,
+    price_index: Optional["PriceRangeIndex"] = None,
 ) -> Dict[str, float]:
     result = {
         "method": "baseline",
@@ -350,8 +727,8 @@ def _calibrate_thresholds(
     if df_signals.empty:
         return result
 
-    signal_hits_buy = df_signals[df_signals["signal"] == 1].copy()
-    signal_hits_sell = df_signals[df_signals["signal"] == -1].copy()
+    signal_hits_buy = df_signals[df_signals["signal"] == 1]
+    signal_hits_sell = df_signals[df_signals["signal"] == -1]
     if signal_hits_buy.empty and signal_hits_sell.empty:
         return result
 
@@ -372,27 +749,30 @@ def _calibrate_thresholds(
     min_trades = int(config.get("quality", {}).get("min_calibration_trades", 120))
     min_winrate = float(config.get("quality", {}).get("min_calibration_winrate", 0.55))
 
-    def _evaluate(combo: Dict[str, float]) -> Tuple[float, float, int, float]:
-        gated = df_signals.copy()
-        buy_mask = gated["signal"] == 1
-        buy_mask &= gated["adx"] >= combo["adx_min"]
-        buy_mask &= gated["stochastic"] <= combo["stoch_buy_max"]
-        buy_mask &= gated["Volume"] >= combo["volume_min"]
-
-        sell_mask = gated["signal"] == -1
-        sell_mask &= gated["adx"] >= combo["adx_min"]
-        sell_mask &= gated["stochastic"] >= combo["stoch_sell_min"]
-        sell_mask &= gated["Volume"] >= combo["volume_min"]
-
-        gated.loc[~(buy_mask | sell_mask), "signal"] = 0
-
-        sl_variants = get_sl_variants(config)
-        tp_val = get_symbol_tp_multiplier(config, symbol)
-        sl_val = sl_variants[0] if sl_variants else "atr2.0"
+    # Das Gating blendet nur Signale aus, der TP/SL-Ausgang jedes Signals bleibt gleich:
+    # alle Kandidaten einmal simulieren und jede Kombination als Maske darüber auswerten.
+    sl_variants = get_sl_variants(config)
+    tp_val = get_symbol_tp_multiplier(config, symbol)
+    sl_val = sl_variants[0] if sl_variants else "atr2.0"
+    _, _, _, outcomes = simulate_trades(df_signals, symbol, config, lot_size, tp_val, sl_val, price_index)
+
+    candidates = df_signals[df_signals["signal"] != 0]
+    cand_signal = candidates["signal"].to_numpy()
+    cand_adx = candidates["adx"].to_numpy(dtype=float)
+    cand_stoch = candidates["stochastic"].to_numpy(dtype=float)
+    cand_volume = candidates["Volume"].to_numpy(dtype=float)
+    cand_won = outcomes["result"].to_numpy() == 1
+    cand_profit = outcomes["profit"].to_numpy(dtype=float)
 
-        total, wins, profit, _ = simulate_trades(
-            gated, symbol, config, lot_size, tp_val, sl_val
-        )
+    def _evaluate(combo: Dict[str, float]) -> Tuple[float, float, int, float]:
+        keep = (cand_adx >= combo["adx_min"]) & (cand_volume >= combo["volume_min"])
+        buy_mask = keep & (cand_signal == 1) & (cand_stoch <= combo["stoch_buy_max"])
+        sell_mask = keep & (cand_signal == -1) & (cand_stoch >= combo["stoch_sell_min"])
+        mask = buy_mask | sell_mask
+
+        total = int(mask.sum())
+        wins = int(cand_won[mask].sum())
+        profit = float(cand_profit[mask].sum())
         if total == 0:
             return 0.0, 0.0, 0, profit
         winrate = wins / total if total else 0.0
@@ -412,6 +792,12 @@ def _calibrate_thresholds(
     vol_cap = float(config.get("quality", {}).get("volume_cap", defaults["volume_min"] * 8))
 
     search_steps = [0.0, 0.05, -0.05, 0.10, -0.10, 0.15, -0.15]
+    steps_raw = config.get("quality", {}).get("search_steps")
+    if isinstance(steps_raw, list) and steps_raw:
+        try:
+            search_steps = [float(step) for step in steps_raw]
+        except (TypeError, ValueError):
+            logging.warning("%s: quality.search_steps ungültig, verwende Default", symbol)
     best_combo = baseline.copy()
     best_profit = -np.inf
     best_winrate = 0.0
@@ -545,10 +931,11 @@ def compute_intelligent_parameters(
     df_signals: pd.DataFrame,
     config: Dict,
     symbol: str,
+    price_index: Optional["PriceRangeIndex"] = None,
 ) -> Dict[str, float]:
     defaults = get_quality_defaults(config)
     try:
-        calibrated = _calibrate_thresholds(df_signals, defaults, config, symbol)
+        calibrated = _calibrate_thresholds(df_signals, defaults, config, symbol, price_index)
     except Exception as exc:
         logging.warning("%s: Calibration failed (%s), using defaults", symbol, exc)
         calibrated = {
@@ -601,30 +988,22 @@ def _calculate_breakrevert_thresholds(df_signals: pd.DataFrame, config: Dict) ->
     return result
 
 
-def add_breakrevert_features(df: pd.DataFrame, lookback: int = 24) -> pd.DataFrame:
+def add_breakrevert_features(df: pd.DataFrame, lookback: int = BREAKREVERT_LOOKBACK, graph: Optional[FeatureGraph] = None) -> pd.DataFrame:
     if df.empty:
         return df
-
-    close = df["Close"].astype(float)
-    mean_price = close.rolling(window=lookback, min_periods=1).mean().replace(0, np.nan)
-    normalized_price = (close / mean_price).clip(lower=0.01)
-    df["weibull_prob"] = weibull_min.cdf(normalized_price.fillna(1.0), 1.5, scale=1.0)
-
-    returns = close.pct_change().fillna(0)
-    volatility = returns.rolling(window=lookback, min_periods=1).std().replace(0, np.nan).bfill().fillna(0.0001)
-    significant_moves = (returns.abs() / volatility).clip(lower=0)
-    lambda_param = significant_moves.rolling(window=lookback, min_periods=1).mean().clip(lower=0.1)
-    df["poisson_prob"] = poisson.cdf(significant_moves, lambda_param)
-
+    graph = graph or FeatureGraph(df, dict(feature_params(), lookback=lookback))
+    df["weibull_prob"] = graph["weibull_prob"]
+    df["poisson_prob"] = graph["poisson_prob"]
     df["weibull_prob"] = df["weibull_prob"].fillna(0.5)
     df["poisson_prob"] = df["poisson_prob"].fillna(0.5)
     return df
 
 
 def normalize_features(features: pd.DataFrame, symbol: str = None, config: Dict = None) -> pd.DataFrame:
-    normalized = features.copy()
-    normalized["stochastic"] = (normalized["stochastic"] - 50.0) / 30.0
-    normalized["adx"] = (normalized["adx"] - 30.0) / 20.0
+    # Jede Spalte wird genau einmal neu angelegt, die Eingabe bleibt unverändert (kein Voll-Copy vorab)
+    normalized: Dict[str, pd.Series] = {}
+    normalized["stochastic"] = (features["stochastic"] - 50.0) / 30.0
+    normalized["adx"] = (features["adx"] - 30.0) / 20.0
 
     # SYMBOL-SPECIFIC ATR NORMALIZATION
     if symbol and config:
@@ -635,16 +1014,31 @@ def normalize_features(features: pd.DataFrame, symbol: str = None, config: Dict
         # ATR normalization based on pip_size
         # JPY pairs: pip_size=0.01, EUR/USD: pip_size=0.0001
         atr_scale = pip_size * 5000  # Adaptive scaling factor
-        normalized["atr"] = (normalized["atr"] - pip_size) / atr_scale
+        normalized["atr"] = (features["atr"] - pip_size) / atr_scale
     else:
         # FALLBACK: old hardcoded (for backward compatibility)
-        normalized["atr"] = (normalized["atr"] - 0.001) / 0.002
+        normalized["atr"] = (features["atr"] - 0.001) / 0.002
+
+    normalized["weibull_prob"] = (features["weibull_prob"] - 0.5) / 0.3
+    normalized["poisson_prob"] = (features["poisson_prob"] - 0.5) / 0.3
+    columns = {}
+    for col in features.columns:
+        values = np.asarray(normalized.get(col, features[col]))
+        columns[col] = np.where(np.isfinite(values), values, 0).astype(values.dtype, copy=False)
+    return pd.DataFrame(columns, index=features.index)
 
-    normalized["weibull_prob"] = (normalized["weibull_prob"] - 0.5) / 0.3
-    normalized["poisson_prob"] = (normalized["poisson_prob"] - 0.5) / 0.3
-    normalized.replace([np.inf, -np.inf], 0.0, inplace=True)
-    normalized.fillna(0.0, inplace=True)
-    return normalized
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Kompakt-Modus: float64 → float32, Target/Signal/Flags → int8 (neuer Frame, Spalte für Spalte)."""
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if col in COMPACT_INT_COLUMNS:
+            values = values.astype(np.int8)
+        elif values.dtype == np.float64:
+            values = values.astype(np.float32)
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
 
 
 
@@ -653,28 +1047,479 @@ def build_targets(df: pd.DataFrame, settings: TrainingSettings) -> pd.DataFrame:
     if df.empty:
         return df
     future_close = df["Close"].shift(-settings.hold_bars)
-    df["future_return"] = (future_close - df["Close"]) / df["Close"]
-    df["target"] = 0
-    df.loc[df["future_return"] >= settings.min_return, "target"] = 1
-    df.loc[df["future_return"] <= -settings.min_return, "target"] = -1
-    df.dropna(inplace=True)
-    df = df[df["target"] != 0]
-    return df
+    future_return = ((future_close - df["Close"]) / df["Close"]).to_numpy()
+    target = np.zeros(len(df), dtype=np.int64)
+    target[future_return >= settings.min_return] = 1
+    target[future_return <= -settings.min_return] = -1
+    df["future_return"] = future_return
+    df["target"] = target
+    # NaN-Zeilen und neutrale Targets in einem Schritt verwerfen (eine Kopie statt zwei)
+    keep = (target != 0) & df.notna().all(axis=1).to_numpy()
+    return df[keep]
+
+
+def build_feature_frame(data: pd.DataFrame, settings: TrainingSettings, config: Optional[Dict] = None) -> pd.DataFrame:
+    """Alle Features über einen gemeinsamen Graphen (geteilte Zwischenwerte, Perioden aus config["features"])."""
+    graph = FeatureGraph(data, feature_params(settings, config))
+    data = add_volume_features(data, settings, graph)
+    data = add_price_features(data, graph)
+    data = add_indicator_features(data, graph=graph)
+    data = add_breakrevert_features(data, graph=graph)
+    return data
 
 
-def prepare_dataset(symbol: str, data_root: Path, settings: TrainingSettings) -> pd.DataFrame:
-    data = load_symbol_csv(symbol, "H1", data_root)
-    if data.empty:
+# ===== Streaming-Indikatoren =====
+class EwmState:
+    """EWM-Akkumulator (adjust=False), rechnet Schritt für Schritt wie pandas ewm().mean()."""
+
+    def __init__(self, alpha: float, value: float = float("nan"), old_weight: float = 1.0) -> None:
+        self.alpha = alpha
+        self.value = value
+        self.old_weight = old_weight
+
+    def update(self, x: float) -> float:
+        if self.value == self.value:
+            self.old_weight *= 1.0 - self.alpha
+            if x == x:
+                if self.value != x:
+                    self.value = (self.old_weight * self.value + self.alpha * x) / (self.old_weight + self.alpha)
+                self.old_weight = 1.0
+        elif x == x:
+            self.value = x
+        return self.value
+
+
+def _window_mean(window: deque) -> float:
+    values = [v for v in window if v == v]
+    return sum(values) / len(values) if values else float("nan")
+
+
+def _nan_to(value: float, fallback: float) -> float:
+    return value if value == value else fallback
+
+
+class IndicatorState:
+    """Fortsetzbarer Zustand für Volumen-, Preis-, Indikator- und BreakRevert-Features.
+
+    update() verarbeitet nur die neuen Bars (O(N)) und liefert dieselben Werte wie
+    build_feature_frame(). Bars, deren Wert über bfill noch von künftigen Bars
+    abhängt (flache Stochastik-Range, Volatilität 0), bleiben offen und werden
+    beim nächsten update() mit ausgegeben.
+    """
+
+    def __init__(
+        self,
+        settings: TrainingSettings,
+        k_period: int = 14,
+        d_period: int = 3,
+        slowing: int = 3,
+        adx_period: int = 14,
+        atr_period: int = 14,
+        lookback: int = 24,
+    ) -> None:
+        self.params = {
+            "volume_window": settings.volume_window,
+            "volume_spike": settings.volume_spike,
+            "k_period": k_period,
+            "d_period": d_period,
+            "slowing": slowing,
+            "adx_period": adx_period,
+            "atr_period": atr_period,
+            "lookback": lookback,
+        }
+        # Kausale Größen (ändern sich nie rückwirkend)
+        self.volumes: deque = deque(maxlen=settings.volume_window)
+        self.closes: deque = deque(maxlen=5)
+        self.prev_high = float("nan")
+        self.prev_low = float("nan")
+        self.atr = EwmState(1 / atr_period)
+        self.plus_dm = EwmState(1 / adx_period)
+        self.minus_dm = EwmState(1 / adx_period)
+        self.adx = EwmState(1 / adx_period)
+        self.lows: deque = deque(maxlen=k_period)
+        self.highs: deque = deque(maxlen=k_period)
+        self.close_window: deque = deque(maxlen=lookback)
+        self.return_window: deque = deque(maxlen=lookback)
+        # Größen hinter bfill, Stand vor den offenen Bars
+        self.k_window: deque = deque(maxlen=d_period)
+        self.d_window: deque = deque(maxlen=slowing)
+        self.move_window: deque = deque(maxlen=lookback)
+        self.open_rows: List[Dict[str, object]] = []
+
+    @classmethod
+    def from_history(
+        cls,
+        raw: pd.DataFrame,
+        settings: TrainingSettings,
+        periods: Optional[Dict[str, int]] = None,
+    ) -> "IndicatorState":
+        """Zustand aus den letzten FEATURE_WARMUP_BARS Bars aufbauen (EWM-Restfehler < 1e-16)."""
+        periods = periods or FEATURE_PERIOD_DEFAULTS
+        state = cls(
+            settings,
+            k_period=periods["stoch_k"],
+            d_period=periods["stoch_d"],
+            slowing=periods["stoch_slow"],
+            adx_period=periods["adx"],
+            atr_period=periods["atr"],
+        )
+        state.update(raw.iloc[-FEATURE_WARMUP_BARS:])
+        return state
+
+    def _step(self, time_value, high: float, low: float, close: float, volume: float) -> Dict[str, object]:
+        volume_spike = float(self.params["volume_spike"])
+        prev_volume = self.volumes[-1] if self.volumes else float("nan")
+        self.volumes.append(volume)
+        sma = _window_mean(self.volumes)
+        ratio = _nan_to(np.float64(volume) / sma if sma != 0 else float("nan"), 1.0)
+
+        prev_close = self.closes[-1] if self.closes else float("nan")
+        close_5 = self.closes[0] if len(self.closes) == 5 else float("nan")
+        self.closes.append(close)
+        return_1 = _nan_to(np.float64(close) / prev_close - 1, 0.0)
+        return_5 = _nan_to(np.float64(close) / close_5 - 1, 0.0)
+
+        if prev_close == prev_close:
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        else:
+            true_range = high - low
+        atr = _nan_to(self.atr.update(true_range), 0.0)
+
+        self.lows.append(low)
+        self.highs.append(high)
+        lowest_low = min(self.lows)
+        highest_high = max(self.highs)
+        denominator = highest_high - lowest_low
+        raw_k = (close - lowest_low) / denominator * 100.0 if denominator != 0 else float("nan")
+        raw_k = min(max(raw_k, 0.0), 100.0)
+
+        up_move = max(high - self.prev_high, 0.0)
+        down_move = max(self.prev_low - low, 0.0)
+        self.prev_high, self.prev_low = high, low
+        up_move = up_move if up_move > down_move else 0.0
+        down_move = down_move if down_move >= up_move else 0.0
+        atr_nz = atr if atr != 0 else float("nan")
+        plus_di = 100 * (np.float64(self.plus_dm.update(up_move)) / atr_nz)
+        minus_di = 100 * (np.float64(self.minus_dm.update(down_move)) / atr_nz)
+        di_sum = plus_di + minus_di
+        dx = abs(plus_di - minus_di) / di_sum * 100 if di_sum != 0 else float("nan")
+        adx = self.adx.update(dx)
+
+        self.close_window.append(close)
+        mean_price = _window_mean(self.close_window)
+        normalized = np.float64(close) / mean_price if mean_price != 0 else float("nan")
+        normalized = _nan_to(max(normalized, 0.01), 1.0)
+
+        self.return_window.append(return_1)
+        if len(self.return_window) > 1:
+            volatility = float(np.std(np.fromiter(self.return_window, dtype=float), ddof=1))
+        else:
+            volatility = float("nan")
+        if volatility == 0:
+            volatility = float("nan")
+
+        return {
+            "Time": time_value,
+            "volume_ratio": float(ratio),
+            "volume_spike": int(ratio >= volume_spike),
+            "volume_delta": _nan_to(volume - prev_volume, 0.0),
+            "return_1": float(return_1),
+            "return_5": float(return_5),
+            "atr": float(atr),
+            "raw_k": float(raw_k),
+            "plus_di": _nan_to(float(plus_di), 0.0),
+            "minus_di": _nan_to(float(minus_di), 0.0),
+            "adx": _nan_to(float(adx), 0.0),
+            "normalized_price": float(normalized),
+            "raw_volatility": volatility,
+        }
+
+    def update(self, bars: pd.DataFrame) -> pd.DataFrame:
+        """Neue Bars anhängen; Rückgabe: Feature-Zeilen der offenen und der neuen Bars."""
+        rows = list(self.open_rows)
+        for time_value, high, low, close, volume in zip(
+            bars.index,
+            bars["High"].to_numpy(dtype=float),
+            bars["Low"].to_numpy(dtype=float),
+            bars["Close"].to_numpy(dtype=float),
+            bars["Volume"].to_numpy(dtype=float),
+        ):
+            rows.append(self._step(time_value, float(high), float(low), float(close), float(volume)))
+        if not rows:
+            return pd.DataFrame()
+
+        # bfill innerhalb der Bars; unaufgelöste Bars am Ende bleiben offen
+        stoch_k = [float("nan")] * len(rows)
+        volatility = [float("nan")] * len(rows)
+        next_k = next_vol = float("nan")
+        for i in range(len(rows) - 1, -1, -1):
+            next_k = rows[i]["raw_k"] if rows[i]["raw_k"] == rows[i]["raw_k"] else next_k
+            next_vol = rows[i]["raw_volatility"] if rows[i]["raw_volatility"] == rows[i]["raw_volatility"] else next_vol
+            stoch_k[i] = next_k
+            volatility[i] = next_vol
+        commit = len(rows)
+        for i in range(len(rows)):
+            if stoch_k[i] != stoch_k[i] or volatility[i] != volatility[i]:
+                commit = i
+                break
+
+        k_window, d_window, move_window = self.k_window, self.d_window, self.move_window
+        stoch_d, stoch_slow, moves, lambdas = [], [], [], []
+        for i, row in enumerate(rows):
+            if i == commit:
+                k_window, d_window, move_window = (
+                    deque(window, maxlen=window.maxlen) for window in (k_window, d_window, move_window)
+                )
+            stoch_k[i] = _nan_to(stoch_k[i], 50.0)
+            k_window.append(stoch_k[i])
+            d_window.append(_window_mean(k_window))
+            stoch_d.append(d_window[-1])
+            stoch_slow.append(_window_mean(d_window))
+            move = max(abs(row["return_1"]) / _nan_to(volatility[i], 0.0001), 0.0)
+            move_window.append(move)
+            moves.append(move)
+            lambdas.append(max(_window_mean(move_window), 0.1))
+        self.open_rows = rows[commit:]
+
+        features = pd.DataFrame(rows).set_index("Time")
+        features["stochastic_k"] = stoch_k
+        features["stochastic_d"] = stoch_d
+        features["stochastic"] = stoch_slow
+        features["weibull_prob"] = weibull_min.cdf(features["normalized_price"], 1.5, scale=1.0)
+        features["poisson_prob"] = poisson.cdf(np.array(moves), np.array(lambdas))
+        features["weibull_prob"] = features["weibull_prob"].fillna(0.5)
+        features["poisson_prob"] = features["poisson_prob"].fillna(0.5)
+        return features.drop(columns=["raw_k", "normalized_price", "raw_volatility"])
+
+    def to_dict(self) -> Dict[str, object]:
+        def _ewm(ewm: EwmState) -> List[float]:
+            return [ewm.value, ewm.old_weight]
+
+        return {
+            "params": self.params,
+            "volumes": list(self.volumes),
+            "closes": list(self.closes),
+            "prev_high": self.prev_high,
+            "prev_low": self.prev_low,
+            "atr": _ewm(self.atr),
+            "plus_dm": _ewm(self.plus_dm),
+            "minus_dm": _ewm(self.minus_dm),
+            "adx": _ewm(self.adx),
+            "lows": list(self.lows),
+            "highs": list(self.highs),
+            "close_window": list(self.close_window),
+            "return_window": list(self.return_window),
+            "k_window": list(self.k_window),
+            "d_window": list(self.d_window),
+            "move_window": list(self.move_window),
+            "open_rows": [dict(row, Time=pd.Timestamp(row["Time"]).isoformat()) for row in self.open_rows],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object], settings: TrainingSettings) -> "IndicatorState":
+        params = data["params"]
+        state = cls(
+            settings,
+            k_period=int(params["k_period"]),
+            d_period=int(params["d_period"]),
+            slowing=int(params["slowing"]),
+            adx_period=int(params["adx_period"]),
+            atr_period=int(params["atr_period"]),
+            lookback=int(params["lookback"]),
+        )
+        for name in ("volumes", "closes", "lows", "highs", "close_window", "return_window", "k_window", "d_window", "move_window"):
+            getattr(state, name).extend(float(v) for v in data[name])
+        state.prev_high = float(data["prev_high"])
+        state.prev_low = float(data["prev_low"])
+        for name in ("atr", "plus_dm", "minus_dm", "adx"):
+            value, old_weight = data[name]
+            ewm = getattr(state, name)
+            ewm.value, ewm.old_weight = float(value), float(old_weight)
+        state.open_rows = [dict(row, Time=pd.Timestamp(row["Time"])) for row in data["open_rows"]]
+        return state
+
+
+# ===== Feature-Cache =====
+def _file_digest(path: Path, limit: Optional[int] = None) -> str:
+    digest = hashlib.sha1()
+    remaining = limit
+    with path.open("rb") as handle:
+        while remaining is None or remaining > 0:
+            chunk = handle.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as handle:
+        handle.seek(0, os.SEEK_END)
+        if handle.tell() == 0:
+            return False
+        handle.seek(-1, os.SEEK_END)
+        return handle.read(1) == b"\n"
+
+
+def _feature_settings_key(settings: TrainingSettings, config: Optional[Dict]) -> str:
+    # Nur Eingaben des Feature-Frames: Targets, Schwelle, Split usw. entstehen erst nach dem Cache
+    payload = {
+        "version": FEATURE_CACHE_VERSION,
+        "volume_window": settings.volume_window,
+        "volume_spike": settings.volume_spike,
+        "features": (config or {}).get("features", {}),
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _save_feature_cache(path: Path, frame: pd.DataFrame, meta: Dict[str, object]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {f"col_{i}": frame[col].to_numpy() for i, col in enumerate(frame.columns)}
+    arrays["index"] = frame.index.to_numpy()
+    meta = dict(meta, columns=[str(col) for col in frame.columns])
+    arrays["meta"] = np.array(json.dumps(meta))
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as handle:
+        np.savez(handle, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _load_feature_cache(path: Path) -> Tuple[Optional[pd.DataFrame], Dict[str, object]]:
+    if not path.exists():
+        return None, {}
+    try:
+        with np.load(path, allow_pickle=False) as cached:
+            meta = json.loads(str(cached["meta"]))
+            columns = meta.get("columns", [])
+            frame = pd.DataFrame(
+                {col: cached[f"col_{i}"] for i, col in enumerate(columns)},
+                index=pd.DatetimeIndex(cached["index"], name="Time"),
+                copy=False,
+            )
+        return frame, meta
+    except Exception as exc:
+        logging.warning("Feature-Cache %s unlesbar (%s), baue neu", path.name, exc)
+        return None, {}
+
+
+def _read_appended_rows(csv_path: Path, offset: int, columns: List[str]) -> pd.DataFrame:
+    with csv_path.open("rb") as handle:
+        handle.seek(offset)
+        tail = handle.read()
+    if not tail.strip():
+        return pd.DataFrame()
+    try:
+        df = _read_price_csv(io.BytesIO(tail), header=None, names=columns)
+    except ValueError:
         return pd.DataFrame()
-    data = add_volume_features(data, settings)
-    data = add_price_features(data)
-    data = add_indicator_features(data)
-    data = add_breakrevert_features(data)
-    data = build_targets(data, settings)
+    return _index_symbol_frame(df, csv_path.name)
+
+
+def load_feature_frame(
+    symbol: str,
+    data_root: Path,
+    settings: TrainingSettings,
+    config: Optional[Dict] = None,
+    cache_dir: Optional[Path] = None,
+    timer: Optional[StageTimer] = None,
+) -> pd.DataFrame:
+    """Feature-Frame (ohne Targets) aus dem Cache, inkrementell verlängert oder neu berechnet."""
+    timer = timer or StageTimer()
+    csv_path = data_root / f"{symbol}_H1.csv"
+    if cache_dir is None or not csv_path.exists():
+        with timer.stage("load"):
+            data = load_symbol_csv(symbol, "H1", data_root)
+        if data.empty:
+            return data
+        with timer.stage("features"):
+            return build_feature_frame(data, settings, config)
+
+    cache_path = cache_dir / f"{symbol}_H1_features.npz"
+    settings_key = _feature_settings_key(settings, config)
+    with timer.stage("load"):
+        csv_size = csv_path.stat().st_size
+        csv_digest = _file_digest(csv_path)
+        cached, meta = _load_feature_cache(cache_path)
+
+    if cached is not None and meta.get("settings_key") == settings_key:
+        cached_size = int(meta.get("csv_size", -1))
+        if meta.get("csv_sha1") == csv_digest and cached_size == csv_size:
+            logging.info("%s: Feature-Cache Treffer (%d Bars)", symbol, len(cached))
+            return cached
+        if (
+            0 < cached_size < csv_size
+            and meta.get("tail_newline", False)
+            and _file_digest(csv_path, cached_size) == meta.get("csv_sha1")
+        ):
+            with timer.stage("load"):
+                appended = _read_appended_rows(csv_path, cached_size, list(meta.get("csv_columns", [])))
+            if not appended.empty and (cached.empty or appended.index.min() > cached.index.max()):
+                with timer.stage("features"):
+                    state = IndicatorState.from_dict(meta["indicator_state"], settings)
+                    features = state.update(appended)
+                    revised = len(features) - len(appended)
+                    raw = pd.concat([cached[appended.columns].iloc[len(cached) - revised:], appended])
+                    tail_frame = raw.join(features)[cached.columns]
+                    frame = pd.concat([cached.iloc[:len(cached) - revised], tail_frame])
+                logging.info("%s: Feature-Cache verlängert (+%d Bars)", symbol, len(appended))
+                meta.update(
+                    csv_size=csv_size,
+                    csv_sha1=csv_digest,
+                    tail_newline=_ends_with_newline(csv_path),
+                    indicator_state=state.to_dict(),
+                )
+                _save_feature_cache(cache_path, frame, meta)
+                return frame
+
+    with timer.stage("load"):
+        data = load_symbol_csv(symbol, "H1", data_root)
     if data.empty:
         return data
-    data.replace([np.inf, -np.inf], np.nan, inplace=True)
-    data.dropna(inplace=True)
+    csv_columns = [str(col) for col in pd.read_csv(csv_path, sep=';', nrows=0, encoding='utf-8-sig', encoding_errors='replace').columns]
+    with timer.stage("features"):
+        state = IndicatorState.from_history(data, settings, get_feature_periods(config))
+        frame = build_feature_frame(data, settings, config)
+    _save_feature_cache(cache_path, frame, {
+        "settings_key": settings_key,
+        "csv_size": csv_size,
+        "csv_sha1": csv_digest,
+        "csv_columns": csv_columns,
+        "tail_newline": _ends_with_newline(csv_path),
+        "indicator_state": state.to_dict(),
+    })
+    logging.info("%s: Feature-Cache neu geschrieben (%d Bars)", symbol, len(frame))
+    return frame
+
+
+def prepare_dataset(
+    symbol: str,
+    data_root: Path,
+    settings: TrainingSettings,
+    config: Optional[Dict] = None,
+    cache_dir: Optional[Path] = None,
+    timer: Optional[StageTimer] = None,
+    frame: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """Targets und finale Trainingszeilen; frame = bereits geladener Feature-Frame (sonst laden)."""
+    timer = timer or StageTimer()
+    data = frame if frame is not None else load_feature_frame(symbol, data_root, settings, config, cache_dir, timer)
+    if data.empty:
+        return pd.DataFrame()
+    with timer.stage("targets"):
+        data = build_targets(data, settings)
+        if data.empty:
+            return data
+        finite = np.ones(len(data), dtype=bool)
+        for col in data.columns:
+            values = data[col].to_numpy()
+            if values.dtype.kind == "f":
+                finite &= np.isfinite(values)
+        if not finite.all():
+            data = data[finite]
+        if settings.compact_memory:
+            data = compact_frame(data)
     return data
 
 
@@ -682,30 +1527,36 @@ def split_features_target(df: pd.DataFrame, symbol: str = None, config: Dict = N
     missing = [col for col in FEATURE_COLUMNS if col not in df.columns]
     if missing:
         raise KeyError(f"Fehlende Features: {missing}")
-    features = df[FEATURE_COLUMNS].copy()
-    features = normalize_features(features, symbol, config)
-    target = df["target"].copy()
-    features.replace([np.inf, -np.inf], 0.0, inplace=True)
-    features.fillna(0.0, inplace=True)
+    features = normalize_features(df[FEATURE_COLUMNS], symbol, config)
+    target = df["target"]
     return features, target
 
 
-def train_model(X_train: pd.DataFrame, y_train: pd.Series) -> Tuple[DecisionTreeClassifier, IdentityTransformer]:
+def train_model(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    tree_params: Optional[Dict[str, object]] = None,
+) -> Tuple[DecisionTreeClassifier, IdentityTransformer]:
     scaler = IdentityTransformer().fit(X_train)
     X_scaled = scaler.transform(X_train)
-    model = DecisionTreeClassifier(max_depth=6, min_samples_leaf=50, class_weight="balanced", random_state=42)
+    params = dict(DEFAULT_TREE_PARAMS, **(tree_params or {}))
+    model = DecisionTreeClassifier(**params, random_state=42)
     model.fit(X_scaled, y_train)
     return model, scaler
 
 
-def evaluate_model(model, scaler, X_test, y_test, symbol: str, reports_dir: Path) -> Dict[str, float]:
-    X_scaled = scaler.transform(X_test)
-    preds = model.predict(X_scaled)
-    report = classification_report(y_test, preds, digits=3)
+def write_training_report(y_true, preds, symbol: str, reports_dir: Path) -> None:
+    report = classification_report(y_true, preds, digits=3)
     reports_dir.mkdir(parents=True, exist_ok=True)
     report_path = reports_dir / f"training_report_{symbol}.txt"
     report_path.write_text(report, encoding='utf-8')
     logging.info("Report für %s gespeichert: %s", symbol, report_path.name)
+
+
+def evaluate_model(model, scaler, X_test, y_test, symbol: str, reports_dir: Path) -> Dict[str, float]:
+    X_scaled = scaler.transform(X_test)
+    preds = model.predict(X_scaled)
+    write_training_report(y_test, preds, symbol, reports_dir)
     return {
         "accuracy": float((preds == y_test).mean()),
         "positives_test": int((y_test != 0).sum()),
@@ -713,27 +1564,46 @@ def evaluate_model(model, scaler, X_test, y_test, symbol: str, reports_dir: Path
     }
 
 
-def build_model_signals(df: pd.DataFrame, model, scaler, threshold: float, symbol: str = None, config: Dict = None) -> pd.DataFrame:
+def build_model_signals(
+    df: pd.DataFrame,
+    model,
+    scaler,
+    threshold: float,
+    symbol: str = None,
+    config: Dict = None,
+    features: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
     if df.empty:
         return df
-    features = normalize_features(df[FEATURE_COLUMNS], symbol, config)
+    if features is None:
+        features = normalize_features(df[FEATURE_COLUMNS], symbol, config)
+    prob_buy, prob_sell = model_probabilities(model, scaler, features)
+    return apply_model_signals(df, prob_buy, prob_sell, threshold)
+
+
+def model_probabilities(model, scaler, features: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
     probs = model.predict_proba(scaler.transform(features))
     classes = list(getattr(model, "classes_", []))
-    prob_buy = probs[:, classes.index(1)] if 1 in classes else np.zeros(len(df))
-    prob_sell = probs[:, classes.index(-1)] if -1 in classes else np.zeros(len(df))
-    df = df.copy()
-    df["model_prob_buy"] = prob_buy
-    df["model_prob_sell"] = prob_sell
+    prob_buy = probs[:, classes.index(1)] if 1 in classes else np.zeros(len(features))
+    prob_sell = probs[:, classes.index(-1)] if -1 in classes else np.zeros(len(features))
+    return prob_buy, prob_sell
+
+
+def apply_model_signals(df: pd.DataFrame, prob_buy: np.ndarray, prob_sell: np.ndarray, threshold: float) -> pd.DataFrame:
+    compact = df["Close"].dtype == np.float32
+    prob_dtype = np.float32 if compact else np.float64
     buy_mask = prob_buy >= threshold
     sell_mask = (prob_sell >= threshold) & (prob_sell > prob_buy)
     buy_mask = buy_mask & (prob_buy >= prob_sell)
-    signals = np.zeros(len(df), dtype=int)
+    signals = np.zeros(len(df), dtype=np.int8 if compact else int)
     signals[buy_mask] = 1
     signals[sell_mask] = -1
+    # Flache Kopie: es kommen nur neue Spalten hinzu, die Feature-Daten werden nicht dupliziert
+    df = df.copy(deep=False)
+    df["model_prob_buy"] = prob_buy.astype(prob_dtype)
+    df["model_prob_sell"] = prob_sell.astype(prob_dtype)
     df["signal"] = signals
-    df["model_prob"] = 0.0
-    df.loc[buy_mask, "model_prob"] = prob_buy[buy_mask]
-    df.loc[sell_mask, "model_prob"] = prob_sell[sell_mask]
+    df["model_prob"] = np.where(buy_mask, prob_buy, np.where(sell_mask, prob_sell, 0.0)).astype(prob_dtype)
     return df
 
 
@@ -751,22 +1621,25 @@ def _resolve_sl_variant(sl_variant: str) -> Tuple[str, float]:
     return "atr", 2.0
 
 
-def _calculate_tp_sl_prices(row, direction: int, tp_multiplier: float, sl_variant: str) -> Tuple[float, float]:
-    atr_value = max(row["atr"], 1e-6)
-    entry_price = row["Close"]
+def _calculate_tp_sl_prices(
+    entry_price: np.ndarray,
+    atr: np.ndarray,
+    direction: np.ndarray,
+    tp_multiplier: float,
+    sl_variant: str,
+    extreme_levels: Optional[Dict[int, Tuple[np.ndarray, np.ndarray]]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    atr_value = np.maximum(atr, 1e-6)
     tp_price = entry_price + direction * tp_multiplier * atr_value
 
     variant, value = _resolve_sl_variant(sl_variant)
     if variant.startswith("extrem"):
         period = int(variant.replace("extrem", ""))
-        lowest_low = row.get(f"lowest_low_{period}")
-        highest_high = row.get(f"highest_high_{period}")
-        if lowest_low is None or highest_high is None:
+        levels = (extreme_levels or {}).get(period)
+        if levels is None:
             return tp_price, entry_price - direction * value * atr_value
-        if direction > 0:
-            sl_price = lowest_low - value * atr_value
-        else:
-            sl_price = highest_high + value * atr_value
+        lowest_low, highest_high = levels
+        sl_price = np.where(direction > 0, lowest_low - value * atr_value, highest_high + value * atr_value)
         return tp_price, sl_price
     # ATR variant
     sl_distance = value * atr_value
@@ -774,21 +1647,140 @@ def _calculate_tp_sl_prices(row, direction: int, tp_multiplier: float, sl_varian
     return tp_price, sl_price
 
 
-def _prepare_extreme_levels(df: pd.DataFrame, periods: List[int]) -> pd.DataFrame:
+def _extreme_level_arrays(df: pd.DataFrame, periods: List[int]) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    levels: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
     for period in periods:
-        df[f"lowest_low_{period}"] = df["Low"].rolling(window=period, min_periods=1).min()
-        df[f"highest_high_{period}"] = df["High"].rolling(window=period, min_periods=1).max()
-    return df
-
+        lowest_low = df["Low"].rolling(window=period, min_periods=1).min()
+        highest_high = df["High"].rolling(window=period, min_periods=1).max()
+        levels[period] = (lowest_low.to_numpy(dtype=float), highest_high.to_numpy(dtype=float))
+    return levels
+
+
+class PriceRangeIndex:
+    """High/Low-Index für First-Crossing-Abfragen ("wann erreicht High/Low erstmals X?").
+
+    Ebene k hält das Maximum jedes ausgerichteten 2^k-Blocks (Segmentbaum-Ebenen,
+    Low wird negiert gespeichert). Eine Abfrage steigt vom Startbar auf, bis ein
+    Block das Level enthält, und sucht darin absteigend den ersten Bar:
+    O(log N) pro Abfrage, O(N) Speicher, vektorisiert über alle Abfragen.
+    """
+
+    def __init__(self, high: np.ndarray, low: np.ndarray) -> None:
+        self.size = len(high)
+        self._high_levels = self._build_levels(np.asarray(high, dtype=float))
+        self._neg_low_levels = self._build_levels(-np.asarray(low, dtype=float))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PriceRangeIndex":
+        return cls(df["High"].to_numpy(dtype=float), df["Low"].to_numpy(dtype=float))
+
+    @staticmethod
+    def _build_levels(values: np.ndarray) -> List[np.ndarray]:
+        depth = max(1, int(np.ceil(np.log2(max(len(values), 1)))))
+        padded = np.full(1 << depth, -np.inf)
+        padded[:len(values)] = np.where(np.isnan(values), -np.inf, values)
+        levels = [padded]
+        while len(levels[-1]) > 1:
+            prev = levels[-1]
+            levels.append(np.maximum(prev[0::2], prev[1::2]))
+        return levels
+
+    def first_high_reaching(self, start: np.ndarray, level: np.ndarray) -> np.ndarray:
+        """Erster Bar >= start mit High >= level, sonst size."""
+        return self._first_reaching(self._high_levels, start, np.asarray(level, dtype=float))
+
+    def first_low_reaching(self, start: np.ndarray, level: np.ndarray) -> np.ndarray:
+        """Erster Bar >= start mit Low <= level, sonst size."""
+        return self._first_reaching(self._neg_low_levels, start, -np.asarray(level, dtype=float))
+
+    def max_high(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Höchstes High in [start, end] (inklusive, start <= end < size)."""
+        return self._range_max(self._high_levels, start, end)
+
+    def min_low(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Tiefstes Low in [start, end] (inklusive, start <= end < size)."""
+        return -self._range_max(self._neg_low_levels, start, end)
+
+    @staticmethod
+    def _range_max(levels: List[np.ndarray], start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        # Bottom-up: Randknoten, deren Elternblock über den Bereich hinausragt, einzeln übernehmen
+        lo = np.array(start, dtype=np.int64)
+        hi = np.array(end, dtype=np.int64)
+        best = np.full(len(lo), -np.inf)
+        for level in levels:
+            active = lo <= hi
+            if not active.any():
+                break
+            take = np.flatnonzero(active & ((lo & 1) == 1))
+            best[take] = np.maximum(best[take], level[lo[take]])
+            lo[take] += 1
+            take = np.flatnonzero(active & ((hi & 1) == 0))
+            best[take] = np.maximum(best[take], level[hi[take]])
+            hi[take] -= 1
+            # Erledigte Abfragen nicht weiter schieben, sonst würden sie wieder aktiv
+            lo[active] >>= 1
+            hi[active] >>= 1
+        return best
 
-def simulate_trades(
+    def _first_reaching(self, levels: List[np.ndarray], start: np.ndarray, threshold: np.ndarray) -> np.ndarray:
+        pos = np.array(start, dtype=np.int64)
+        threshold = np.broadcast_to(threshold, pos.shape)
+        found_level = np.full(len(pos), -1, dtype=np.int64)
+        capacity = len(levels[0])
+        top = len(levels) - 1
+
+        # Aufstieg: ungerade Blöcke ohne Treffer überspringen, bis ein Block das Level enthält
+        for k in range(top):
+            idx = np.flatnonzero((found_level < 0) & (pos < capacity) & (((pos >> k) & 1) == 1))
+            hit = levels[k][pos[idx] >> k] >= threshold[idx]
+            found_level[idx[hit]] = k
+            pos[idx[~hit]] += 1 << k
+        idx = np.flatnonzero((found_level < 0) & (pos < capacity))
+        hit = levels[top][pos[idx] >> top] >= threshold[idx]
+        found_level[idx[hit]] = top
+
+        # Abstieg: innerhalb des Treffer-Blocks die linke Hälfte bevorzugen
+        for k in range(top - 1, -1, -1):
+            idx = np.flatnonzero(found_level > k)
+            skip = levels[k][pos[idx] >> k] < threshold[idx]
+            pos[idx[skip]] += 1 << k
+        return np.where(found_level >= 0, pos, self.size)
+
+
+def _first_crossing(price_index: PriceRangeIndex, start: np.ndarray, level: np.ndarray, upward: np.ndarray) -> np.ndarray:
+    """Erster Bar ab start, dessen High (upward) bzw. Low (sonst) das Level erreicht, sonst size."""
+    first = np.empty(len(start), dtype=np.int64)
+    first[upward] = price_index.first_high_reaching(start[upward], level[upward])
+    first[~upward] = price_index.first_low_reaching(start[~upward], level[~upward])
+    return first
+
+
+def _range_extreme(price_index: PriceRangeIndex, start: np.ndarray, end: np.ndarray, upward: np.ndarray) -> np.ndarray:
+    """Höchstes High (upward) bzw. tiefstes Low (sonst) in [start, end]."""
+    extreme = np.empty(len(start), dtype=float)
+    extreme[upward] = price_index.max_high(start[upward], end[upward])
+    extreme[~upward] = price_index.min_low(start[~upward], end[~upward])
+    return extreme
+
+
+def simulate_trade_grid(
     df: pd.DataFrame,
     symbol: str,
     config: Dict,
     lot_size: float,
-    tp_multiplier: float,
-    sl_variant: str,
-) -> Tuple[int, int, float, pd.DataFrame]:
+    tp_multipliers: List[float],
+    sl_variants: List[str],
+    price_index: Optional[PriceRangeIndex] = None,
+    detail_tps: Optional[List[float]] = None,
+) -> Dict[Tuple[float, str], Tuple[int, int, float, Optional[pd.DataFrame]]]:
+    """Simuliert alle TP x SL Kombinationen in einem Durchlauf über die Preis-Arrays.
+
+    Je SL-Variante werden der erste SL-Treffer und das günstigste Extrem bis zu diesem
+    Bar einmal gesucht; ein TP-Level gewinnt genau dann, wenn das Extrem es erreicht
+    (gleicher Bar zählt wie bisher für den TP). Weitere TP-Werte kosten damit nur
+    einen Vergleich. Trade-Tabellen mit Exit-Zeit entstehen nur für detail_tps
+    (None = alle TP-Werte), sonst steht an vierter Stelle None.
+    """
     symbol_cfg = (config.get("symbols") or {}).get(symbol, {})
     if not symbol_cfg:
         logging.warning("Symbol %s nicht in Config, verwende Defaults", symbol)
@@ -797,68 +1789,106 @@ def simulate_trades(
     account_currency = config.get("account", {}).get("currency", "EUR")
     exchange_rates = config.get("exchange_rates", {})
 
-    df = df.copy()
-    df = _prepare_extreme_levels(df, [14])
+    combos = [(tp, sl) for tp in tp_multipliers for sl in sl_variants]
+    signal = df["signal"].to_numpy() if "signal" in df.columns else np.zeros(len(df))
+    entry_pos = np.flatnonzero(signal != 0)
+    if len(entry_pos) == 0 or not combos:
+        return {combo: (0, 0, 0.0, pd.DataFrame()) for combo in combos}
+
+    close = df["Close"].to_numpy(dtype=float)
+    atr = df["atr"].to_numpy(dtype=float)
+    if price_index is None or price_index.size != len(df):
+        price_index = PriceRangeIndex.from_frame(df)
+    n_bars = price_index.size
+
+    direction = np.sign(signal[entry_pos]).astype(np.int64)
+    is_long = direction > 0
+    entry_price = close[entry_pos]
+    entry_atr = atr[entry_pos]
+    extreme_levels = {
+        period: (lowest_low[entry_pos], highest_high[entry_pos])
+        for period, (lowest_low, highest_high) in _extreme_level_arrays(df, [14]).items()
+    }
 
-    trades = []
-    signals_idx = df.index[df["signal"] != 0]
-    if len(signals_idx) == 0:
-        return 0, 0, 0.0, pd.DataFrame()
+    # SL-Seite einmal je Variante: erster SL-Bar und bestes High/Low bis dahin (inklusive)
+    batch = len(sl_variants)
+    sl_prices = np.vstack([
+        _calculate_tp_sl_prices(entry_price, entry_atr, direction, 0.0, sl, extreme_levels)[1] for sl in sl_variants
+    ])
+    starts = np.tile(entry_pos, batch)
+    long_flat = np.tile(is_long, batch)
+    sl_first = _first_crossing(price_index, starts, sl_prices.ravel(), ~long_flat)
+    reach = _range_extreme(price_index, starts, np.minimum(sl_first, n_bars - 1), long_flat)
+    sl_first = sl_first.reshape(batch, len(entry_pos))
+    reach = reach.reshape(batch, len(entry_pos))
+    sl_hit = sl_first < n_bars
+
+    fx = get_fx_rates(exchange_rates)
+    entry_time = df.index[entry_pos]
+    detail = None if detail_tps is None else set(detail_tps)
+    outcomes: Dict[Tuple[float, str], Tuple[int, int, float, Optional[pd.DataFrame]]] = {}
+    for tp in tp_multipliers:
+        tp_price = _calculate_tp_sl_prices(entry_price, entry_atr, direction, tp, sl_variants[0], extreme_levels)[0]
+        tp_hit = np.where(is_long, reach >= tp_price, reach <= tp_price)
+        result = np.where(tp_hit, 1, np.where(sl_hit, -1, 0)).astype(np.int8)
+        exit_price = np.where(result == 1, tp_price, np.where(result == -1, sl_prices, close[-1]))
+        profit_quote = (exit_price - entry_price) * contract_size * lot_size * direction
+        profit_account = fx.convert(profit_quote, quote_currency, account_currency)
+
+        exit_pos = None
+        if detail is None or tp in detail:
+            # Der TP-Bar hängt nicht von der SL-Variante ab: einmal für alle Signale suchen, die irgendwo gewinnen
+            winners = np.flatnonzero(tp_hit.any(axis=0))
+            tp_first = np.zeros(len(entry_pos), dtype=np.int64)
+            tp_first[winners] = _first_crossing(price_index, entry_pos[winners], tp_price[winners], is_long[winners])
+            exit_pos = np.where(result == 1, tp_first, np.where(result == -1, sl_first, n_bars - 1))
+
+        for row, sl in enumerate(sl_variants):
+            trades_df = None
+            if exit_pos is not None:
+                trades_df = pd.DataFrame({
+                    "entry_time": entry_time,
+                    "exit_time": df.index[exit_pos[row]],
+                    "entry_price": entry_price,
+                    "exit_price": exit_price[row],
+                    "direction": direction,
+                    "result": result[row].astype(np.int64),
+                    "profit": profit_account[row],
+                })
+            wins = int((result[row] == 1).sum())
+            outcomes[(tp, sl)] = (len(entry_pos), wins, float(profit_account[row].sum()), trades_df)
+    return outcomes
 
-    for idx in signals_idx:
-        entry_row = df.loc[idx]
-        entry_price = entry_row["Close"]
-        direction = int(np.sign(entry_row["signal"])) or 0
-        if direction == 0:
-            continue
-        tp_price, sl_price = _calculate_tp_sl_prices(entry_row, direction, tp_multiplier, sl_variant)
-
-        subsequent = df.loc[idx:]
-        exit_price = entry_price
-        result = 0
-        for _, row in subsequent.iterrows():
-            high = row["High"]
-            low = row["Low"]
-            if direction > 0:
-                if high >= tp_price:
-                    exit_price = tp_price
-                    result = 1
-                    break
-                if low <= sl_price:
-                    exit_price = sl_price
-                    result = -1
-                    break
-            else:
-                if low <= tp_price:
-                    exit_price = tp_price
-                    result = 1
-                    break
-                if high >= sl_price:
-                    exit_price = sl_price
-                    result = -1
-                    break
-        if result == 0:
-            exit_price = subsequent.iloc[-1]["Close"]
 
-        profit_quote = (exit_price - entry_price) * contract_size * lot_size * direction
-        profit_account = convert_currency(profit_quote, quote_currency, account_currency, exchange_rates)
-        trades.append({
-            "entry_time": idx,
-            "entry_price": entry_price,
-            "exit_price": exit_price,
-            "direction": direction,
-            "result": result,
-            "profit": profit_account,
-        })
+def simulate_trades(
+    df: pd.DataFrame,
+    symbol: str,
+    config: Dict,
+    lot_size: float,
+    tp_multiplier: float,
+    sl_variant: str,
+    price_index: Optional[PriceRangeIndex] = None,
+) -> Tuple[int, int, float, pd.DataFrame]:
+    outcomes = simulate_trade_grid(df, symbol, config, lot_size, [tp_multiplier], [sl_variant], price_index)
+    return outcomes[(tp_multiplier, sl_variant)]
+
+
+def write_rule_surface(symbol: str, surface: pd.DataFrame, reports_dir: Path) -> None:
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    surface_path = reports_dir / f"rule_surface_{symbol}.csv"
+    surface.to_csv(surface_path, sep=";", index=False, float_format="%.4f")
+    logging.info("TP/SL-Surface für %s gespeichert: %s", symbol, surface_path.name)
 
-    trades_df = pd.DataFrame(trades)
-    if trades_df.empty:
-        return 0, 0, 0.0, trades_df
 
-    wins = int((trades_df["result"] == 1).sum())
-    total = len(trades_df)
-    total_profit = float(trades_df["profit"].sum())
-    return total, wins, total_profit, trades_df
+def write_symbol_trades(symbol: str, trades: Optional[pd.DataFrame], reports_dir: Path) -> None:
+    """Trades der gewählten TP/SL-Kombination für den Portfolio-Backtest ablegen."""
+    trades_path = reports_dir / f"trades_{symbol}.csv"
+    if trades is None or trades.empty:
+        trades_path.unlink(missing_ok=True)
+        return
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    columns = ["entry_time", "exit_time", "entry_price", "exit_price", "direction", "result"]
+    trades[columns].to_csv(trades_path, sep=";", index=False, date_format=CSV_TIME_FORMAT)
 
 
 def find_best_rule_parameters(
@@ -871,14 +1901,32 @@ def find_best_rule_parameters(
     period_days: Optional[int],
     tp_multiplier: float,
     sl_variants: List[str],
+    tp_grid: Optional[List[float]] = None,
+    reports_dir: Optional[Path] = None,
+    price_index: Optional[PriceRangeIndex] = None,
 ) -> Optional[Dict[str, object]]:
+    # Die Surface deckt das ganze TP-Raster ab; gewählt wird nur auf dem konfigurierten TP,
+    # weil apply_symbol_tp_settings diesen Wert in die Rules schreibt.
+    tp_values = sorted(set(tp_grid or []) | {tp_multiplier})
+    outcomes = simulate_trade_grid(
+        df, symbol, config, lot_size, tp_values, sl_variants, price_index, detail_tps=[tp_multiplier],
+    )
+
+    surface_rows = []
     best = None
-    for sl in sl_variants:
-        total, wins, profit, trades = simulate_trades(df, symbol, config, lot_size, tp_multiplier, sl)
-        if total == 0:
-            continue
-        winrate = wins / total
-        if total < min_trades or winrate < min_winrate:
+    for (tp, sl), (total, wins, profit, trades) in outcomes.items():
+        winrate = wins / total if total else 0.0
+        eligible = total > 0 and total >= min_trades and winrate >= min_winrate
+        surface_rows.append({
+            "tp": tp,
+            "sl": sl,
+            "trades": total,
+            "wins": wins,
+            "winrate": winrate,
+            "profit": profit,
+            "eligible": eligible,
+        })
+        if tp != tp_multiplier or not eligible:
             continue
         score = profit
         if best is None or score > best["score"]:
@@ -892,7 +1940,12 @@ def find_best_rule_parameters(
                 "trades_df": trades,
                 "score": score,
             }
+
+    surface = pd.DataFrame(surface_rows, columns=["tp", "sl", "trades", "wins", "winrate", "profit", "eligible"])
+    if reports_dir is not None:
+        write_rule_surface(symbol, surface, reports_dir)
     if best:
+        best["surface"] = surface
         return best
     return None
 
@@ -935,7 +1988,8 @@ def export_rules(
 ) -> int:
     rules_dir.mkdir(parents=True, exist_ok=True)
     out_path = rules_dir / f"rules_{symbol}.txt"
-    with out_path.open("w", encoding="utf-8") as handle:
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
         handle.write(f"Symbol: {symbol}\n")
         handle.write(f"LotSize: {rule_info['lot_size']:.4f}\n")
         handle.write(f"TP: {rule_info['tp']:.2f}\n")
@@ -946,6 +2000,13 @@ def export_rules(
         handle.write(f"Signals: {rule_info['trades']}\n")
         handle.write(f"TotalProfit: {rule_info['profit_total']:.2f}\n")
         handle.write(f"WindowProfit: {rule_info['profit_window']:.2f}\n")
+        if rule_info.get("rule_threshold") is not None:
+            handle.write(f"RuleThreshold: {float(rule_info['rule_threshold']):.4f}\n")
+        tree_params = rule_info.get("tree_params")
+        if tree_params:
+            handle.write(f"Tree_MaxDepth: {tree_params.get('max_depth')}\n")
+            handle.write(f"Tree_MinLeaf: {tree_params.get('min_samples_leaf')}\n")
+            handle.write(f"Tree_ClassWeight: {tree_params.get('class_weight') or 'none'}\n")
         override_reason = rule_info.get("override_reason")
         if override_reason:
             handle.write(f"// {override_reason}\n")
@@ -972,17 +2033,23 @@ def export_rules(
             handle.write("\n// === SIGNAL SNAPSHOT ===\n")
             for ts, prob in signal_examples:
                 handle.write(f"// {ts.isoformat()} -> prob={prob:.3f}\n")
+    os.replace(tmp_path, out_path)
     logging.info("%s: Rules gespeichert (%s)", symbol, out_path.name)
     return int(rule_info.get("trades", 0))
 
 
-def save_model(symbol: str, model, scaler, models_dir: Path) -> None:
+def save_model(symbol: str, model, scaler, models_dir: Path, rule_threshold: Optional[float] = None) -> None:
     models_dir.mkdir(parents=True, exist_ok=True)
     artifact = {
         "model": model,
         "scaler": scaler,
     }
-    joblib.dump(artifact, models_dir / f"{symbol}_model.pkl")
+    if rule_threshold is not None:
+        artifact["rule_threshold"] = float(rule_threshold)
+    out_path = models_dir / f"{symbol}_model.pkl"
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, out_path)
     logging.info("Modelldatei gespeichert: %s_model.pkl", symbol)
 
 
@@ -998,6 +2065,9 @@ class SymbolResult:
     profit_account: float
     lot_size: float
     winrate: float
+    peak_rss_mb: Optional[float] = None
+    stages: Optional[Dict[str, Dict[str, Optional[float]]]] = None
+    drift_reference: Optional[Dict[str, object]] = None
 
 
 def get_reporting_period(config: Dict) -> Tuple[str, Optional[int]]:
@@ -1019,34 +2089,108 @@ def get_reporting_period(config: Dict) -> Tuple[str, Optional[int]]:
     return label, days
 
 
+# ===== Währungsumrechnung =====
+FX_PIVOT_CURRENCIES = ("USD", "EUR")
+
+
+class FxRates:
+    """Dichte Kursmatrix (Zeile = von, Spalte = nach) aus dem exchange_rates-Block.
+
+    Reihenfolge wie bisher: direkte Notierung, dann Kehrwert; fehlende Crosses werden über USD/EUR trianguliert,
+    erst danach über andere Währungen (z. B. NZD nur gegen CHF notiert).
+    """
+
+    def __init__(self, currencies: List[str], matrix: np.ndarray, triangulated: int = 0):
+        self.currencies = currencies
+        self.index = {code: pos for pos, code in enumerate(currencies)}
+        self.matrix = matrix
+        self.triangulated = triangulated
+        self._warned: set = set()
+
+    @classmethod
+    def from_rates(cls, rates: Optional[Dict[str, float]]) -> "FxRates":
+        pairs: List[Tuple[str, str, float]] = []
+        for key, value in (rates or {}).items():
+            base, _, quote = str(key).upper().partition("/")
+            try:
+                rate = float(value)
+            except (TypeError, ValueError):
+                continue
+            if base and quote and np.isfinite(rate) and rate > 0:
+                pairs.append((base, quote, rate))
+        currencies = sorted({code for base, quote, _ in pairs for code in (base, quote)} | set(FX_PIVOT_CURRENCIES))
+        index = {code: pos for pos, code in enumerate(currencies)}
+        matrix = np.full((len(currencies), len(currencies)), np.nan)
+        np.fill_diagonal(matrix, 1.0)
+        for base, quote, rate in pairs:
+            matrix[index[base], index[quote]] = rate
+        for base, quote, rate in pairs:
+            if np.isnan(matrix[index[quote], index[base]]):
+                matrix[index[quote], index[base]] = 1.0 / rate
+        known = int((~np.isnan(matrix)).sum())
+        pivots = list(FX_PIVOT_CURRENCIES) + [code for code in currencies if code not in FX_PIVOT_CURRENCIES]
+        filled = known
+        while True:
+            for pivot in pivots:
+                pos = index[pivot]
+                cross = np.outer(matrix[:, pos], matrix[pos, :])
+                missing = np.isnan(matrix) & ~np.isnan(cross)
+                matrix[missing] = cross[missing]
+                if missing.any() and pivot not in FX_PIVOT_CURRENCIES:
+                    break  # nach jedem Umweg wieder zuerst USD/EUR versuchen
+            now = int((~np.isnan(matrix)).sum())
+            if now == filled:
+                break
+            filled = now
+        return cls(currencies, matrix, filled - known)
+
+    def factor(self, from_currency: Optional[str], to_currency: Optional[str]) -> float:
+        """Kurs von → nach; unbekannte Paare bleiben unverändert (1.0), werden aber einmal gewarnt."""
+        if not from_currency or not to_currency:
+            return 1.0
+        source, target = str(from_currency).upper(), str(to_currency).upper()
+        if source == target:
+            return 1.0
+        row, col = self.index.get(source), self.index.get(target)
+        rate = self.matrix[row, col] if row is not None and col is not None else np.nan
+        if np.isnan(rate):
+            if (source, target) not in self._warned:
+                self._warned.add((source, target))
+                logging.warning("Kein Wechselkurs %s/%s (auch nicht trianguliert), Beträge bleiben unverändert", source, target)
+            return 1.0
+        return float(rate)
+
+    def convert(self, amounts, from_currency, to_currency: Optional[str]):
+        """Skalar, Array oder Series umrechnen; from_currency darf auch ein Array mit einer Währung je Betrag sein."""
+        if from_currency is None or isinstance(from_currency, str):
+            return amounts * self.factor(from_currency, to_currency)
+        codes, inverse = np.unique(np.asarray(from_currency, dtype=str), return_inverse=True)
+        factors = np.array([self.factor(code, to_currency) for code in codes])
+        return np.asarray(amounts, dtype=float) * factors[inverse.reshape(-1)]
+
+
+_FX_RATES_CACHE: Dict[Tuple[Tuple[str, str], ...], FxRates] = {}
+
+
+def get_fx_rates(rates: Optional[Dict[str, float]]) -> FxRates:
+    """Kursmatrix einmal je Prozess und exchange_rates-Block aufbauen."""
+    key = tuple(sorted((str(pair), str(value)) for pair, value in (rates or {}).items()))
+    fx = _FX_RATES_CACHE.get(key)
+    if fx is None:
+        fx = _FX_RATES_CACHE[key] = FxRates.from_rates(rates)
+    return fx
+
+
 def convert_currency(amount: float, from_currency: str, to_currency: str, rates: Dict[str, float]) -> float:
     if amount == 0 or not from_currency or not to_currency or from_currency == to_currency:
         return float(amount)
-    direct = rates.get(f"{from_currency}/{to_currency}")
-    if direct:
-        return float(amount) * float(direct)
-    reverse = rates.get(f"{to_currency}/{from_currency}")
-    if reverse:
-        try:
-            return float(amount) / float(reverse)
-        except ZeroDivisionError:
-            return float(amount)
-    return float(amount)
-
+    return float(get_fx_rates(rates).convert(float(amount), from_currency, to_currency))
 
-def calculate_lot_size(symbol: str, config: Dict) -> float:
-    symbols_cfg = config.get("symbols", {})
-    account_cfg = config.get("account", {})
-    symbol_cfg = symbols_cfg.get(symbol, {})
-
-    account_currency = account_cfg.get("currency", "EUR")
-    exchange_rates = config.get("exchange_rates", {})
 
-    balance = float(account_cfg.get("starting_balance", 10000.0))
-    risk_percent = float(account_cfg.get("risk_percent", 1.0))
-    risk_amount_account = balance * risk_percent / 100.0
-    if risk_amount_account <= 0:
-        return float(symbol_cfg.get("min_lot", 0.01))
+def margin_per_lot(symbol: str, config: Dict) -> float:
+    """Margin für 1.0 Lot in Kontowährung (contract_size / leverage)."""
+    symbol_cfg = config.get("symbols", {}).get(symbol, {})
+    account_currency = config.get("account", {}).get("currency", "EUR")
 
     contract_size = float(symbol_cfg.get("contract_size", 100000.0)) or 100000.0
     leverage_raw = symbol_cfg.get("leverage", 30.0)
@@ -1066,16 +2210,13 @@ def calculate_lot_size(symbol: str, config: Dict) -> float:
     if not margin_currency:
         margin_currency = account_currency
 
-    margin_required_margin = contract_size / leverage
-    margin_required_account = convert_currency(
-        margin_required_margin, margin_currency, account_currency, exchange_rates
+    return convert_currency(
+        contract_size / leverage, margin_currency, account_currency, config.get("exchange_rates", {})
     )
 
-    if margin_required_account <= 0:
-        return float(symbol_cfg.get("min_lot", 0.01))
-
-    lot = risk_amount_account / margin_required_account
 
+def normalize_lot(lot: float, symbol_cfg: Dict) -> float:
+    """Auf volume_step runden und in [min_lot, max_lot] begrenzen."""
     min_lot = float(symbol_cfg.get("min_lot", 0.01))
     max_lot = float(symbol_cfg.get("max_lot", 50.0))
     volume_step = float(symbol_cfg.get("volume_step", 0.01)) or 0.01
@@ -1086,6 +2227,24 @@ def calculate_lot_size(symbol: str, config: Dict) -> float:
     return max(lot, min_lot)
 
 
+def calculate_lot_size(symbol: str, config: Dict, balance: Optional[float] = None) -> float:
+    account_cfg = config.get("account", {})
+    symbol_cfg = config.get("symbols", {}).get(symbol, {})
+
+    if balance is None:
+        balance = float(account_cfg.get("starting_balance", 10000.0))
+    risk_percent = float(account_cfg.get("risk_percent", 1.0))
+    risk_amount_account = balance * risk_percent / 100.0
+    if risk_amount_account <= 0:
+        return float(symbol_cfg.get("min_lot", 0.01))
+
+    margin_required_account = margin_per_lot(symbol, config)
+    if margin_required_account <= 0:
+        return float(symbol_cfg.get("min_lot", 0.01))
+
+    return normalize_lot(risk_amount_account / margin_required_account, symbol_cfg)
+
+
 def compute_trade_statistics(
     symbol: str,
     df: pd.DataFrame,
@@ -1127,7 +2286,7 @@ def compute_trade_statistics(
     exchange_rates = config.get("exchange_rates", {})
 
     profits_quote = trades["future_return"] * trades["Close"] * contract_size * lot_size
-    profits_account = profits_quote.apply(lambda x: convert_currency(x, quote_currency, account_currency, exchange_rates))
+    profits_account = get_fx_rates(exchange_rates).convert(profits_quote, quote_currency, account_currency)
 
     trades_total = len(profits_account)
     if trades_total == 0:
@@ -1139,6 +2298,443 @@ def compute_trade_statistics(
     return trades_total, trades_won, profit_total, winrate
 
 
+# ===== Threshold-Sweep =====
+# Out-of-Sample-Wahrscheinlichkeiten über df.iloc[start:end]: (start, end, prob_buy, prob_sell, mask oder None)
+OosSegment = Tuple[int, int, np.ndarray, np.ndarray, Optional[np.ndarray]]
+
+
+def get_threshold_sweep_settings(config: Dict) -> Optional[Dict[str, object]]:
+    sweep_cfg = config.get("train", {}).get("threshold_sweep", {})
+    if not isinstance(sweep_cfg, dict) or not sweep_cfg.get("enabled", True):
+        return None
+    low = float(sweep_cfg.get("min", 0.30))
+    high = float(sweep_cfg.get("max", 0.90))
+    step = float(sweep_cfg.get("step", 0.01))
+    if step <= 0 or high < low:
+        logging.warning("train.threshold_sweep ungültig (min=%s max=%s step=%s), Sweep übersprungen", low, high, step)
+        return None
+    return {
+        "thresholds": np.round(np.arange(low, high + step / 2, step), 6),
+        "auto_pick": bool(sweep_cfg.get("auto_pick", False)),
+    }
+
+
+def sweep_rule_thresholds(
+    df: pd.DataFrame,
+    prob_buy: np.ndarray,
+    prob_sell: np.ndarray,
+    thresholds: np.ndarray,
+    symbol: str,
+    config: Dict,
+    lot_size: float,
+    tp_value: float,
+    sl_variant: str,
+    price_index: Optional[PriceRangeIndex] = None,
+    mask: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """Trades/Winrate/Profit für alle rule_threshold-Werte aus einer Simulation.
+
+    Jeder Bar handelt in Richtung seiner höheren Wahrscheinlichkeit (Gleichstand → Buy),
+    sobald diese >= threshold ist – genau die Regel aus apply_model_signals. Trades sind
+    unabhängig voneinander, also wird jeder Bar einmal simuliert und die Kurve entsteht
+    aus kumulierten Summen über die absteigend sortierten Scores. mask beschränkt die
+    Einstiege auf ausgewählte Bars (z. B. die Testzeilen eines Zufalls-Splits).
+    """
+    direction = np.where(prob_buy >= prob_sell, 1, -1)
+    score = np.maximum(prob_buy, prob_sell)
+    if mask is not None:
+        direction = np.where(mask, direction, 0)
+        score = score[mask]
+    if len(score) == 0:
+        zeros = np.zeros(len(thresholds), dtype=np.int64)
+        return pd.DataFrame({"threshold": thresholds, "trades": zeros, "wins": zeros, "winrate": 0.0, "profit": 0.0})
+    candidates = df.copy(deep=False)
+    candidates["signal"] = direction
+    _, _, _, outcomes = simulate_trades(candidates, symbol, config, lot_size, tp_value, sl_variant, price_index)
+
+    order = np.argsort(-score, kind="stable")
+    won = np.concatenate([[0], np.cumsum(outcomes["result"].to_numpy()[order] == 1)])
+    profit = np.concatenate([[0.0], np.cumsum(outcomes["profit"].to_numpy(dtype=float)[order])])
+    trades = np.searchsorted(-score[order], -np.asarray(thresholds, dtype=float), side="right")
+    return pd.DataFrame({
+        "threshold": thresholds,
+        "trades": trades,
+        "wins": won[trades],
+        "winrate": np.divide(won[trades], trades, out=np.zeros(len(trades)), where=trades > 0),
+        "profit": profit[trades],
+    })
+
+
+def oos_threshold_curve(
+    df: pd.DataFrame,
+    segments: List[OosSegment],
+    thresholds: np.ndarray,
+    symbol: str,
+    config: Dict,
+    lot_size: float,
+    tp_value: float,
+    sl_variant: str,
+    price_index: Optional[PriceRangeIndex] = None,
+) -> pd.DataFrame:
+    """Threshold-Kurve nur aus Out-of-Sample-Wahrscheinlichkeiten, summiert über alle Segmente.
+
+    Ein Segment ist (start, end, prob_buy, prob_sell, mask) über df.iloc[start:end]; Trades
+    laufen wie in der Fold-Bewertung nur innerhalb ihres Segments.
+    """
+    curves = []
+    for start, end, prob_buy, prob_sell, mask in segments:
+        frame = df.iloc[start:end]
+        index = price_index if price_index is not None and price_index.size == len(frame) else None
+        curves.append(sweep_rule_thresholds(
+            frame, prob_buy, prob_sell, thresholds, symbol, config, lot_size, tp_value, sl_variant, index, mask,
+        ))
+    curve = pd.concat(curves).groupby("threshold", sort=True)[["trades", "wins", "profit"]].sum().reset_index()
+    trades = curve["trades"].to_numpy()
+    curve.insert(3, "winrate", np.divide(curve["wins"].to_numpy(), trades, out=np.zeros(len(curve)), where=trades > 0))
+    return curve
+
+
+def pick_rule_threshold(curve: pd.DataFrame, min_trades: int, min_winrate: float) -> Optional[float]:
+    """Profitabelster Threshold mit genug Trades und Mindest-Winrate (Gleichstand → höhere Winrate)."""
+    eligible = curve[(curve["trades"] >= min_trades) & (curve["winrate"] >= min_winrate)]
+    if eligible.empty:
+        return None
+    best = eligible.sort_values(["profit", "winrate", "threshold"], ascending=False).iloc[0]
+    return float(best["threshold"])
+
+
+def write_threshold_curve(symbol: str, curve: pd.DataFrame, reports_dir: Path) -> None:
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    curve_path = reports_dir / f"threshold_curve_{symbol}.csv"
+    curve.to_csv(curve_path, sep=";", index=False, float_format="%.4f")
+    logging.info("Threshold-Kurve für %s gespeichert: %s", symbol, curve_path.name)
+
+
+# ===== Baum-Hyperparameter-Suche =====
+def get_tree_search_settings(config: Dict) -> Optional[Dict[str, object]]:
+    search_cfg = config.get("train", {}).get("tree_search", {})
+    if not isinstance(search_cfg, dict) or not search_cfg.get("enabled", False):
+        return None
+    try:
+        depths = [int(value) for value in search_cfg.get("max_depth", [4, 6, 8, 10])]
+        leaves = [int(value) for value in search_cfg.get("min_samples_leaf", [20, 50, 100, 200])]
+    except (TypeError, ValueError):
+        logging.warning("train.tree_search: max_depth/min_samples_leaf ungültig, Suche übersprungen")
+        return None
+    weights = search_cfg.get("class_weight", ["balanced", None])
+    # JSON kennt kein None für sklearn: "none" (wie im Rules-Header) bedeutet ungewichtet
+    weights = [
+        None if weight is None or str(weight).lower() == "none" else weight
+        for weight in (weights if isinstance(weights, list) else [weights])
+    ]
+    candidates = [
+        {"max_depth": depth, "min_samples_leaf": leaf, "class_weight": weight}
+        for depth in depths
+        for leaf in leaves
+        for weight in weights
+    ]
+    if not candidates:
+        return None
+    return {
+        "candidates": candidates,
+        "eta": max(2, int(search_cfg.get("eta", 3))),
+        "min_trades": int(search_cfg.get("min_trades", 20)),
+        "workers": int(search_cfg.get("workers", 0) or 0),
+        "holdout_folds": int(search_cfg.get("holdout_folds", 0) or 0),
+        "objective": str(config.get("train", {}).get("objective", "ev")).lower(),
+    }
+
+
+def build_search_folds(index: pd.DatetimeIndex, config: Dict, fallback_folds: int = 4) -> List[Tuple[int, int, int]]:
+    """Zeitlich geordnete Folds: Walk-Forward-Fenster, sonst expandierende Splits."""
+    months, split_ratio, _ = get_walk_forward_settings(config)
+    folds = build_walk_forward_folds(index, months, split_ratio)
+    if folds:
+        return folds
+    size = len(index)
+    chunk = size // (fallback_folds + 1)
+    if chunk == 0:
+        return []
+    return [(0, chunk * i, chunk * (i + 1) if i < fallback_folds else size) for i in range(1, fallback_folds + 1)]
+
+
+def _search_score(objective: str, trades: int, wins: int, profit: float, accuracy: float, min_trades: int) -> float:
+    if trades < min_trades:
+        return -np.inf
+    if objective == "winrate":
+        return wins / trades
+    if objective == "profit":
+        return profit
+    if objective == "accuracy":
+        return accuracy
+    return profit / trades
+
+
+def search_tree_params(
+    df: pd.DataFrame,
+    X: pd.DataFrame,
+    y: pd.Series,
+    settings: TrainingSettings,
+    symbol: str,
+    config: Dict,
+    reports_dir: Path,
+    lot_size: float,
+    tp_value: float,
+    sl_variants: List[str],
+    end_pos: Optional[int] = None,
+) -> Optional[Dict[str, object]]:
+    """Successive Halving über Baum-Parameter auf zeitlich geordneten Folds.
+
+    Runde 1 bewertet alle Kandidaten auf den jüngsten Folds, jede weitere Runde
+    behält das beste 1/eta und vergrößert das Fold-Budget um eta. Ergebnisse pro
+    (Kandidat, Fold) werden zwischen den Runden wiederverwendet. Die Folds liegen
+    komplett vor end_pos, damit die danach gemeldeten Walk-Forward-Fenster unberührt bleiben.
+    """
+    search = get_tree_search_settings(config)
+    if search is None:
+        return None
+    folds = build_search_folds(df.index[:end_pos], config)
+    if not folds:
+        logging.warning("%s: zu wenig Historie für die Parametersuche", symbol)
+        return None
+    objective = search["objective"]
+    if objective not in {"ev", "winrate", "profit", "accuracy"}:
+        logging.warning("%s: train.objective '%s' unbekannt, verwende ev", symbol, objective)
+        objective = "ev"
+    eta = search["eta"]
+    candidates = search["candidates"]
+    sl_variant = sl_variants[0] if sl_variants else "atr2.0"
+    workers = fit_thread_count(search["workers"])
+
+    rounds = max(1, int(np.ceil(np.log(len(candidates)) / np.log(eta))))
+    budget = max(1, len(folds) // eta ** (rounds - 1))
+    survivors = list(range(len(candidates)))
+    fold_results: Dict[Tuple[int, int], Optional[Dict[str, object]]] = {}
+    rows: List[Dict[str, object]] = []
+    round_no = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            round_no += 1
+            fold_ids = list(range(len(folds) - budget, len(folds)))
+            jobs = [(cand, fold) for cand in survivors for fold in fold_ids if (cand, fold) not in fold_results]
+            results = pool.map(
+                lambda job: _fit_walk_forward_fold(
+                    job[1] + 1, folds[job[1]], df, X, y, settings, symbol, config,
+                    lot_size, tp_value, sl_variant, candidates[job[0]],
+                ),
+                jobs,
+            )
+            for job, res in zip(jobs, results):
+                fold_results[job] = None if res is None else {key: res[key] for key in ("trades", "wins", "profit", "accuracy")}
+
+            scores = {}
+            for cand in survivors:
+                done = [fold_results[(cand, fold)] for fold in fold_ids if fold_results[(cand, fold)] is not None]
+                trades = sum(res["trades"] for res in done)
+                wins = sum(res["wins"] for res in done)
+                profit = sum(res["profit"] for res in done)
+                accuracy = float(np.mean([res["accuracy"] for res in done])) if done else 0.0
+                scores[cand] = _search_score(objective, trades, wins, profit, accuracy, search["min_trades"])
+                rows.append(dict(
+                    candidates[cand],
+                    class_weight=candidates[cand]["class_weight"] or "none",
+                    round=round_no,
+                    folds=len(done),
+                    trades=trades,
+                    winrate=wins / trades if trades else 0.0,
+                    profit=profit,
+                    score=scores[cand],
+                ))
+            survivors.sort(key=lambda cand: scores[cand], reverse=True)
+            if len(survivors) == 1 or (budget == len(folds) and scores[survivors[0]] == -np.inf):
+                break
+            survivors = survivors[:max(1, int(np.ceil(len(survivors) / eta)))]
+            budget = min(len(folds), budget * eta)
+
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    search_path = reports_dir / f"tree_search_{symbol}.csv"
+    pd.DataFrame(rows).to_csv(search_path, sep=";", index=False, float_format="%.4f")
+    best = survivors[0]
+    if scores[best] == -np.inf:
+        logging.info("%s: Parametersuche ohne Kandidat mit genug Trades, behalte Defaults", symbol)
+        return None
+    logging.info(
+        "%s: Parametersuche (%d Kandidaten, %d Runden, %s) → max_depth=%s min_samples_leaf=%s class_weight=%s | score=%.4f",
+        symbol,
+        len(candidates),
+        round_no,
+        objective,
+        candidates[best]["max_depth"],
+        candidates[best]["min_samples_leaf"],
+        candidates[best]["class_weight"],
+        scores[best],
+    )
+    return candidates[best]
+
+
+# ===== Walk-Forward =====
+def get_walk_forward_settings(config: Dict) -> Tuple[int, float, int]:
+    train_cfg = config.get("train", {})
+    months = int(train_cfg.get("walk_forward_months", 0) or 0)
+    split_ratio = _clamp(float(train_cfg.get("split_ratio", 0.8)), 0.1, 0.95)
+    workers = int(train_cfg.get("walk_forward_workers", 0) or 0)
+    return months, split_ratio, workers
+
+
+def build_walk_forward_folds(index: pd.DatetimeIndex, months: int, split_ratio: float) -> List[Tuple[int, int, int]]:
+    """Rollierende Fenster à `months` Monate: vorne split_ratio Training, Rest Test.
+
+    Das Fenster rückt jeweils um die Testspanne vor, die Testfenster schließen also
+    lückenlos aneinander an. Rückgabe: (train_start, test_start, test_end) als Positionen.
+    """
+    folds: List[Tuple[int, int, int]] = []
+    if months <= 0 or len(index) == 0:
+        return folds
+    span = (index[0] + pd.DateOffset(months=months)) - index[0]
+    train_span = span * split_ratio
+    test_span = span - train_span
+    split, last = index[0] + train_span, index[-1]
+    while split <= last:
+        train_pos, test_pos, end_pos = index.searchsorted([split - train_span, split, split + test_span])
+        if end_pos > test_pos:
+            folds.append((int(train_pos), int(test_pos), int(end_pos)))
+        split = split + test_span
+    return folds
+
+
+def holdout_walk_forward_folds(
+    folds: List[Tuple[int, int, int]],
+    holdout: int,
+    hold_bars: int,
+) -> Tuple[List[Tuple[int, int, int]], int]:
+    """Jüngste Folds für die Walk-Forward-Bewertung zurückhalten.
+
+    holdout <= 0 → ein Drittel der Folds (mindestens einer). Rückgabe: gemeldete Folds
+    und das Ende der Suchdaten (erster gemeldeter Testbar minus hold_bars Embargo).
+    """
+    count = min(len(folds), holdout if holdout > 0 else max(1, len(folds) // 3))
+    reported = folds[-count:]
+    return reported, max(0, reported[0][1] - hold_bars)
+
+
+def _fit_walk_forward_fold(
+    fold_no: int,
+    bounds: Tuple[int, int, int],
+    df: pd.DataFrame,
+    X: pd.DataFrame,
+    y: pd.Series,
+    settings: TrainingSettings,
+    symbol: str,
+    config: Dict,
+    lot_size: float,
+    tp_value: float,
+    sl_variant: str,
+    tree_params: Optional[Dict[str, object]] = None,
+) -> Optional[Dict[str, object]]:
+    train_pos, test_pos, end_pos = bounds
+    # Embargo: Targets schauen hold_bars Bars voraus, die letzten Trainingszeilen kennen sonst den Testbeginn
+    train_end = max(train_pos, test_pos - settings.hold_bars)
+    y_train = y.iloc[train_pos:train_end]
+    if len(y_train) < settings.min_positive or y_train.nunique() < 2:
+        return None
+    model, scaler = train_model(X.iloc[train_pos:train_end], y_train, tree_params)
+    X_test = X.iloc[test_pos:end_pos]
+    y_test = y.iloc[test_pos:end_pos]
+    preds = model.predict(scaler.transform(X_test))
+    prob_buy, prob_sell = model_probabilities(model, scaler, X_test)
+    df_test = apply_model_signals(df.iloc[test_pos:end_pos], prob_buy, prob_sell, settings.rule_threshold)
+    trades, wins, profit, _ = simulate_trades(df_test, symbol, config, lot_size, tp_value, sl_variant)
+    return {
+        "fold": fold_no,
+        "train_start": df.index[train_pos],
+        "test_start": df.index[test_pos],
+        "test_end": df.index[end_pos - 1],
+        "samples_train": int(len(y_train)),
+        "samples_test": int(len(y_test)),
+        "accuracy": float((preds == y_test.to_numpy()).mean()),
+        "trades": trades,
+        "wins": wins,
+        "winrate": wins / trades if trades else 0.0,
+        "profit": profit,
+        "y_test": y_test.to_numpy(),
+        "preds": preds,
+        "oos": (test_pos, end_pos, prob_buy, prob_sell, None),
+    }
+
+
+def run_walk_forward(
+    df: pd.DataFrame,
+    X: pd.DataFrame,
+    y: pd.Series,
+    settings: TrainingSettings,
+    symbol: str,
+    config: Dict,
+    reports_dir: Path,
+    lot_size: float,
+    tp_value: float,
+    sl_variants: List[str],
+    tree_params: Optional[Dict[str, object]] = None,
+    folds: Optional[List[Tuple[int, int, int]]] = None,
+) -> Optional[Tuple[object, object, Dict[str, float], List[OosSegment]]]:
+    """Walk-Forward über die einmal berechneten Features.
+
+    Die Folds liefern nur die Out-of-Sample-Bewertung (Metriken und je Fold die
+    Test-Wahrscheinlichkeiten für den Threshold-Sweep). Exportiert wird ein Modell,
+    das einmal auf der gesamten Historie bis zum letzten Bar trainiert wird.
+    """
+    months, split_ratio, workers = get_walk_forward_settings(config)
+    if folds is None:
+        folds = build_walk_forward_folds(df.index, months, split_ratio)
+    if not folds:
+        return None
+    sl_variant = sl_variants[0] if sl_variants else "atr2.0"
+    fold_args = (df, X, y, settings, symbol, config, lot_size, tp_value, sl_variant, tree_params)
+    workers = min(len(folds), fit_thread_count(workers))
+    # Die Baum-Fits geben den GIL frei, Threads teilen sich die Feature-Arrays ohne Kopie
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda item: _fit_walk_forward_fold(item[0], item[1], *fold_args), enumerate(folds, 1)))
+    else:
+        results = [_fit_walk_forward_fold(fold_no, bounds, *fold_args) for fold_no, bounds in enumerate(folds, 1)]
+    results = [res for res in results if res is not None]
+    if not results:
+        logging.warning("%s: Walk-Forward ohne verwertbare Folds, nutze Zufalls-Split", symbol)
+        return None
+
+    report_cols = [
+        "fold", "train_start", "test_start", "test_end", "samples_train", "samples_test",
+        "accuracy", "trades", "wins", "winrate", "profit",
+    ]
+    fold_frame = pd.DataFrame([{col: res[col] for col in report_cols} for res in results])
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    fold_path = reports_dir / f"walk_forward_{symbol}.csv"
+    fold_frame.to_csv(fold_path, sep=";", index=False, float_format="%.4f")
+
+    y_true = np.concatenate([res["y_test"] for res in results])
+    preds = np.concatenate([res["preds"] for res in results])
+    write_training_report(y_true, preds, symbol, reports_dir)
+    logging.info(
+        "%s: Walk-Forward %d Folds (%d Monate, Split %.2f) | OOS accuracy=%.3f trades=%d profit=%.2f → %s",
+        symbol,
+        len(results),
+        months,
+        split_ratio,
+        float((preds == y_true).mean()),
+        int(fold_frame["trades"].sum()),
+        float(fold_frame["profit"].sum()),
+        fold_path.name,
+    )
+    metrics = {
+        "accuracy": float((preds == y_true).mean()),
+        "positives_test": int((y_true != 0).sum()),
+        "samples_test": int(len(y_true)),
+        "folds": len(results),
+    }
+    model, scaler = train_model(X, y, tree_params)
+    logging.info("%s: Exportmodell auf der gesamten Historie trainiert (%d Zeilen bis %s)", symbol, len(y), df.index[-1])
+    return model, scaler, metrics, [res["oos"] for res in results]
+
+
 def process_symbol(
     symbol: str,
     data_root: Path,
@@ -1168,6 +2764,7 @@ def process_symbol(
         apply_symbol_tp_settings(rule_info, config, symbol)
         tree_lines = ["// TradeActive=false (config override) – ML deaktiviert"]
         signal_examples: List[Tuple[pd.Timestamp, float]] = []
+        write_symbol_trades(symbol, None, reports_dir)
         rules_count = export_rules(
             symbol,
             rules_dir=rules_root,
@@ -1188,7 +2785,14 @@ def process_symbol(
             winrate=0.0,
         )
 
-    df = prepare_dataset(symbol, data_root, settings)
+    timer = StageTimer()
+    cache_dir = models_dir / FEATURE_CACHE_SUBDIR if settings.feature_cache else None
+    frame = load_feature_frame(symbol, data_root, settings, config, cache_dir, timer)
+    # Drift-Referenz aus allen Feature-Bars, bevor build_targets neutrale Zeilen verwirft
+    drift = get_drift_settings(config)
+    drift_reference = build_drift_reference(frame, drift) if drift and not frame.empty else None
+    df = prepare_dataset(symbol, data_root, settings, config, cache_dir, timer, frame)
+    del frame
     if df.empty:
         logging.warning("%s: Keine Daten nach Vorbereitung", symbol)
         return None
@@ -1196,33 +2800,99 @@ def process_symbol(
     if directional < settings.min_positive:
         logging.warning("%s: zu wenige verwertbare Beispiele (%d < %d)", symbol, directional, settings.min_positive)
         return None
-    X, y = split_features_target(df, symbol, config)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y,
-        test_size=settings.test_size,
-        random_state=settings.random_state,
-        stratify=y if y.nunique() > 1 else None,
-    )
-    model, scaler = train_model(X_train, y_train)
-    metrics = evaluate_model(model, scaler, X_test, y_test, symbol, reports_dir)
-    df_signals = build_model_signals(df, model, scaler, settings.rule_threshold, symbol, config)
-
+    with timer.stage("split_features"):
+        X, y = split_features_target(df, symbol, config)
+    months, split_ratio, _ = get_walk_forward_settings(config)
+    report_folds = build_walk_forward_folds(df.index, months, split_ratio)
+    search_end = len(df)
+    search = get_tree_search_settings(config)
+    if search is not None and report_folds:
+        # Die Suche wählt auf ihren Folds aus – gemeldet werden nur Folds, die sie nie gesehen hat
+        report_folds, search_end = holdout_walk_forward_folds(report_folds, search["holdout_folds"], settings.hold_bars)
+        logging.info(
+            "%s: Parametersuche bis %s, Walk-Forward meldet %d zurückgehaltene Folds",
+            symbol, df.index[max(search_end - 1, 0)], len(report_folds),
+        )
+    tree_params = dict(DEFAULT_TREE_PARAMS)
+    with timer.stage("tree_search"):
+        tree_params.update(
+            search_tree_params(
+                df, X, y, settings, symbol, config, reports_dir, lot_size, tp_value, sl_variants, search_end,
+            ) or {}
+        )
+    # Walk-Forward bewertet jeden Fold direkt nach dem Fit, das landet komplett in "fit"
+    with timer.stage("fit"):
+        walk_forward = run_walk_forward(
+            df, X, y, settings, symbol, config, reports_dir, lot_size, tp_value, sl_variants, tree_params, report_folds,
+        )
+    test_rows = None
+    if walk_forward is not None:
+        model, scaler, metrics, oos_segments = walk_forward
+    else:
+        with timer.stage("fit"):
+            train_rows, test_rows = train_test_split(
+                np.arange(len(X)),
+                test_size=settings.test_size,
+                random_state=settings.random_state,
+                stratify=y if y.nunique() > 1 else None,
+            )
+            model, scaler = train_model(X.iloc[train_rows], y.iloc[train_rows], tree_params)
+        with timer.stage("evaluate"):
+            metrics = evaluate_model(model, scaler, X.iloc[test_rows], y.iloc[test_rows], symbol, reports_dir)
     rules_cfg = config.get("rules", {})
     min_trades = int(rules_cfg.get("min_trades", 50))
     min_winrate = float(rules_cfg.get("min_winrate", 0.6))
-
-    best_rules = find_best_rule_parameters(
-        df_signals,
-        symbol,
-        config,
-        lot_size,
-        min_trades,
-        min_winrate,
-        period_days,
-        tp_value,
-        sl_variants,
-    )
-    intelligent_params = compute_intelligent_parameters(df_signals, config, symbol)
+    with timer.stage("signals"):
+        price_index = PriceRangeIndex.from_frame(df)
+        prob_buy, prob_sell = model_probabilities(model, scaler, X)
+    if test_rows is not None:
+        # Ohne Walk-Forward sind die Testzeilen des Zufalls-Splits die einzigen Out-of-Sample-Bars
+        test_mask = np.zeros(len(df), dtype=bool)
+        test_mask[test_rows] = True
+        oos_segments = [(0, len(df), prob_buy, prob_sell, test_mask)]
+    rule_threshold = settings.rule_threshold
+    sweep = get_threshold_sweep_settings(config)
+    if sweep is not None:
+        with timer.stage("threshold_sweep"):
+            curve = oos_threshold_curve(
+                df,
+                oos_segments,
+                sweep["thresholds"],
+                symbol,
+                config,
+                lot_size,
+                tp_value,
+                sl_variants[0] if sl_variants else "atr2.0",
+                price_index,
+            )
+            write_threshold_curve(symbol, curve, reports_dir)
+            if sweep["auto_pick"]:
+                picked = pick_rule_threshold(curve, min_trades, min_winrate)
+                if picked is None:
+                    logging.info("%s: Kein Threshold erfüllt min_trades/min_winrate out-of-sample, bleibe bei %.2f", symbol, rule_threshold)
+                else:
+                    logging.info("%s: rule_threshold automatisch (out-of-sample) %.2f → %.2f", symbol, rule_threshold, picked)
+                    rule_threshold = picked
+    with timer.stage("signals"):
+        df_signals = apply_model_signals(df, prob_buy, prob_sell, rule_threshold)
+
+    with timer.stage("sl_search"):
+        best_rules = find_best_rule_parameters(
+            df_signals,
+            symbol,
+            config,
+            lot_size,
+            min_trades,
+            min_winrate,
+            period_days,
+            tp_value,
+            sl_variants,
+            tp_grid=get_tp_grid(config),
+            reports_dir=reports_dir,
+            price_index=price_index,
+        )
+    with timer.stage("calibration"):
+        intelligent_params = compute_intelligent_parameters(df_signals, config, symbol, price_index)
     if best_rules:
         total_trades = best_rules["trades"]
         total_wins = best_rules["wins"]
@@ -1254,21 +2924,33 @@ def process_symbol(
             override_reason=None,
         )
 
+    rule_info["tree_params"] = tree_params
+    rule_info["rule_threshold"] = rule_threshold
     apply_symbol_tp_settings(rule_info, config, symbol)
 
-    tree_lines = export_decision_tree_lines(model)
-    signal_examples = []
-    if "model_prob" in df_signals.columns:
-        top = df_signals[df_signals["signal"] != 0].nlargest(5, "model_prob")
-        signal_examples = [(idx, float(row["model_prob"])) for idx, row in top.iterrows()]
-
-    rules_count = export_rules(symbol, rules_dir=rules_root, rule_info=rule_info, tree_lines=tree_lines, signal_examples=signal_examples)
-    save_model(symbol, model, scaler, models_dir)
+    with timer.stage("export"):
+        tree_lines = export_decision_tree_lines(model)
+        signal_examples = []
+        if "model_prob" in df_signals.columns:
+            top = df_signals[df_signals["signal"] != 0].nlargest(5, "model_prob")
+            signal_examples = [(idx, float(row["model_prob"])) for idx, row in top.iterrows()]
+        rules_count = export_rules(symbol, rules_dir=rules_root, rule_info=rule_info, tree_lines=tree_lines, signal_examples=signal_examples)
+        write_symbol_trades(symbol, best_rules.get("trades_df") if best_rules else None, reports_dir)
+    with timer.stage("save"):
+        save_model(symbol, model, scaler, models_dir, rule_threshold)
 
     trades_total = rule_info["trades"]
     trades_won = rule_info["wins"]
     profit_total = rule_info["profit_window"]
     winrate = rule_info["winrate"]
+    peak_rss = timer.peak_mb()
+    if peak_rss is not None:
+        logging.info("%s: Peak-RSS %.0f MB (%s)", symbol, peak_rss, "kompakt" if settings.compact_memory else "float64")
+    logging.info(
+        "%s: Stufen %s",
+        symbol,
+        " | ".join(f"{name} {entry['wall_s']:.2f}s" for name, entry in timer.stages.items()),
+    )
     return SymbolResult(
         symbol=symbol,
         samples=int(len(df)),
@@ -1280,10 +2962,475 @@ def process_symbol(
         profit_account=profit_total,
         lot_size=lot_size,
         winrate=winrate,
+        peak_rss_mb=peak_rss,
+        stages=timer.stages,
+        drift_reference=drift_reference,
     )
 
 
-def write_summary(results: List[SymbolResult], reports_dir: Path, trading_enabled: bool) -> None:
+# ===== Portfolio-Backtest =====
+PORTFOLIO_EQUITY_NAME = "portfolio_equity.csv"
+
+
+def get_portfolio_settings(config: Dict) -> Optional[Dict[str, object]]:
+    portfolio_cfg = config.get("portfolio", {})
+    if not isinstance(portfolio_cfg, dict) or not portfolio_cfg.get("enabled", True):
+        return None
+    return {
+        "months": max(1, int(portfolio_cfg.get("months", 24))),
+        "include_inactive": bool(portfolio_cfg.get("include_inactive", False)),
+        "stop_hours_before_close": int(portfolio_cfg.get("stop_hours_before_close", 5)),
+        "min_gap_hours": int(portfolio_cfg.get("min_gap_hours", 6)),
+    }
+
+
+def weekend_gate_mask(
+    bar_times: pd.DatetimeIndex, entry_times: np.ndarray, stop_hours: int, min_gap_hours: int
+) -> np.ndarray:
+    """Gap-Schutz des EA: keine Entries kurz vor Marktschluss vor einer langen Pause.
+
+    Sessionenden werden aus Lücken in den Bars abgeleitet (EA: SymbolInfoSessionTrade).
+    Entscheidungszeitpunkt ist der Schluss des Signal-Bars.
+    """
+    if not isinstance(bar_times, pd.DatetimeIndex):
+        return np.zeros(len(entry_times), dtype=bool)
+    times = bar_times.as_unit("ns").asi8
+    if len(times) < 2 or len(entry_times) == 0:
+        return np.zeros(len(entry_times), dtype=bool)
+    hour = np.int64(3_600_000_000_000)
+    bar_ns = np.int64(np.median(np.diff(times)))
+    session_end = times[:-1] + bar_ns
+    gap_hours = (times[1:] - session_end) // hour
+    close_times = session_end[gap_hours > min_gap_hours]
+    if len(close_times) == 0:
+        return np.zeros(len(entry_times), dtype=bool)
+    decision = entry_times + bar_ns
+    pos = np.searchsorted(close_times, decision, side="right")
+    hours_to_close = (close_times[np.minimum(pos, len(close_times) - 1)] - decision) // hour
+    return (pos < len(close_times)) & (hours_to_close > 0) & (hours_to_close <= stop_hours)
+
+
+def load_portfolio_streams(
+    symbols: List[str],
+    data_root: Path,
+    rules_root: Path,
+    reports_dir: Path,
+    config: Dict,
+    portfolio: Dict[str, object],
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """Trades je Symbol als Arrays (ns-Zeiten, Profit pro Lot in Kontowährung, Gap-Sperre)."""
+    account_currency = config.get("account", {}).get("currency", "EUR")
+    fx = get_fx_rates(config.get("exchange_rates", {}))
+    streams: Dict[str, Dict[str, np.ndarray]] = {}
+    for symbol in symbols:
+        header = read_rules_header(rules_root / f"rules_{symbol}.txt")
+        if not portfolio["include_inactive"] and header.get("TradeActive", "false").lower() != "true":
+            continue
+        trades_path = reports_dir / f"trades_{symbol}.csv"
+        if not trades_path.exists():
+            continue
+        trades = pd.read_csv(trades_path, sep=";")
+        if trades.empty:
+            continue
+        symbol_cfg = (config.get("symbols") or {}).get(symbol, {})
+        contract_size = float(symbol_cfg.get("contract_size", 100000.0)) or 100000.0
+        quote_currency = symbol_cfg.get("quote_currency", account_currency)
+        entry = pd.to_datetime(trades["entry_time"], format=CSV_TIME_FORMAT).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        exit_ = pd.to_datetime(trades["exit_time"], format=CSV_TIME_FORMAT).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        move = (trades["exit_price"].to_numpy(dtype=float) - trades["entry_price"].to_numpy(dtype=float))
+        profit_quote = move * trades["direction"].to_numpy(dtype=float) * contract_size
+        try:
+            bar_times = load_symbol_csv(symbol, "H1", data_root).index
+        except Exception as exc:
+            logging.warning("%s: H1-Daten für Gap-Schutz fehlen (%s)", symbol, exc)
+            bar_times = pd.DatetimeIndex([])
+        streams[symbol] = {
+            "entry": entry,
+            "exit": np.maximum(exit_, entry),
+            "profit_per_lot": np.asarray(fx.convert(profit_quote, quote_currency, account_currency), dtype=float),
+            "gated": weekend_gate_mask(
+                bar_times, entry, portfolio["stop_hours_before_close"], portfolio["min_gap_hours"]
+            ),
+        }
+    return streams
+
+
+def run_portfolio_backtest(
+    symbols: List[str],
+    data_root: Path,
+    rules_root: Path,
+    reports_dir: Path,
+    config: Dict,
+    portfolio: Dict[str, object],
+) -> Optional[Dict[str, object]]:
+    """Alle Symbol-Trades zeitlich mergen und mit den Konto-Regeln des EA durchspielen.
+
+    Ereignisse laufen über einen Heap (Exits vor Entries bei gleicher Zeit). Je Symbol
+    höchstens eine Position, Lot aus aktuellem Kontostand via risk_percent, Margin-Watch
+    wie im EA: nach abgelehntem Entry erst wieder handeln, wenn Positionen geschlossen wurden.
+    """
+    streams = load_portfolio_streams(symbols, data_root, rules_root, reports_dir, config, portfolio)
+    if not streams:
+        logging.info("Portfolio-Backtest: keine aktiven Symbole mit Trades")
+        return None
+
+    latest = max(int(stream["entry"][-1]) for stream in streams.values())
+    cutoff = (pd.Timestamp(latest) - pd.DateOffset(months=portfolio["months"])).value
+    account_cfg = config.get("account", {})
+    starting_balance = float(account_cfg.get("starting_balance", 10000.0))
+    risk_share = float(account_cfg.get("risk_percent", 1.0)) / 100.0
+    symbols_cfg = config.get("symbols") or {}
+
+    heap: List[Tuple[int, int, str, int]] = []
+    sizing: Dict[str, Tuple[Dict, float]] = {}
+    standalone_profit = 0.0
+    for symbol, stream in streams.items():
+        start = int(np.searchsorted(stream["entry"], cutoff, side="left"))
+        if start < len(stream["entry"]):
+            heapq.heappush(heap, (int(stream["entry"][start]), 1, symbol, start))
+        sizing[symbol] = (symbols_cfg.get(symbol, {}), margin_per_lot(symbol, config))
+        standalone_profit += float(stream["profit_per_lot"][start:].sum()) * calculate_lot_size(symbol, config)
+
+    balance = starting_balance
+    peak_balance = balance
+    max_drawdown = 0.0
+    used_margin = 0.0
+    positions: Dict[str, Tuple[float, float]] = {}
+    margin_block: Optional[int] = None
+    skipped = {"position": 0, "weekend": 0, "margin": 0}
+    taken = wins = 0
+    max_positions = 0
+    curve: List[Tuple[int, str, float, float, float, int]] = []
+
+    while heap:
+        when, kind, symbol, idx = heapq.heappop(heap)
+        stream = streams[symbol]
+        if kind == 0:
+            lot, margin = positions.pop(symbol)
+            profit = float(stream["profit_per_lot"][idx]) * lot
+            balance += profit
+            used_margin -= margin
+            wins += profit > 0
+            peak_balance = max(peak_balance, balance)
+            max_drawdown = max(max_drawdown, (peak_balance - balance) / peak_balance if peak_balance > 0 else 0.0)
+            curve.append((when, symbol, lot, profit, balance, len(positions)))
+            if margin_block is not None and len(positions) < margin_block:
+                margin_block = None
+            continue
+
+        if idx + 1 < len(stream["entry"]):
+            heapq.heappush(heap, (int(stream["entry"][idx + 1]), 1, symbol, idx + 1))
+        if symbol in positions:
+            skipped["position"] += 1
+            continue
+        if stream["gated"][idx]:
+            skipped["weekend"] += 1
+            continue
+        if margin_block is not None or balance <= 0:
+            skipped["margin"] += 1
+            continue
+        symbol_cfg, lot_margin = sizing[symbol]
+        lot = normalize_lot(balance * risk_share / lot_margin, symbol_cfg) if lot_margin > 0 else float(symbol_cfg.get("min_lot", 0.01))
+        margin = lot * lot_margin
+        if used_margin + margin > balance:
+            skipped["margin"] += 1
+            if positions:
+                margin_block = len(positions)
+            continue
+        positions[symbol] = (lot, margin)
+        used_margin += margin
+        taken += 1
+        max_positions = max(max_positions, len(positions))
+        heapq.heappush(heap, (int(stream["exit"][idx]), 0, symbol, idx))
+
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    equity = pd.DataFrame(curve, columns=["time", "symbol", "lot", "profit", "balance", "open_positions"])
+    equity["time"] = pd.to_datetime(equity["time"])
+    equity.to_csv(reports_dir / PORTFOLIO_EQUITY_NAME, sep=";", index=False, float_format="%.2f", date_format=CSV_TIME_FORMAT)
+
+    summary = {
+        "symbols": len(streams),
+        "months": portfolio["months"],
+        "start": pd.Timestamp(cutoff).isoformat(),
+        "end": pd.Timestamp(latest).isoformat(),
+        "trades": taken,
+        "wins": int(wins),
+        "skipped_position": skipped["position"],
+        "skipped_weekend": skipped["weekend"],
+        "skipped_margin": skipped["margin"],
+        "starting_balance": starting_balance,
+        "final_balance": balance,
+        "profit": balance - starting_balance,
+        "standalone_profit": standalone_profit,
+        "max_drawdown": max_drawdown,
+        "max_open_positions": max_positions,
+    }
+    logging.info(
+        "Portfolio-Backtest: %d Symbole, %d Trades (übersprungen: Position %d, Gap %d, Margin %d), "
+        "Profit %.2f vs. %.2f Einzel-Summe, Max-DD %.1f%%",
+        summary["symbols"], taken, skipped["position"], skipped["weekend"], skipped["margin"],
+        summary["profit"], standalone_profit, max_drawdown * 100,
+    )
+    return summary
+
+
+# ===== Run-Manifest =====
+def symbol_input_fingerprint(
+    symbol: str,
+    data_root: Path,
+    config: Dict,
+    settings: TrainingSettings,
+    include_data: bool = True,
+) -> str:
+    """Hash über alles, was das Training eines Symbols bestimmt: Daten, Config-Blöcke, Settings, Code."""
+    csv_path = data_root / f"{symbol}_H1.csv"
+    symbol_cfg = dict(iter_symbol_configs(config.get("symbols", {}))).get(symbol, {})
+    payload = {
+        "code": _file_digest(Path(__file__)),
+        "data": _file_digest(csv_path) if include_data and csv_path.exists() else None,
+        "symbol": symbol_cfg,
+        "sections": {key: config.get(key) for key in TRAINING_CONFIG_SECTIONS},
+        "settings": asdict(settings),
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def load_run_manifest(path: Path) -> Dict[str, Dict[str, object]]:
+    if not path.exists():
+        return {}
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as exc:
+        logging.warning("Run-Manifest %s unlesbar (%s), trainiere alle Symbole", path.name, exc)
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _write_json_atomic(path: Path, payload: Dict[str, object]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def save_run_manifest(path: Path, manifest: Dict[str, Dict[str, object]]) -> None:
+    _write_json_atomic(path, manifest)
+
+
+def new_run_progress(symbols: List[str]) -> Dict[str, object]:
+    return {
+        "started": pd.Timestamp.now().isoformat(),
+        "finished": None,
+        "elapsed": 0.0,
+        "symbols": list(symbols),
+        "done": [],
+        "failed": [],
+    }
+
+
+def load_run_progress(path: Path) -> Optional[Dict[str, object]]:
+    """Fortschritt eines abgebrochenen Laufs, None wenn keiner offen ist."""
+    if not path.exists():
+        return None
+    try:
+        progress = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as exc:
+        logging.warning("Fortschrittsdatei %s unlesbar (%s)", path.name, exc)
+        return None
+    if not isinstance(progress, dict) or progress.get("finished"):
+        return None
+    return progress
+
+
+def save_run_progress(path: Path, progress: Dict[str, object]) -> None:
+    _write_json_atomic(path, progress)
+
+
+def reusable_result(entry: Optional[Dict[str, object]], fingerprint: str, rules_path: Path) -> Optional[SymbolResult]:
+    """SymbolResult aus dem Manifest, wenn Eingaben identisch und die Rules-Datei noch vorhanden ist."""
+    if not entry or entry.get("inputs") != fingerprint or not rules_path.exists():
+        return None
+    known = {field.name for field in fields(SymbolResult)}
+    try:
+        return SymbolResult(**{key: value for key, value in entry["result"].items() if key in known})
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+
+# ===== Drift-Check =====
+def get_drift_settings(config: Dict) -> Optional[Dict[str, object]]:
+    drift_cfg = config.get("drift", {})
+    if not isinstance(drift_cfg, dict) or not drift_cfg.get("enabled", False):
+        return None
+    return {
+        "columns": _ensure_str_list(drift_cfg.get("columns"), ["adx", "atr", "weibull_prob"]),
+        "bins": max(2, int(drift_cfg.get("bins", 10))),
+        "psi_limit": float(drift_cfg.get("psi_limit", 0.25)),
+        "reference_bars": max(50, int(drift_cfg.get("reference_bars", 2000))),
+        "window_bars": max(50, int(drift_cfg.get("window_bars", 500))),
+        "min_bars": max(1, int(drift_cfg.get("min_bars", 24))),
+        "max_bars": int(drift_cfg.get("max_bars", 720)),
+        "winrate_drop": float(drift_cfg.get("winrate_drop", 0.15)),
+        "min_trades": int(drift_cfg.get("min_trades", 10)),
+    }
+
+
+def build_drift_reference(frame: pd.DataFrame, drift: Dict[str, object]) -> Dict[str, object]:
+    """Quantil-Bins und Anteile der Drift-Spalten über das jüngste Trainingsfenster."""
+    window = frame.iloc[-drift["reference_bars"]:]
+    inner = np.linspace(0.0, 1.0, drift["bins"] + 1)[1:-1]
+    columns = {}
+    for col in drift["columns"]:
+        if col not in window.columns:
+            continue
+        values = window[col].to_numpy(dtype=float)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            continue
+        edges = np.unique(np.quantile(values, inner))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        columns[col] = {"edges": edges.tolist(), "share": (counts / counts.sum()).tolist()}
+    return {"trained_until": frame.index[-1].isoformat(), "columns": columns}
+
+
+def population_stability_index(edges: List[float], reference_share: List[float], values: np.ndarray) -> float:
+    values = values[np.isfinite(values)]
+    counts = np.bincount(np.searchsorted(np.asarray(edges), values, side="right"), minlength=len(edges) + 1)
+    current = np.clip(counts / max(counts.sum(), 1), 1e-4, None)
+    reference = np.clip(np.asarray(reference_share, dtype=float), 1e-4, None)
+    return float(np.sum((current - reference) * np.log(current / reference)))
+
+
+def read_rules_header(path: Path) -> Dict[str, str]:
+    header: Dict[str, str] = {}
+    if not path.exists():
+        return header
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.startswith("// ==="):
+            break
+        key, sep, value = line.partition(":")
+        if sep and not key.startswith("//"):
+            header[key.strip()] = value.strip()
+    return header
+
+
+def check_symbol_drift(
+    symbol: str,
+    data_root: Path,
+    rules_dir: Path,
+    models_dir: Path,
+    settings: TrainingSettings,
+    config: Dict,
+    reference: Dict[str, object],
+    drift: Dict[str, object],
+) -> Tuple[bool, str]:
+    """Drift seit dem letzten Training; Rückgabe (neu trainieren?, Grund).
+
+    Verteilungen (PSI) werden über die letzten window_bars Bars verglichen – ADX/ATR
+    sind stark autokorreliert, ein paar neue Bars allein treffen nur wenige Bins.
+    Die Live-Winrate der exportierten Rules zählt nur Trades auf den neuen Bars.
+    """
+    cache_dir = models_dir / FEATURE_CACHE_SUBDIR if settings.feature_cache else None
+    frame = load_feature_frame(symbol, data_root, settings, config, cache_dir)
+    if frame.empty:
+        return True, "keine Daten"
+    new_bars = frame[frame.index > pd.Timestamp(reference["trained_until"])]
+    if len(new_bars) < drift["min_bars"]:
+        return False, f"{len(new_bars)} neue Bars (< {drift['min_bars']})"
+    if 0 < drift["max_bars"] <= len(new_bars):
+        return True, f"{len(new_bars)} neue Bars (>= {drift['max_bars']})"
+
+    recent = frame.iloc[-drift["window_bars"]:]
+    for col, ref in (reference.get("columns") or {}).items():
+        if col not in recent.columns:
+            continue
+        psi = population_stability_index(ref["edges"], ref["share"], recent[col].to_numpy(dtype=float))
+        if psi > drift["psi_limit"]:
+            return True, f"PSI {col}={psi:.3f} > {drift['psi_limit']:.2f}"
+
+    header = read_rules_header(rules_dir / f"rules_{symbol}.txt")
+    model_path = models_dir / f"{symbol}_model.pkl"
+    if model_path.exists() and {"SL", "WinRate"} <= header.keys():
+        artifact = joblib.load(model_path)
+        # Wie im Training replizieren: dort benutzte Schwelle und TP-Multiplikator aus der Config
+        # (im Swing-Modus steht im Header TP 0.00, jeder Trade träfe sofort den TP)
+        rule_threshold = artifact.get("rule_threshold")
+        if rule_threshold is None:
+            rule_threshold = float(header.get("RuleThreshold", settings.rule_threshold))
+        features = normalize_features(new_bars[FEATURE_COLUMNS], symbol, config)
+        prob_buy, prob_sell = model_probabilities(artifact["model"], artifact["scaler"], features)
+        signals = apply_model_signals(new_bars, prob_buy, prob_sell, rule_threshold)
+        trades, wins, _, _ = simulate_trades(
+            signals,
+            symbol,
+            config,
+            calculate_lot_size(symbol, config),
+            get_symbol_tp_multiplier(config, symbol),
+            header["SL"],
+        )
+        expected = float(header["WinRate"]) / 100.0
+        if trades >= drift["min_trades"] and wins / trades < expected - drift["winrate_drop"]:
+            return True, f"Live-Winrate {wins / trades:.2f} < {expected:.2f} - {drift['winrate_drop']:.2f} ({trades} Trades)"
+    return False, f"kein Drift über {len(new_bars)} neue Bars"
+
+
+def train_symbols(
+    symbols: List[str],
+    workers: int,
+    *process_args,
+    on_result: Optional[Callable[[str, Optional[SymbolResult]], None]] = None,
+) -> List[Tuple[str, Optional[SymbolResult]]]:
+    """Ruft process_symbol für alle Symbole auf (optional im Prozess-Pool), Reihenfolge wie in der Config.
+
+    on_result wird im Hauptprozess direkt nach jedem fertigen Symbol aufgerufen (Checkpoint).
+    """
+    outcomes: Dict[str, Optional[SymbolResult]] = {}
+    if workers <= 1 or len(symbols) <= 1:
+        for symbol in symbols:
+            try:
+                res = process_symbol(symbol, *process_args)
+            except Exception:
+                logging.exception("%s: Training abgebrochen", symbol)
+                res = None
+            outcomes[symbol] = res
+            if on_result:
+                on_result(symbol, res)
+        return [(symbol, outcomes[symbol]) for symbol in symbols]
+
+    logging.info("Starte Prozess-Pool mit %d Workern für %d Symbole", workers, len(symbols))
+    context = multiprocessing.get_context()
+    log_queue = context.Queue()
+    listener = QueueListener(log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=init_symbol_worker,
+            initargs=(log_queue, min(workers, len(symbols))),
+        ) as pool:
+            futures = {pool.submit(process_symbol, symbol, *process_args): symbol for symbol in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    res = future.result()
+                except Exception:
+                    logging.exception("%s: Training abgebrochen", symbol)
+                    res = None
+                outcomes[symbol] = res
+                if on_result:
+                    on_result(symbol, res)
+    finally:
+        listener.stop()
+    return [(symbol, outcomes[symbol]) for symbol in symbols]
+
+
+def write_summary(
+    results: List[SymbolResult],
+    reports_dir: Path,
+    trading_enabled: bool,
+    portfolio: Optional[Dict[str, object]] = None,
+) -> None:
     reports_dir.mkdir(parents=True, exist_ok=True)
     summary_path = reports_dir / "training_summary.md"
     with summary_path.open("w", encoding='utf-8') as handle:
@@ -1293,15 +3440,89 @@ def write_summary(results: List[SymbolResult], reports_dir: Path, trading_enable
         if not results:
             handle.write("Keine Symbole erfolgreich trainiert.\n")
             return
-        handle.write("| Symbol | Samples | Positive | Rules | Accuracy | Trades | Winrate | Profit |\n")
-        handle.write("|--------|---------|----------|-------|----------|--------|---------|--------|\n")
+        handle.write("| Symbol | Samples | Positive | Rules | Accuracy | Trades | Winrate | Profit | Peak-RSS MB |\n")
+        handle.write("|--------|---------|----------|-------|----------|--------|---------|--------|-------------|\n")
         for res in results:
+            peak_rss = f"{res.peak_rss_mb:.0f}" if res.peak_rss_mb is not None else "-"
+            handle.write(
+                f"| {res.symbol} | {res.samples} | {res.positives} | {res.rules} | {res.accuracy:.3f} | {res.trades_total} | {res.winrate:.2f} | {res.profit_account:.2f} | {peak_rss} |\n"
+            )
+        rollup = rollup_stage_timings(results)
+        if rollup:
+            handle.write("\n## Laufzeit je Stufe\n\n")
+            handle.write("| Stufe | Wall s | CPU s | Anteil | Peak-RSS MB | Langsamstes Symbol |\n")
+            handle.write("|-------|--------|-------|--------|-------------|--------------------|\n")
+            for row in rollup:
+                peak = f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] is not None else "-"
+                handle.write(
+                    f"| {row['stage']} | {row['wall_s']:.2f} | {row['cpu_s']:.2f} | {row['share'] * 100:.1f}% | {peak} "
+                    f"| {row['slowest_symbol']} ({row['slowest_wall_s']:.2f} s) |\n"
+                )
+            handle.write("\n| Symbol | Stufe | Wall s | CPU s | Peak-RSS MB |\n")
+            handle.write("|--------|-------|--------|-------|-------------|\n")
+            for res in results:
+                for name, entry in (res.stages or {}).items():
+                    peak = f"{entry['peak_rss_mb']:.0f}" if entry.get("peak_rss_mb") is not None else "-"
+                    handle.write(f"| {res.symbol} | {name} | {entry['wall_s']:.3f} | {entry['cpu_s']:.3f} | {peak} |\n")
+        if portfolio:
+            handle.write("\n## Portfolio-Backtest\n\n")
             handle.write(
-                f"| {res.symbol} | {res.samples} | {res.positives} | {res.rules} | {res.accuracy:.3f} | {res.trades_total} | {res.winrate:.2f} | {res.profit_account:.2f} |\n"
+                f"{portfolio['symbols']} aktive Symbole, letzte {portfolio['months']} Monate "
+                f"({portfolio['start'][:10]} bis {portfolio['end'][:10]}), ein Konto mit EA-Regeln "
+                "(1 Position je Symbol, Margin-Watch, Gap-Schutz).\n\n"
             )
+            winrate = portfolio["wins"] / portfolio["trades"] if portfolio["trades"] else 0.0
+            handle.write("| Kennzahl | Wert |\n")
+            handle.write("|----------|------|\n")
+            handle.write(f"| Trades | {portfolio['trades']} |\n")
+            handle.write(f"| Winrate | {winrate:.2f} |\n")
+            handle.write(f"| Übersprungen (Position offen) | {portfolio['skipped_position']} |\n")
+            handle.write(f"| Übersprungen (Gap-Schutz) | {portfolio['skipped_weekend']} |\n")
+            handle.write(f"| Übersprungen (Margin) | {portfolio['skipped_margin']} |\n")
+            handle.write(f"| Max. offene Positionen | {portfolio['max_open_positions']} |\n")
+            handle.write(f"| Startkapital | {portfolio['starting_balance']:.2f} |\n")
+            handle.write(f"| Endkapital | {portfolio['final_balance']:.2f} |\n")
+            handle.write(f"| Profit Portfolio | {portfolio['profit']:.2f} |\n")
+            handle.write(f"| Profit Einzel-Backtests (Summe) | {portfolio['standalone_profit']:.2f} |\n")
+            handle.write(f"| Max. Drawdown | {portfolio['max_drawdown'] * 100:.1f}% |\n")
     logging.info("Zusammenfassung gespeichert: %s", summary_path)
 
 
+def rollup_stage_timings(results: List[SymbolResult]) -> List[Dict[str, object]]:
+    """Stufen über alle in diesem Lauf trainierten Symbole summiert, langsamste zuerst."""
+    totals: Dict[str, Dict[str, object]] = {}
+    for res in results:
+        for name, entry in (res.stages or {}).items():
+            row = totals.setdefault(name, {
+                "stage": name, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None,
+                "slowest_symbol": res.symbol, "slowest_wall_s": -1.0,
+            })
+            row["wall_s"] += entry["wall_s"]
+            row["cpu_s"] += entry["cpu_s"]
+            if entry.get("peak_rss_mb") is not None:
+                row["peak_rss_mb"] = max(row["peak_rss_mb"] or 0.0, entry["peak_rss_mb"])
+            if entry["wall_s"] > row["slowest_wall_s"]:
+                row["slowest_symbol"], row["slowest_wall_s"] = res.symbol, entry["wall_s"]
+    total_wall = sum(row["wall_s"] for row in totals.values()) or 1.0
+    rollup = sorted(totals.values(), key=lambda row: row["wall_s"], reverse=True)
+    for row in rollup:
+        row["share"] = row["wall_s"] / total_wall
+    return rollup
+
+
+def write_stage_timings(results: List[SymbolResult], reports_dir: Path) -> None:
+    """Maschinenlesbare Stufen-Zeiten für reports/stage_timings.json."""
+    payload = {
+        "generated": pd.Timestamp.now().isoformat(),
+        "symbols": {res.symbol: res.stages for res in results if res.stages},
+        "rollup": rollup_stage_timings(results),
+    }
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    out_path = reports_dir / "stage_timings.json"
+    out_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    logging.info("Stufen-Zeiten gespeichert: %s", out_path)
+
+
 def format_currency(value: float, currency: str) -> str:
     symbol_map = {"EUR": "€", "USD": "$", "CHF": "CHF", "JPY": "¥", "GBP": "£"}
     symbol = symbol_map.get(currency.upper(), currency)
@@ -1426,6 +3647,10 @@ def main():
     parser.add_argument("--rules-dir", type=Path, default=None)
     parser.add_argument("--models-dir", type=Path, default=None)
     parser.add_argument("--reports-dir", type=Path, default=None)
+    parser.add_argument("--workers", type=int, default=1, help="Parallele Symbol-Trainings (0 = alle CPU-Kerne)")
+    parser.add_argument("--compact-memory", action="store_true", help="float32/int8-Frames für wenig RAM")
+    parser.add_argument("--force", action="store_true", help="Alle Symbole neu trainieren, auch wenn sich nichts geändert hat")
+    parser.add_argument("--resume", action="store_true", help="Abgebrochenen Lauf fortsetzen, fertige Symbole übernehmen")
     args = parser.parse_args()
 
     setup_logging()
@@ -1433,11 +3658,15 @@ def main():
 
     config = load_config(args.config)
     settings = extract_training_settings(config)
+    if args.compact_memory:
+        settings.compact_memory = True
     trading_enabled = bool(config.get("trade_active", True))
     symbols = list_config_symbols(config)
     if not symbols:
         logging.error("Keine Symbole in der Config gefunden")
         return
+    fx = get_fx_rates(config.get("exchange_rates", {}))
+    logging.info("Wechselkurse: %d Währungen, %d Crosses trianguliert", len(fx.currencies), fx.triangulated)
 
     period_label, period_days = get_reporting_period(config)
     paths_cfg = config.get("paths", {}) if isinstance(config, dict) else {}
@@ -1451,27 +3680,129 @@ def main():
     failed_symbols: List[str] = []
 
     training_started = time.time()
+    workers = args.workers if args.workers > 0 else (multiprocessing.cpu_count() or 1)
+
+    manifest_path = models_dir / RUN_MANIFEST_NAME
+    progress_path = models_dir / RUN_PROGRESS_NAME
+    manifest = load_run_manifest(manifest_path)
+    fingerprints = {symbol: symbol_input_fingerprint(symbol, data_dir, config, settings) for symbol in symbols}
+    config_prints = {
+        symbol: symbol_input_fingerprint(symbol, data_dir, config, settings, include_data=False) for symbol in symbols
+    }
+    drift = get_drift_settings(config)
+    reused: Dict[str, SymbolResult] = {}
+
+    progress = load_run_progress(progress_path) if args.resume else None
+    if args.resume and progress is None:
+        logging.info("Kein abgebrochener Lauf gefunden, starte normal")
+    if progress is not None:
+        # Im abgebrochenen Lauf fertig gewordene Symbole übernehmen, solange Config und Code gleich sind
+        for symbol in progress.get("done", []):
+            entry = manifest.get(symbol)
+            if symbol not in fingerprints or not entry or entry.get("config_inputs") != config_prints[symbol]:
+                continue
+            res = reusable_result(entry, entry.get("inputs"), rules_dir / f"rules_{symbol}.txt")
+            if res is not None:
+                reused[symbol] = res
+        logging.info(
+            "Setze Lauf vom %s fort: %d/%d Symbole bereits fertig",
+            progress.get("started"), len(reused), len(symbols),
+        )
+    else:
+        progress = new_run_progress(symbols)
 
     for symbol in symbols:
-        res = process_symbol(
-            symbol,
-            data_dir,
-            rules_dir,
-            models_dir,
-            reports_dir,
-            settings,
-            config,
-            period_days,
-            trading_enabled,
-        )
+        if args.force or symbol in reused:
+            continue
+        entry = manifest.get(symbol)
+        rules_path = rules_dir / f"rules_{symbol}.txt"
+        res = reusable_result(entry, fingerprints[symbol], rules_path)
+        # Nur neue Bars, Config und Code unverändert → Drift entscheidet über das Retraining
+        if res is None and drift and entry and entry.get("config_inputs") == config_prints[symbol] and entry.get("reference"):
+            res = reusable_result(entry, entry["inputs"], rules_path)
+            if res is not None:
+                try:
+                    retrain, reason = check_symbol_drift(
+                        symbol, data_dir, rules_dir, models_dir, settings, config, entry["reference"], drift,
+                    )
+                except Exception as exc:
+                    retrain, reason = True, f"Drift-Check fehlgeschlagen ({exc})"
+                logging.info("%s: Drift-Check: %s → %s", symbol, reason, "Retraining" if retrain else "übersprungen")
+                if retrain:
+                    res = None
+                else:
+                    entry["inputs"] = fingerprints[symbol]
+        if res is not None:
+            res.stages = None  # Zeiten stammen aus einem früheren Lauf
+            reused[symbol] = res
+    unchanged = [symbol for symbol in reused if symbol not in progress["done"]]
+    if unchanged:
+        logging.info("%d Symbole unverändert, Training übersprungen: %s", len(unchanged), ", ".join(unchanged))
+
+    manifest = {symbol: manifest[symbol] for symbol in symbols if symbol in manifest}
+    elapsed_before = float(progress.get("elapsed", 0.0))
+    progress["symbols"] = list(symbols)
+    progress["done"] = [symbol for symbol in symbols if symbol in reused]
+    progress["failed"] = []
+    save_run_manifest(manifest_path, manifest)
+    save_run_progress(progress_path, progress)
+
+    def checkpoint(symbol: str, res: Optional[SymbolResult]) -> None:
+        """Manifest und Fortschritt nach jedem Symbol sichern, damit --resume dort weitermachen kann."""
+        if res:
+            result = asdict(res)
+            reference = result.pop("drift_reference")
+            manifest[symbol] = {
+                "inputs": fingerprints[symbol],
+                "config_inputs": config_prints[symbol],
+                "result": result,
+            }
+            if drift and reference:
+                # Referenz baut process_symbol aus seinem Feature-Frame, hier wird nichts neu berechnet
+                manifest[symbol]["reference"] = reference
+            progress["done"].append(symbol)
+        else:
+            manifest.pop(symbol, None)
+            progress["failed"].append(symbol)
+        progress["elapsed"] = elapsed_before + time.time() - training_started
+        save_run_manifest(manifest_path, manifest)
+        save_run_progress(progress_path, progress)
+
+    outcomes = dict(train_symbols(
+        [symbol for symbol in symbols if symbol not in reused],
+        workers,
+        data_dir,
+        rules_dir,
+        models_dir,
+        reports_dir,
+        settings,
+        config,
+        period_days,
+        trading_enabled,
+        on_result=checkpoint,
+    ))
+    for symbol in symbols:
+        res = outcomes[symbol] if symbol in outcomes else reused.get(symbol)
         if res:
             results.append(res)
         else:
             failed_symbols.append(symbol)
 
-    write_summary(results, reports_dir, trading_enabled)
+    portfolio_summary = None
+    portfolio_settings = get_portfolio_settings(config)
+    if portfolio_settings and trading_enabled and results:
+        try:
+            portfolio_summary = run_portfolio_backtest(
+                [res.symbol for res in results], data_dir, rules_dir, reports_dir, config, portfolio_settings
+            )
+        except Exception:
+            logging.exception("Portfolio-Backtest fehlgeschlagen")
+
+    write_summary(results, reports_dir, trading_enabled, portfolio_summary)
+    write_stage_timings(results, reports_dir)
 
-    duration_minutes = (time.time() - training_started) / 60.0 if results or failed_symbols else 0.0
+    elapsed_total = elapsed_before + time.time() - training_started
+    duration_minutes = elapsed_total / 60.0 if results or failed_symbols else 0.0
     send_telegram_summary(config, results, failed_symbols, duration_minutes, period_label)
     try:
         with WELLDONE_PATH.open("w", encoding="utf-8") as welldone:
@@ -1481,6 +3812,9 @@ def main():
         logging.info("welldone.txt geschrieben: %s", WELLDONE_PATH)
     except Exception as exc:
         logging.error("Konnte welldone.txt nicht schreiben: %s", exc)
+    progress["finished"] = pd.Timestamp.now().isoformat()
+    progress["elapsed"] = elapsed_total
+    save_run_progress(progress_path, progress)
     logging.info("Train-KI-Bot beendet")
 
 